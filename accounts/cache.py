@@ -0,0 +1,24 @@
+# accounts/cache.py
+"""Per-user dashboard fragment cache.
+
+Dashboard fragments are cached under the user's id plus a version stamp.
+``accounts.signals`` bumps the stamp when something the fragments show
+changes, which orphans the old entries; ``DASHBOARD_CACHE_SECONDS`` bounds
+how long changes we don't track (e.g. a classmate joining) stay hidden.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _key(user_id):
+    return f"dashboard:version:{user_id}"
+
+
+def dashboard_version(user_id):
+    return cache.get_or_set(_key(user_id), time.time_ns, None)
+
+
+def invalidate_dashboard(*user_ids):
+    stamp = time.time_ns()
+    cache.set_many({_key(uid): stamp for uid in set(user_ids) if uid}, None)
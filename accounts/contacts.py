@@ -0,0 +1,86 @@
+# accounts/contacts.py
+from functools import cached_property
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+
+from chat.models import Conversation
+from courses.models import Course, Enrollment
+
+User = get_user_model()
+
+CONTACT_LIMIT = 12
+
+
+class Contacts:
+    """The people worth showing on a user's dashboard.
+
+    Recent chat partners first, then the teachers and members of the user's
+    courses, capped at ``limit``. ``count`` is the number of people sharing a
+    course with the user. Both are computed on first access, so a cached
+    dashboard fragment never runs these queries.
+    """
+
+    def __init__(self, user, limit=CONTACT_LIMIT):
+        self.user = user
+        self.limit = limit
+
+    @cached_property
+    def _courses(self):
+        # (course id, teacher id) for every course the user teaches or attends
+        return list(
+            Course.objects.filter(
+                Q(teacher=self.user)
+                | Q(enrollments__student=self.user, enrollments__status=Enrollment.Status.ACTIVE)
+            ).values_list("id", "teacher_id").distinct()
+        )
+
+    def _chat_partner_ids(self):
+        # one row per pair, read off the inbox indexes
+        recent = (
+            Conversation.objects.filter(Q(user_a=self.user) | Q(user_b=self.user), last_activity__isnull=False)
+            .order_by("-last_activity", "-id")
+            .values_list("user_a_id", "user_b_id")[: self.limit]
+        )
+        return [a if b == self.user.id else b for a, b in recent]
+
+    def _member_ids(self):
+        return (
+            Enrollment.objects.filter(
+                course_id__in=[cid for cid, _ in self._courses], status=Enrollment.Status.ACTIVE
+            )
+            .exclude(student=self.user)
+            .order_by()
+            .values_list("student_id", flat=True)
+            .distinct()[: self.limit]
+        )
+
+    @cached_property
+    def users(self):
+        ids = []
+        candidates = [self._chat_partner_ids(), [tid for _, tid in self._courses]]
+        if self._courses:
+            candidates.append(self._member_ids())
+        for group in candidates:
+            for uid in group:
+                if uid != self.user.id and uid not in ids:
+                    ids.append(uid)
+        ids = ids[: self.limit]
+        found = User.objects.only("id", "username").in_bulk(ids)
+        return [found[uid] for uid in ids if uid in found]
+
+    @cached_property
+    def count(self):
+        if not self._courses:
+            return 0
+        course_ids = [cid for cid, _ in self._courses]
+        teacher_ids = {tid for _, tid in self._courses}
+        return (
+            User.objects.filter(
+                Q(enrollments__course_id__in=course_ids, enrollments__status=Enrollment.Status.ACTIVE)
+                | Q(id__in=teacher_ids)
+            )
+            .exclude(id=self.user.id)
+            .distinct()
+            .count()
+        )
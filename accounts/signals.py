@@ -0,0 +1,49 @@
+# accounts/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from chat.models import ChatMessage
+from courses.models import Course, Enrollment, Material
+from courses.signals import enrollments_bulk_created
+
+from .cache import invalidate_dashboard
+
+User = get_user_model()
+
+# Invalidate cached dashboard fragments (see accounts/cache.py).
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+    invalidate_dashboard(instance.id)
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, created=False, **kwargs):
+    students = []
+    if kwargs["signal"] is post_save and not created:
+        # title/thumbnail shown on the enrolled students' dashboards
+        students = Enrollment.objects.filter(course=instance, status=Enrollment.Status.ACTIVE) \
+                                     .values_list("student_id", flat=True)
+    invalidate_dashboard(instance.teacher_id, *students)
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    teacher_id = Course.objects.filter(id=instance.course_id).values_list("teacher_id", flat=True).first()
+    invalidate_dashboard(instance.student_id, teacher_id)
+
+@receiver(enrollments_bulk_created)
+def enrollments_bulk_changed(sender, members, **kwargs):
+    teachers = Course.objects.filter(id__in=members).values_list("teacher_id", flat=True)
+    invalidate_dashboard(*teachers, *(sid for ids in members.values() for sid in ids))
+
+@receiver([post_save, post_delete], sender=Material)
+def material_changed(sender, instance, **kwargs):
+    teacher_id = Course.objects.filter(id=instance.course_id).values_list("teacher_id", flat=True).first()
+    invalidate_dashboard(teacher_id)
+
+@receiver(post_save, sender=ChatMessage)
+def chat_message_sent(sender, instance, created, **kwargs):
+    if created:
+        invalidate_dashboard(instance.sender_id, instance.receiver_id)
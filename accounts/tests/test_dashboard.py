@@ -1,8 +1,15 @@
 # accounts/tests/test_dashboard.py
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
+from accounts.contacts import CONTACT_LIMIT
+from chat.models import ChatMessage
+from courses.models import Course, Enrollment
+
 User = get_user_model()
 
 class DashboardAccessTests(TestCase):
@@ -11,8 +18,57 @@ class DashboardAccessTests(TestCase):
         self.assertIn(resp.status_code, (302, 301))
 
     def test_dashboard_ok_when_logged_in(self):
-        u = User.objects.create_user(username="kim", password="pass123", role="student")
+        User.objects.create_user(username="kim", password="pass123", role="student")
         self.client.login(username="kim", password="pass123")
         resp = self.client.get(reverse("dashboard"))
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, "Welcome back")
+
+
+class DashboardPeopleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.me = User.objects.create_user(username="me", password="x", role="student")
+        self.course = Course.objects.create(title="ML 101", teacher=self.teacher)
+        Enrollment.objects.create(course=self.course, student=self.me)
+        for name in ("c1", "c2"):
+            Enrollment.objects.create(course=self.course, student=User.objects.create_user(username=name, password="x"))
+        self.stranger = User.objects.create_user(username="stranger", password="x")
+        self.client.login(username="me", password="x")
+
+    def _people(self, resp):
+        return [u.username for u in resp.context["contacts"].users]
+
+    def test_panel_lists_relevant_contacts_only(self):
+        pen_pal = User.objects.create_user(username="penpal", password="x")
+        ChatMessage.objects.create(sender=pen_pal, receiver=self.me, message="hi")
+        resp = self.client.get(reverse("dashboard"))
+        self.assertEqual(self._people(resp), ["penpal", "teach", "c1", "c2"])
+        self.assertEqual(resp.context["contacts"].count, 3)
+        self.assertNotContains(resp, "@stranger")
+
+    def test_panel_is_bounded(self):
+        students = User.objects.bulk_create([User(username=f"bulk{i}") for i in range(30)])
+        Enrollment.objects.bulk_create([Enrollment(course=self.course, student=s) for s in students])
+        resp = self.client.get(reverse("dashboard"))
+        self.assertEqual(len(self._people(resp)), CONTACT_LIMIT)
+        self.assertEqual(resp.context["contacts"].count, 33)
+
+    def test_fragments_are_cached_and_invalidated_by_signals(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(reverse("dashboard"))
+        with CaptureQueriesContext(connection) as warm:
+            self.client.get(reverse("dashboard"))
+        self.assertLess(len(warm), len(cold))
+
+        other = Course.objects.create(title="Deep Learning", teacher=self.teacher)
+        Enrollment.objects.create(course=other, student=self.me)
+        self.assertContains(self.client.get(reverse("dashboard")), "Deep Learning")
+
+    def test_teacher_sees_active_enrolments_from_course_stats(self):
+        Course.objects.create(title="Empty", teacher=self.teacher)
+        self.client.login(username="teach", password="x")
+        resp = self.client.get(reverse("dashboard"))
+        self.assertContains(resp, "Enrolments")
+        self.assertEqual(resp.context["enrolment_total"](), 3)
@@ -0,0 +1,90 @@
+# accounts/tests/test_import_roster.py
+import io
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from courses.models import Course, CourseStats, Enrollment, EnrollmentQuerySet
+from social.models import Notification
+
+User = get_user_model()
+
+CSV = """username,email,first_name,last_name,password,course
+alice,Alice@Example.com,Alice,A,s3cret-pass,python-101
+bob,bob@example.com,Bob,B,,python-101
+alice,alice@example.com,Alice,A,s3cret-pass,data-science
+carol,carol@example.com,Carol,C,pw,no-such-course
+,,,,,python-101
+"""
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+                   NOTIFICATION_FANOUT_ASYNC=False)
+class ImportRosterTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.py = Course.objects.create(title="Python 101", teacher=self.teacher)
+        self.ds = Course.objects.create(title="Data Science", teacher=self.teacher)
+        Enrollment.objects.create(course=self.py, student=User.objects.create_user(username="bob", role="student"))
+
+    def _run(self, csv_text, **options):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as f:
+            f.write(csv_text)
+            f.flush()
+            out = io.StringIO()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("import_roster", f.name, stdout=out, **options)
+        return out.getvalue()
+
+    def test_imports_users_and_enrollments_in_bulk(self):
+        out = self._run(CSV, batch_size=2, workers=0)
+        self.assertIn("rows/s", out)
+        self.assertIn("1 new users, 2 new enrolments, 2 skipped", out)
+
+        alice = User.objects.get(username="alice")
+        self.assertEqual(alice.email, "alice@example.com")
+        self.assertTrue(alice.check_password("s3cret-pass"))
+        self.assertFalse(User.objects.filter(username="carol").exists())
+        self.assertEqual(
+            set(Enrollment.objects.filter(student=alice).values_list("course__slug", flat=True)),
+            {"python-101", "data-science"},
+        )
+        self.assertEqual(CourseStats.objects.get(course=self.py).active_enrollments, 2)
+
+        # one summary notification per course, not one per student
+        summaries = Notification.objects.filter(recipient=self.teacher, actor__isnull=True)
+        self.assertEqual(sorted(summaries.values_list("count", flat=True)), [1, 1])
+
+    def test_hashes_passwords_in_worker_processes(self):
+        self._run(CSV, workers=2, no_notify=True)
+        self.assertTrue(User.objects.get(username="alice").check_password("s3cret-pass"))
+        self.assertFalse(Notification.objects.filter(recipient=self.teacher, actor__isnull=True).exists())
+
+    def test_rerun_is_idempotent(self):
+        self._run(CSV, workers=0)
+        out = self._run(CSV, workers=0)
+        self.assertIn("0 new users, 0 new enrolments", out)
+
+    def test_teacher_usernames_are_skipped(self):
+        out = self._run("username,course\nteach,python-101\ndave,python-101\n", workers=0)
+        self.assertIn("1 new users, 1 new enrolments, 1 skipped", out)
+        self.assertFalse(Enrollment.objects.filter(student=self.teacher).exists())
+
+    def test_interrupted_import_keeps_counts_for_committed_batches(self):
+        insert_active = EnrollmentQuerySet.insert_active
+        calls = []
+
+        def fail_second_batch(queryset, pairs):
+            calls.append(pairs)
+            if len(calls) == 2:
+                raise RuntimeError("interrupted")
+            return insert_active(queryset, pairs)
+
+        csv_text = "username,course\ndave,python-101\nerin,python-101\n"
+        with mock.patch.object(EnrollmentQuerySet, "insert_active", autospec=True, side_effect=fail_second_batch):
+            with self.assertRaises(RuntimeError):
+                self._run(csv_text, batch_size=1, workers=0)
+        self.assertEqual(CourseStats.objects.get(course=self.py).active_enrollments, 2)  # bob and dave
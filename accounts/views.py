@@ -1,13 +1,16 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model, login
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import OuterRef, Subquery, Q
-from django.utils.timezone import now, timedelta
+from django.db.models import Q, Sum
+from django.utils.timezone import now
 
 
-from courses.models import Course, Enrollment, Material, Assignment
+from courses.models import Course, CourseStats, Enrollment, Material, Assignment
 from social.models import StatusUpdate, Notification
+from accounts.cache import dashboard_version
+from accounts.contacts import Contacts
 from accounts.forms import SignupForm
 
 User = get_user_model()
@@ -37,20 +40,16 @@ def dashboard(request):
     my_courses_taught = Course.objects.filter(teacher=me) if getattr(me, "role", None) == "teacher" else []
     my_enrollments = Enrollment.objects.select_related("course").filter(student=me, status="active")
     my_materials = Material.objects.filter(course__teacher=me)[:10] if getattr(me, "role", None) == "teacher" else []
-    notifications = Notification.objects.filter(recipient=me, is_read=False)[:10]
-    users = User.objects.exclude(id=me.id) 
-    
+    notifications = Notification.objects.for_display().filter(recipient=me, is_read=False)[:10]
+
     # my_updates = StatusUpdate.objects.filter(author=me)[:20]
     my_updates = StatusUpdate.objects.filter(author=me).order_by("-created_at")[:20]
-    
-    # Add this line to get all users except the current one
-    users = User.objects.exclude(id=me.id)
 
     # upcoming deadlines 
     upcoming_assignments = []
     if getattr(me, "role", None) == "student":
         upcoming_assignments = (
-            Assignment.objects.filter(
+            Assignment.objects.select_related("course").filter(
                 course__enrollments__student=me,
                 course__enrollments__status="active",
                 due_date__isnull=False,
@@ -59,21 +58,27 @@ def dashboard(request):
         )
     elif getattr(me, "role", None) == "teacher":
         upcoming_assignments = (
-            Assignment.objects.filter(
+            Assignment.objects.select_related("course").filter(
                 course__teacher=me,
                 due_date__isnull=False,
                 due_date__gte=now(),
             ).order_by("due_date")[:5]
         )
 
+    # querysets above are lazy: fragments served from cache never run them
     return render(request, "accounts/dashboard.html", {
         "my_courses_taught": my_courses_taught,
         "my_enrollments": my_enrollments,
         "my_materials": my_materials,
+        # a callable, so the template only runs it when the fragment is rendered
+        "enrolment_total": lambda: CourseStats.objects.filter(course__teacher=me)
+                                   .aggregate(n=Sum("active_enrollments"))["n"] or 0,
         "notifications": notifications,
-        "users": users, 
+        "contacts": Contacts(me),
         "my_updates": my_updates,
         "upcoming_assignments": upcoming_assignments,
+        "dashboard_version": dashboard_version(me.id),
+        "dashboard_cache_seconds": getattr(settings, "DASHBOARD_CACHE_SECONDS", 300),
     })
 
 def public_profile(request, username):
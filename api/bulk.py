@@ -0,0 +1,159 @@
+# api/bulk.py
+"""Batch writes behind the api/ bulk actions.
+
+Each action takes a list of items and answers with one result per item,
+in request order: ``{"index": i, "status": ..., ...}``. Items are
+validated in one pass with the item serializer, ownership is checked with
+one query for the whole batch, and rows are written with ``bulk_create`` /
+``bulk_update`` (or one ``UPDATE``). A bad item is reported and skipped;
+it does not fail the others. Only a malformed body (not a list, or more
+than ``MAX_ITEMS``) is rejected outright.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework import serializers
+
+from courses.models import Course, Enrollment, Submission
+from courses.signals import enrollments_bulk_created
+from social.models import Notification, NotificationCounter, notifications_changed
+from social.push import publish_unread
+
+from .serializers import BulkEnrollmentItemSerializer, SubmissionGradeItemSerializer
+
+User = get_user_model()
+
+MAX_ITEMS = 500
+
+
+def validate_items(child, items):
+    """``(validated, results)``: index -> data for good items, and result stubs.
+
+    ``child`` is the serializer (or field) for one item. ``results`` already
+    holds an ``invalid`` entry for each bad item; the caller fills in the rest.
+    """
+    if not isinstance(items, list):
+        raise serializers.ValidationError("Expected a list of items.")
+    if len(items) > MAX_ITEMS:
+        raise serializers.ValidationError(f"At most {MAX_ITEMS} items per request.")
+    validated, results = {}, [None] * len(items)
+    for index, item in enumerate(items):
+        try:
+            validated[index] = child.run_validation(item)
+        except serializers.ValidationError as exc:
+            results[index] = {"index": index, "status": "invalid", "errors": exc.detail}
+    return validated, results
+
+
+def _result(index, status, **fields):
+    return {"index": index, "status": status, **fields}
+
+
+def enroll(teacher, items):
+    """Enrol students (by username) in courses ``teacher`` owns."""
+    validated, results = validate_items(BulkEnrollmentItemSerializer(), items)
+    course_ids = {v["course"] for v in validated.values()}
+    courses = dict(Course.objects.filter(id__in=course_ids).values_list("id", "teacher_id"))
+    students = dict(
+        User.objects.filter(username__in={v["student"] for v in validated.values()}, role=User.Roles.STUDENT)
+        .values_list("username", "id")
+    )
+    existing = {
+        (course_id, student_id): status
+        for course_id, student_id, status in Enrollment.objects
+        .filter(course_id__in=course_ids, student_id__in=students.values())
+        .values_list("course_id", "student_id", "status")
+    }
+
+    to_create = {}  # pair -> index
+    for index, item in validated.items():
+        course_id, username = item["course"], item["student"]
+        pair = (course_id, students.get(username))
+        if course_id not in courses:
+            results[index] = _result(index, "not_found", **item, detail="No such course.")
+        elif courses[course_id] != teacher.id:
+            results[index] = _result(index, "forbidden", **item, detail="Not your course.")
+        elif pair[1] is None:
+            results[index] = _result(index, "not_found", **item, detail="No such student.")
+        elif pair in existing:
+            results[index] = _result(index, "exists", **item, enrollment_status=existing[pair])
+        elif pair in to_create:
+            results[index] = _result(index, "duplicate", **item)
+        else:
+            to_create[pair] = index
+            results[index] = _result(index, "created", **item)
+
+    if not to_create:
+        return 0, results
+    with transaction.atomic():
+        inserted = Enrollment.objects.insert_active(to_create)
+        members = {}
+        for course_id, student_id in inserted:
+            members.setdefault(course_id, []).append(student_id)
+        if members:
+            # the teacher did this, so there is nobody to notify
+            enrollments_bulk_created.send(sender=Enrollment, members=members, notify=False)
+    raced = [pair for pair in to_create if pair not in inserted]
+    if raced:
+        # enrolled by someone else since we looked
+        statuses = {
+            (course_id, student_id): status
+            for course_id, student_id, status in Enrollment.objects
+            .filter(course_id__in={c for c, _ in raced}, student_id__in={s for _, s in raced})
+            .values_list("course_id", "student_id", "status")
+        }
+        for pair in raced:
+            index = to_create[pair]
+            results[index] = _result(index, "exists", **validated[index], enrollment_status=statuses.get(pair))
+    return len(inserted), results
+
+
+def mark_read(user, ids):
+    """Mark ``user``'s notifications with these ids read."""
+    validated, results = validate_items(serializers.IntegerField(), ids)
+    found = dict(
+        Notification.objects.filter(recipient=user, id__in=set(validated.values())).values_list("id", "is_read")
+    )
+    to_mark = set()
+    for index, notification_id in validated.items():
+        if notification_id not in found:
+            results[index] = _result(index, "not_found", id=notification_id)
+        elif found[notification_id] or notification_id in to_mark:
+            results[index] = _result(index, "already_read", id=notification_id)
+        else:
+            to_mark.add(notification_id)
+            results[index] = _result(index, "marked", id=notification_id)
+
+    updated = 0
+    if to_mark:
+        with transaction.atomic():
+            updated = Notification.objects.filter(id__in=to_mark, is_read=False).update(is_read=True)
+            # as in mark_all_read: subtract what this UPDATE actually changed
+            NotificationCounter.add([user.id], -updated)
+            publish_unread({user.id: NotificationCounter.unread_for(user.id)})
+            notifications_changed.send(sender=Notification, user_ids=[user.id])
+    return updated, results
+
+
+def grade(teacher, items):
+    """Set grade and/or feedback on submissions to ``teacher``'s assignments."""
+    validated, results = validate_items(SubmissionGradeItemSerializer(), items)
+    submissions = Submission.objects.filter(
+        id__in={v["id"] for v in validated.values()}, assignment__course__teacher=teacher,
+    ).only("id", "grade", "feedback").in_bulk()
+
+    changed = {}
+    for index, item in validated.items():
+        submission = submissions.get(item["id"])
+        if submission is None:
+            results[index] = _result(index, "not_found", id=item["id"])
+            continue
+        for field in ("grade", "feedback"):
+            if field in item:
+                setattr(submission, field, item[field])
+        changed[submission.id] = submission
+        results[index] = _result(index, "updated", id=submission.id)
+
+    if changed:
+        Submission.objects.bulk_update(changed.values(), ["grade", "feedback"])
+    return len(changed), results
+
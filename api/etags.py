@@ -0,0 +1,92 @@
+# api/etags.py
+"""Conditional GET for api/ endpoints, from version stamps in the cache.
+
+A stamp is a nanosecond timestamp stored under a *scope* such as
+``courses`` or ``notifications:user:<id>``. ``api.signals`` bumps the
+scopes a write affects. A response's ETag hashes the caller, the full path
+and the stamps of every scope the view reads from, and Last-Modified is the
+newest of those stamps. A request whose ``If-None-Match`` (or
+``If-Modified-Since``) still matches gets a 304 before the queryset or the
+serializer is touched, so it costs one cache round trip.
+
+Stamps only mean something if every worker sees the same ones, so with a
+per-process cache (``SHARED_CACHE`` off) responses are never conditional.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def _key(scope):
+    return f"api:etag:{scope}"
+
+
+def stamps(scopes):
+    """Current stamp of each scope, in order; unknown scopes start now."""
+    keys = [_key(s) for s in scopes]
+    found = cache.get_many(keys)
+    missing = {k: time.time_ns() for k in keys if k not in found}
+    if missing:
+        for key, stamp in missing.items():
+            # add(), so a concurrent bump isn't overwritten by an older stamp
+            if not cache.add(key, stamp, None):
+                missing[key] = cache.get(key, stamp)
+        found.update(missing)
+    return [found[k] for k in keys]
+
+
+def _set(scopes):
+    stamp = time.time_ns()
+    cache.set_many({_key(s): stamp for s in scopes}, None)
+
+
+def bump(*scopes):
+    """Change the stamps of ``scopes``, now and again when the transaction commits.
+
+    The second bump stops a reader that saw the new stamp before the commit
+    from caching the old rows under it.
+    """
+    scopes = set(scopes)
+    if not scopes:
+        return
+    _set(scopes)
+    transaction.on_commit(lambda: _set(scopes))
+
+
+class ConditionalGetMixin:
+    """Adds ETag/Last-Modified to ``list`` and answers revalidation with 304.
+
+    Views name what their response depends on in ``get_etag_scopes()``;
+    anything that changes it must bump one of those scopes. A view with
+    ``retrieve`` wraps it with :meth:`conditional` the same way.
+    """
+
+    def get_etag_scopes(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def conditional(self, handler, request, *args, **kwargs):
+        if not getattr(settings, "SHARED_CACHE", False):
+            return handler(request, *args, **kwargs)
+        versions = stamps(self.get_etag_scopes())
+        digest = hashlib.sha1(
+            f"{request.user.pk}|{request.get_full_path()}|{versions}".encode()
+        ).hexdigest()
+        etag = quote_etag(digest)
+        last_modified = max(versions) // 1_000_000_000
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            # clients may keep the body but must revalidate before reusing it
+            response["Cache-Control"] = "private, no-cache"
+        return response
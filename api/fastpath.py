@@ -0,0 +1,112 @@
+# api/fastpath.py
+"""List responses built from ``values()`` rows instead of model instances.
+
+Most of a large list response's time goes to creating model instances
+and to ModelSerializer's per-field machinery, not to the query. For a
+serializer whose fields are all plain columns, nested serializers over
+foreign keys, or fields with a ``row_<name>(row)`` method, :func:`compile_rows`
+works out once which columns to fetch and a mapper per field. Rows are
+then rendered straight from the dicts ``values()`` returns, using the same
+fields' ``to_representation``, so the JSON is byte-for-byte the same.
+
+Fields the fast path can't map (files, many-to-many, method fields without
+a ``row_`` twin) make :func:`compile_rows` return None, and the view falls
+back to the serializer.
+"""
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .fieldsets import field_paths
+from .pagination import KeysetPagination
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class RowPlan:
+    """The columns a serializer reads and a function rendering one row."""
+
+    def __init__(self, paths, mappers):
+        self.paths = list(dict.fromkeys(paths))
+        self._mappers = tuple(mappers)
+
+    def render(self, row):
+        return {name: mapper(row) for name, mapper in self._mappers}
+
+    def render_many(self, rows):
+        mappers = self._mappers
+        return [{name: mapper(row) for name, mapper in mappers} for row in rows]
+
+
+def _mapper(serializer, name, field, prefix=""):
+    row_getter = getattr(serializer, f"row_{name}", None)
+    if row_getter is not None and not prefix:
+        return row_getter
+    if field.source == "*" or isinstance(field, (serializers.SerializerMethodField, serializers.FileField,
+                                                 serializers.ManyRelatedField, serializers.ListSerializer)):
+        raise _Unsupported(name)
+    key = prefix + field.source.replace(".", "__")
+
+    if isinstance(field, serializers.BaseSerializer):
+        children = tuple((n, _mapper(field, n, f, key + "__")) for n, f in _readable(field))
+
+        def nested(row):
+            if row[key] is None:
+                return None
+            return {n: m(row) for n, m in children}
+        return nested
+
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        return lambda row: row[key]  # values() already gives the id
+    if isinstance(field, serializers.RelatedField):
+        raise _Unsupported(name)
+
+    to_representation = field.to_representation
+
+    def column(row):
+        value = row[key]
+        return None if value is None else to_representation(value)
+    return column
+
+
+def _readable(serializer):
+    return [(name, field) for name, field in serializer.fields.items() if not field.write_only]
+
+
+def compile_rows(serializer, extra=()):
+    """A :class:`RowPlan` for ``serializer``'s current fields, or None.
+
+    ``extra`` columns are fetched but not rendered (e.g. sort keys).
+    """
+    try:
+        mappers = [(name, _mapper(serializer, name, field)) for name, field in _readable(serializer)]
+    except _Unsupported:
+        return None
+    paths = [p for name, field in _readable(serializer) for p in field_paths(serializer, name, field)]
+    return RowPlan([*paths, *extra], mappers)
+
+
+class FastListMixin:
+    """``list()`` from ``values()`` rows; see the module docstring.
+
+    Set ``fast_list = False`` to always go through the serializer.
+    """
+
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        plan = compile_rows(self.get_serializer(), extra=self._keyset_columns()) if self.fast_list else None
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        rows = self.filter_queryset(self.get_queryset()).values(*plan.paths)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.render_many(page))
+        return Response(plan.render_many(rows))
+
+    def _keyset_columns(self):
+        # read back for the next cursor; annotations are selected by name too
+        if isinstance(self.paginator, KeysetPagination):
+            return [key.lstrip("-") for key in self.paginator.get_keyset(self)]
+        return []
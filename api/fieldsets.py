@@ -0,0 +1,109 @@
+# api/fieldsets.py
+"""Sparse fieldsets (``?fields=``) and opt-in expansion (``?expand=``).
+
+``?fields=id,title`` returns only those fields. ``?expand=course`` nests a
+relation that is otherwise rendered as its id; serializers list what can
+be expanded, and with which serializer, in ``Meta.expandable``. Both only
+apply to GET requests, so writes always see the full serializer.
+
+Serializers opt in with :class:`SparseFieldsMixin`. Views add
+:class:`SparseFieldsFilter` to ``filter_backends``: it narrows the queryset
+to the columns the serializer will read, with ``only()``, and joins only
+the relations it renders, with ``select_related()``. Fields computed from
+other columns name them in ``Meta.field_sources``.
+"""
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def _names(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class SparseFieldsMixin:
+    """Applies ``?fields=`` and ``?expand=`` from the request in the context."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        expandable = getattr(self.Meta, "expandable", {})
+        for name in (_names(request, EXPAND_PARAM) or ()) & expandable.keys():
+            source = self.fields[name].source
+            options = {"source": source} if source != name else {}
+            self.fields[name] = expandable[name](read_only=True, **options)
+        wanted = _names(request, FIELDS_PARAM)
+        if wanted:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+def field_paths(serializer, name, field):
+    """The ORM paths ``field`` reads, e.g. ``["teacher__username", ...]``."""
+    sources = getattr(getattr(serializer, "Meta", None), "field_sources", {})
+    if name in sources:
+        return list(sources[name])
+    if field.write_only or field.source == "*" or isinstance(field, serializers.SerializerMethodField):
+        return []
+    path = field.source.replace(".", "__")
+    if isinstance(field, serializers.BaseSerializer):
+        nested = [p for n, f in field.fields.items() for p in field_paths(field, n, f)]
+        return [path, *(f"{path}__{p}" for p in nested)]
+    return [path]
+
+
+def narrow(queryset, serializer, keep=()):
+    """``queryset`` loading only what ``serializer`` renders, plus ``keep``."""
+    paths = list(keep)
+    for name, field in serializer.fields.items():
+        paths.extend(field_paths(serializer, name, field))
+    relations = {path.rsplit("__", 1)[0] for path in paths if "__" in path}
+    # drop joins (e.g. from a catalogue queryset) for relations not rendered
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*paths)
+
+
+class SparseFieldsFilter(BaseFilterBackend):
+    """Narrows GET querysets to the fields the view's serializer renders."""
+
+    def filter_queryset(self, request, queryset, view):
+        if request.method not in SAFE_METHODS:
+            return queryset
+        serializer = view.get_serializer()
+        if not isinstance(serializer, SparseFieldsMixin):
+            return queryset
+        return narrow(queryset, serializer, keep=self._keyset_fields(queryset, view))
+
+    @staticmethod
+    def _keyset_fields(queryset, view):
+        # sort keys that are columns are read back for the next cursor
+        keys = view.get_keyset() if hasattr(view, "get_keyset") else getattr(view, "keyset", ())
+        return [k.lstrip("-") for k in keys if k.lstrip("-") not in queryset.query.annotations]
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": FIELDS_PARAM,
+                "required": False,
+                "in": "query",
+                "description": "Comma-separated fields to return (default: all).",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": EXPAND_PARAM,
+                "required": False,
+                "in": "query",
+                "description": "Comma-separated relations to nest instead of returning their id.",
+                "schema": {"type": "string"},
+            },
+        ]
@@ -0,0 +1,89 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.fastpath import compile_rows
+from api.renderers import FastJSONRenderer
+from api.serializers import CourseSerializer, NotificationSerializer
+from courses.models import Course, Material
+from social.models import Notification
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the course and notification list rendering through ModelSerializer and through "
+        "the values() fast path (api/fastpath.py). Sample rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per path; the best is reported.")
+
+    def handle(self, *args, **options):
+        for rows in options["rows"]:
+            try:
+                with transaction.atomic():
+                    courses, notifications = self._sample(rows)
+                    self._compare(f"courses x{rows}", CourseSerializer, courses, options["repeat"])
+                    self._compare(f"notifications x{rows}", NotificationSerializer, notifications, options["repeat"])
+                    raise _Rollback
+            except _Rollback:
+                pass
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    @staticmethod
+    def _sample(rows):
+        tag = f"bench{time.time_ns()}"
+        teacher = User.objects.create_user(username=f"{tag}t", role="teacher", display_name="Bench Teacher")
+        student = User.objects.create_user(username=f"{tag}s", role="student")
+        Course.objects.bulk_create_with_slugs(
+            [Course(title=f"{tag} course {i}", slug=f"{tag}-{i}", teacher=teacher, description="x" * 80)
+             for i in range(rows)]
+        )
+        courses = Course.objects.filter(title__startswith=tag)
+        course = courses.order_by("id").first()
+        material = Material.objects.create(course=course, title="Week 1", file="materials/bench.pdf")
+        types = [Notification.Type.ENROLMENT, Notification.Type.NEW_MATERIAL, Notification.Type.REMOVED]
+        Notification.objects.bulk_create(
+            [Notification(recipient=student, type=types[i % 3], course=course, actor=teacher,
+                          material=material if i % 3 == 1 else None) for i in range(rows)],
+            batch_size=2000,
+        )
+        return (courses.select_related("teacher", "stats").order_by("id"),
+                Notification.objects.for_display().filter(recipient=student).order_by("-created_at", "-id"))
+
+    def _compare(self, label, serializer_class, queryset, repeat):
+        def serializer_path():
+            return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+        def fast_path():
+            plan = compile_rows(serializer_class())
+            return FastJSONRenderer().render(plan.render_many(queryset.values(*plan.paths)))
+
+        slow_ms, slow_body = self._best(serializer_path, repeat)
+        fast_ms, fast_body = self._best(fast_path, repeat)
+        if fast_body != slow_body:
+            raise CommandError(f"{label}: the fast path rendered different JSON")
+        self.stdout.write(
+            f"{label:>20}: serializer {slow_ms:8.1f} ms   fast path {fast_ms:8.1f} ms   "
+            f"({slow_ms / fast_ms:.1f}x)"
+        )
+
+    @staticmethod
+    def _best(func, repeat):
+        best, body = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = func()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, body
@@ -0,0 +1,152 @@
+# api/pagination.py
+"""Keyset pagination for every api/ list endpoint.
+
+A page is "the next ``limit`` rows after the last one you saw", found with
+a range condition on the sort key instead of OFFSET, so page 500 costs the
+same as page 1 and rows added meanwhile don't shift the pages. Nothing is
+counted.
+
+Each viewset names its order in ``keyset``, or in ``get_keyset()`` when it
+depends on the request. The keys are model fields or annotations on the
+queryset. None of them may be null, and the last one must be unique
+(normally ``id``). A ``-`` prefix means descending. Every order should have
+a matching composite index, declared next to the model.
+"""
+import base64
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _json_default(value):
+    # full microseconds: DjangoJSONEncoder rounds datetimes to milliseconds
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} can't be a cursor key")
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=_json_default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    """Cursor string -> list of key values; ValueError if it isn't one of ours."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("malformed cursor") from exc
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("cursor does not match this ordering")
+    return values
+
+
+def after(keys, values):
+    """Rows strictly after ``values`` in ``keys`` order (lexicographic)."""
+    condition = Q()
+    for i, key in enumerate(keys):
+        name = key.lstrip("-")
+        step = Q(**{f"{name}__{'lt' if key.startswith('-') else 'gt'}": values[i]})
+        for prev_key, prev_value in zip(keys[:i], values[:i]):
+            step &= Q(**{prev_key.lstrip("-"): prev_value})
+        condition |= step
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    page_size_query_param = "limit"
+    cursor_query_param = "cursor"
+    default_keyset = ("-id",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keys = tuple(self.get_keyset(view))
+        size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.keys)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                queryset = queryset.filter(after(self.keys, decode_cursor(cursor, len(self.keys))))
+                # values are only converted when the query is compiled
+                rows = list(queryset[:size + 1])
+            except (ValueError, TypeError, DjangoValidationError):
+                raise NotFound("Invalid cursor")
+        else:
+            rows = list(queryset[:size + 1])
+        self.has_next = len(rows) > size
+        rows = rows[:size]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_keyset(self, view):
+        if hasattr(view, "get_keyset"):
+            return view.get_keyset()
+        return getattr(view, "keyset", self.default_keyset)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            size = self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        values = [_value(self.last, key.lstrip("-")) for key in self.keys]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(values))
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        example = "http://api.example.org/courses/?" + urlencode({self.cursor_query_param: "WyIyMDI1LTAxLTAxIiw0Ml0"})
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri", "example": example},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The `next` link of the previous page.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Results per page (max {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+def _value(obj, name):
+    if isinstance(obj, dict):  # a values() row, see api/fastpath.py
+        return obj[name]
+    value = getattr(obj, name)
+    return getattr(value, "pk", value)  # a foreign key compares by id
@@ -0,0 +1,31 @@
+# api/renderers.py
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` with one shared encoder instead of one per response.
+
+    DRF instantiates renderers per request, so the encoder is built once per
+    class, on first use. Output is the same; indented (browsable or
+    ``; indent=``) responses go through the parent.
+    """
+
+    @classmethod
+    def _get_encoder(cls):
+        encoder = cls.__dict__.get("_encoder")  # not a parent class's
+        if encoder is None:
+            encoder = encoders.JSONEncoder(
+                ensure_ascii=cls.ensure_ascii, allow_nan=not cls.strict,
+                separators=SHORT_SEPARATORS if cls.compact else LONG_SEPARATORS,
+            )
+            cls._encoder = encoder
+        return encoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = self._get_encoder().encode(data)
+        # as in JSONRenderer, keep the output a strict JavaScript subset
+        return ret.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
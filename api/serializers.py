@@ -1,7 +1,10 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from courses.models import Course, Enrollment, Material, Feedback
+from courses.models import Course, CourseStats, Enrollment, Material, Feedback, Submission
 from social.models import StatusUpdate, Notification
+from .fieldsets import SparseFieldsMixin
 
 User = get_user_model()
 
@@ -18,20 +21,68 @@ class MeSerializer(serializers.ModelSerializer):
 
 # --- Courses ---
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSummarySerializer(serializers.ModelSerializer):
+    # what ?expand=course nests in place of a course id
+    class Meta:
+        model = Course
+        fields = ["id", "title", "slug"]
+
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     teacher = PublicUserSerializer(read_only=True)
+    enrollment_count = serializers.SerializerMethodField()
+    rating_avg = serializers.SerializerMethodField()
+    rating_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
         fields = [
             "id", "title", "slug", "description",
             "start_date", "end_date",
-            "teacher", "created_at"
+            "teacher", "created_at",
+            "enrollment_count", "rating_avg", "rating_count",
         ]
         read_only_fields = ["id", "slug", "created_at", "teacher"]
-
-
-class EnrollmentSerializer(serializers.ModelSerializer):
+        field_sources = {
+            "enrollment_count": ["stats__active_enrollments"],
+            "rating_avg": ["stats__rating_sum", "stats__rating_count"],
+            "rating_count": ["stats__rating_count"],
+        }
+
+    # Read from the denormalized CourseStats row (select_related by the viewset).
+    @staticmethod
+    def _stats(obj):
+        try:
+            return obj.stats
+        except CourseStats.DoesNotExist:
+            return None
+
+    def get_enrollment_count(self, obj) -> int:
+        stats = self._stats(obj)
+        return stats.active_enrollments if stats else 0
+
+    def get_rating_avg(self, obj) -> float | None:
+        stats = self._stats(obj)
+        return stats.rating_avg if stats else None
+
+    def get_rating_count(self, obj) -> int:
+        stats = self._stats(obj)
+        return stats.rating_count if stats else 0
+
+    # the same from a values() row (api/fastpath.py); no stats row gives None
+    @staticmethod
+    def row_enrollment_count(row):
+        return row["stats__active_enrollments"] or 0
+
+    @staticmethod
+    def row_rating_avg(row):
+        return CourseStats.average(row["stats__rating_sum"], row["stats__rating_count"])
+
+    @staticmethod
+    def row_rating_count(row):
+        return row["stats__rating_count"] or 0
+
+
+class EnrollmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student = PublicUserSerializer(read_only=True)
     course = serializers.PrimaryKeyRelatedField(queryset=Course.objects.all())
 
@@ -39,25 +90,51 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         model = Enrollment
         fields = ["id", "student", "course", "status", "created_at"]
         read_only_fields = ["id", "student", "status", "created_at"]
+        expandable = {"course": CourseSummarySerializer}
 
-class MaterialSerializer(serializers.ModelSerializer):
+class MaterialSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     file = serializers.FileField(required=True)  # <-- explicit, so Spectacular flags it as binary
 
     class Meta:
         model = Material
         fields = ["id", "course", "title", "file", "created_at"]
         read_only_fields = ["id", "created_at"]
+        expandable = {"course": CourseSummarySerializer}
 
-class FeedbackSerializer(serializers.ModelSerializer):
+class FeedbackSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     student = PublicUserSerializer(read_only=True)
 
     class Meta:
         model = Feedback
         fields = ["id", "course", "student", "rating", "comment", "created_at"]
         read_only_fields = ["id", "student", "created_at"]
+        expandable = {"course": CourseSummarySerializer}
+
+class SubmissionSerializer(serializers.ModelSerializer):
+    student = serializers.CharField(source="student.username", read_only=True)
+
+    class Meta:
+        model = Submission
+        fields = ["id", "assignment", "student", "file", "text", "submitted_at", "grade", "feedback"]
+        read_only_fields = fields
+
+# --- Bulk actions (api/bulk.py); each validates one item ---
+class BulkEnrollmentItemSerializer(serializers.Serializer):
+    course = serializers.IntegerField()
+    student = serializers.CharField(max_length=150, help_text="Username")
+
+class SubmissionGradeItemSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    grade = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=Decimal("0"), allow_null=True, required=False)
+    feedback = serializers.CharField(allow_blank=True, required=False)
+
+    def validate(self, attrs):
+        if "grade" not in attrs and "feedback" not in attrs:
+            raise serializers.ValidationError("Give a grade, feedback or both.")
+        return attrs
 
 # --- Social ---
-class StatusUpdateSerializer(serializers.ModelSerializer):
+class StatusUpdateSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     author = PublicUserSerializer(read_only=True)
 
     class Meta:
@@ -65,8 +142,42 @@ class StatusUpdateSerializer(serializers.ModelSerializer):
         fields = ["id", "author", "text", "created_at"]
         read_only_fields = ["id", "author", "created_at"]
 
+_PAYLOAD_COLUMNS = [
+    "type", "count", "course", "course__title", "course__slug", "actor", "actor__username",
+    "material", "material__title", "material__file",
+]
+
 class NotificationSerializer(serializers.ModelSerializer):
+    # rows store typed ids; the string type and payload are rendered on read
+    type = serializers.CharField(source="type_code", read_only=True)
+    payload = serializers.JSONField(read_only=True)
+    text = serializers.CharField(read_only=True)
+
     class Meta:
         model = Notification
-        fields = ["id", "type", "payload", "is_read", "created_at"]
-        read_only_fields = ["id", "type", "payload", "created_at"]
+        fields = ["id", "type", "payload", "text", "is_read", "created_at"]
+        read_only_fields = ["id", "type", "payload", "text", "created_at"]
+        field_sources = {
+            "type": ["type"],
+            "payload": _PAYLOAD_COLUMNS,
+            "text": _PAYLOAD_COLUMNS,
+        }
+
+    # the same from a values() row (api/fastpath.py)
+    @staticmethod
+    def row_type(row):
+        return Notification.TYPE_CODES.get(row["type"], "")
+
+    @staticmethod
+    def row_payload(row):
+        return Notification.build_payload(
+            row["type"], row["count"],
+            course_id=row["course"], course_title=row["course__title"], course_slug=row["course__slug"],
+            actor_id=row["actor"], actor_username=row["actor__username"],
+            material_id=row["material"],
+            material_title=row["material"] and (row["material__title"] or row["material__file"]),
+        )
+
+    @classmethod
+    def row_text(cls, row):
+        return Notification.build_text(row["type"], row["count"], cls.row_payload(row))
@@ -0,0 +1,68 @@
+# api/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from courses.models import Course, Enrollment, Feedback, Material, courses_bulk_created
+from courses.signals import enrollments_bulk_created
+from social.models import Notification, notifications_changed
+
+from .etags import bump
+
+User = get_user_model()
+
+# Bump the ETag scopes of api/ views (see api/etags.py). A course's list
+# entry shows its teacher and CourseStats, so enrolment and feedback writes
+# bump that course and its teacher's list; "courses" itself is only bumped
+# when courses come or go.
+
+def course_scopes(course_ids):
+    """``course:<id>`` and ``courses:teacher:<id>`` for these courses."""
+    rows = Course.objects.filter(id__in=set(course_ids)).values_list("id", "teacher_id")
+    return [scope for course_id, teacher_id in rows
+            for scope in (f"course:{course_id}", f"courses:teacher:{teacher_id}")]
+
+@receiver(post_save, sender=User)
+def teacher_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {"last_login"}:
+        return
+    if getattr(instance, "role", None) == "teacher":
+        courses = Course.objects.filter(teacher=instance).values_list("id", flat=True)
+        bump(f"courses:teacher:{instance.id}", *(f"course:{cid}" for cid in courses))
+
+@receiver([post_save, post_delete], sender=Course)
+def course_changed(sender, instance, created=False, **kwargs):
+    scopes = [f"course:{instance.id}", f"courses:teacher:{instance.teacher_id}",
+              f"materials:teacher:{instance.teacher_id}"]
+    if created or kwargs["signal"] is post_delete:
+        scopes.append("courses")
+    bump(*scopes)
+
+@receiver(courses_bulk_created)
+def courses_bulk_changed(sender, courses, **kwargs):
+    bump("courses", *{f"courses:teacher:{c.teacher_id}" for c in courses})
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    bump(*course_scopes([instance.course_id]), f"enrollments:user:{instance.student_id}")
+
+@receiver(enrollments_bulk_created)
+def enrollments_bulk_changed(sender, members, **kwargs):
+    bump(*course_scopes(members), *(f"enrollments:user:{sid}" for ids in members.values() for sid in ids))
+
+@receiver([post_save, post_delete], sender=Feedback)
+def feedback_changed(sender, instance, **kwargs):
+    bump(*course_scopes([instance.course_id]))
+
+@receiver([post_save, post_delete], sender=Material)
+def material_changed(sender, instance, **kwargs):
+    teacher_id = Course.objects.filter(id=instance.course_id).values_list("teacher_id", flat=True).first()
+    bump(f"materials:course:{instance.course_id}", f"materials:teacher:{teacher_id}")
+
+@receiver(post_save, sender=Notification)
+def notification_changed(sender, instance, **kwargs):
+    bump(f"notifications:user:{instance.recipient_id}")
+
+@receiver(notifications_changed)
+def notifications_bulk_changed(sender, user_ids, **kwargs):
+    bump(*(f"notifications:user:{uid}" for uid in user_ids))
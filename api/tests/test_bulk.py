@@ -0,0 +1,145 @@
+# api/tests/test_bulk.py
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api import bulk
+from courses.membership import course_members
+from courses.models import Assignment, Course, CourseStats, Enrollment, EnrollmentQuerySet, Submission
+from social.models import Notification, NotificationCounter
+
+User = get_user_model()
+
+
+class BulkActionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.other_teacher = User.objects.create_user(username="other", password="x", role="teacher")
+        self.course = Course.objects.create(title="Algebra", teacher=self.teacher)
+        self.foreign = Course.objects.create(title="Biology", teacher=self.other_teacher)
+        self.students = [User.objects.create_user(username=f"s{i}", password="x", role="student") for i in range(4)]
+
+    def test_bulk_enrolment_reports_each_item(self):
+        Enrollment.objects.create(course=self.course, student=self.students[0], status=Enrollment.Status.ACTIVE)
+        self.client.force_authenticate(self.teacher)
+        items = [
+            {"course": self.course.id, "student": "s0"},
+            {"course": self.course.id, "student": "s1"},
+            {"course": self.course.id, "student": "s2"},
+            {"course": self.course.id, "student": "s2"},
+            {"course": self.course.id, "student": "nobody"},
+            {"course": self.foreign.id, "student": "s3"},
+            {"course": "x"},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.post(reverse("enrollments-bulk"), items, format="json")
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data["created"], 2)
+        self.assertEqual([r["status"] for r in resp.data["results"]],
+                         ["exists", "created", "created", "duplicate", "not_found", "forbidden", "invalid"])
+        self.assertEqual(set(course_members.students(self.course.id)), {s.id for s in self.students[:3]})
+        self.assertEqual(CourseStats.objects.get(course=self.course).active_enrollments, 3)
+        inserts = [q for q in queries.captured_queries
+                   if q["sql"].startswith("INSERT") and 'INTO "courses_enrollment"' in q["sql"]]
+        self.assertEqual(len(inserts), 1)
+
+    def test_concurrent_enrolments_are_reported_and_counted_once(self):
+        bulk_create = EnrollmentQuerySet.bulk_create
+
+        def racing_bulk_create(queryset, objs, **kwargs):
+            # another request enrols s2 between our read and our insert
+            if not Enrollment.objects.filter(student=self.students[2]).exists():
+                Enrollment.objects.create(course=self.course, student=self.students[2],
+                                          status=Enrollment.Status.ACTIVE)
+            return bulk_create(queryset, objs, **kwargs)
+
+        self.client.force_authenticate(self.teacher)
+        items = [{"course": self.course.id, "student": "s1"}, {"course": self.course.id, "student": "s2"}]
+        with mock.patch.object(EnrollmentQuerySet, "bulk_create", autospec=True, side_effect=racing_bulk_create):
+            resp = self.client.post(reverse("enrollments-bulk"), items, format="json")
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data["created"], 1)
+        self.assertEqual([(r["status"], r.get("enrollment_status")) for r in resp.data["results"]],
+                         [("created", None), ("exists", "active")])
+        self.assertEqual(CourseStats.objects.get(course=self.course).active_enrollments, 2)
+
+    def test_bulk_enrolment_is_for_teachers(self):
+        self.client.force_authenticate(self.students[0])
+        resp = self.client.post(reverse("enrollments-bulk"), [{"course": self.course.id, "student": "s1"}],
+                                format="json")
+        self.assertEqual(resp.status_code, 403)
+
+    def test_too_many_items_are_rejected(self):
+        self.client.force_authenticate(self.teacher)
+        resp = self.client.post(reverse("enrollments-bulk"), {"course": self.course.id}, format="json")
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post(reverse("notifications-mark-read"), list(range(bulk.MAX_ITEMS + 1)), format="json")
+        self.assertEqual(resp.status_code, 400)
+
+    def test_mark_read_by_ids(self):
+        student = self.students[0]
+        mine = Notification.objects.bulk_create(
+            [Notification(recipient=student, type=Notification.Type.NEW_MATERIAL) for _ in range(3)]
+        )
+        theirs = Notification.objects.create(recipient=self.students[1], type=Notification.Type.NEW_MATERIAL)
+        mine[2].is_read = True
+        mine[2].save()
+        NotificationCounter.objects.create(user=student, unread=2)
+        self.client.force_authenticate(student)
+
+        ids = [mine[0].id, mine[1].id, mine[0].id, mine[2].id, theirs.id, "x"]
+        resp = self.client.post(reverse("notifications-mark-read"), ids, format="json")
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data["updated"], 2)
+        self.assertEqual([r["status"] for r in resp.data["results"]],
+                         ["marked", "marked", "already_read", "already_read", "not_found", "invalid"])
+        self.assertEqual(NotificationCounter.unread_for(student.id), 0)
+        self.assertFalse(Notification.objects.get(id=theirs.id).is_read)
+
+    def test_bulk_grade(self):
+        due = timezone.now() + timedelta(days=1)
+        mine = Assignment.objects.create(course=self.course, title="HW1", due_date=due)
+        foreign = Assignment.objects.create(course=self.foreign, title="Lab", due_date=due)
+        subs = [Submission.objects.create(assignment=mine, student=s, text="answer") for s in self.students[:2]]
+        other = Submission.objects.create(assignment=foreign, student=self.students[2], text="answer")
+        self.client.force_authenticate(self.teacher)
+
+        items = [
+            {"id": subs[0].id, "grade": "8.50", "feedback": "Good"},
+            {"id": subs[1].id, "feedback": "Late"},
+            {"id": other.id, "grade": "1"},
+            {"id": subs[1].id},
+            {"id": subs[0].id, "grade": "-1"},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.post(reverse("submissions-grade"), items, format="json")
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data["updated"], 2)
+        self.assertEqual([r["status"] for r in resp.data["results"]],
+                         ["updated", "updated", "not_found", "invalid", "invalid"])
+        subs[0].refresh_from_db()
+        subs[1].refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((str(subs[0].grade), subs[0].feedback), ("8.50", "Good"))
+        self.assertEqual((subs[1].grade, subs[1].feedback), (None, "Late"))
+        self.assertIsNone(other.grade)
+        self.assertEqual(len([q for q in queries.captured_queries if q["sql"].startswith("UPDATE")]), 1)
+
+        listed = self.client.get(reverse("submissions-list"), {"assignment": mine.id})
+        self.assertEqual({s["student"] for s in listed.data["results"]}, {"s0", "s1"})
+
+    def test_non_integer_filters_are_rejected(self):
+        self.client.force_authenticate(self.teacher)
+        for name, url in (("assignment", "submissions-list"), ("course", "materials-list"), ("course", "feedback-list")):
+            with self.subTest(url=url):
+                resp = self.client.get(reverse(url), {name: "abc"})
+                self.assertEqual(resp.status_code, 400)
+                self.assertIn(name, resp.data)
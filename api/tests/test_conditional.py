@@ -0,0 +1,139 @@
+# api/tests/test_conditional.py
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.serializers import CourseSerializer
+from courses.models import Course, Enrollment, Material
+from social import fanout
+from social.models import Notification
+
+User = get_user_model()
+
+
+@override_settings(SHARED_CACHE=True)
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.student = User.objects.create_user(username="stud", password="x", role="student")
+        self.course = Course.objects.create(title="Algebra", teacher=self.teacher)
+        Enrollment.objects.create(course=self.course, student=self.student, status=Enrollment.Status.ACTIVE)
+        self.client.force_authenticate(self.student)
+
+    def _etag(self, url, **params):
+        resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, 200)
+        return resp["ETag"]
+
+    def test_matching_etag_is_answered_without_query_or_serializer(self):
+        url = reverse("notifications-list")
+        etag = self._etag(url)
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp["ETag"], etag)
+        self.assertIn("Last-Modified", resp)
+        self.assertEqual(len(queries), 0)
+
+    def test_catalogue_revalidation_reads_only_the_page_ids(self):
+        url = reverse("courses-list")
+        etag = self._etag(url)
+        with CaptureQueriesContext(connection) as queries, \
+                mock.patch.object(CourseSerializer, "to_representation") as render:
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        render.assert_not_called()
+
+    def test_enrolments_only_change_the_pages_showing_that_course(self):
+        other_teacher = User.objects.create_user(username="other", password="x", role="teacher")
+        Course.objects.create(title="Zoology", teacher=other_teacher)
+        url = reverse("courses-list")
+        first_page = self._etag(url, limit=1)  # Algebra
+        self.client.force_authenticate(self.teacher)
+        mine = self._etag(url)
+        zoology = Course.objects.get(title="Zoology")
+        Enrollment.objects.create(course=zoology, student=self.student, status=Enrollment.Status.ACTIVE)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=mine).status_code, 304)
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(url, {"limit": 1}, HTTP_IF_NONE_MATCH=first_page).status_code, 304)
+
+    def test_bulk_created_courses_change_the_etag(self):
+        self.client.force_authenticate(self.teacher)
+        url = reverse("courses-list")
+        etag = self._etag(url)
+        Course.objects.bulk_create_with_slugs([Course(title="Geometry", teacher=self.teacher)])
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data["results"]), 2)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_responses_are_not_conditional_without_a_shared_cache(self):
+        resp = self.client.get(reverse("courses-list"))
+        self.assertNotIn("ETag", resp)
+
+    def test_course_etag_follows_courses_and_their_stats(self):
+        url = reverse("courses-list")
+        first = self._etag(url)
+        self.assertEqual(self._etag(url), first)
+        self.assertNotEqual(self._etag(url, sort="title"), first)  # another query, another body
+
+        other = User.objects.create_user(username="other", password="x", role="student")
+        Enrollment.objects.create(course=self.course, student=other, status=Enrollment.Status.ACTIVE)
+        second = self._etag(url)
+        self.assertNotEqual(second, first)
+
+        self.course.title = "Algebra I"
+        self.course.save()
+        self.assertNotEqual(self._etag(url), second)
+        detail = reverse("courses-detail", args=[self.course.id])
+        etag = self._etag(detail)
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_material_etag_follows_the_course_and_membership(self):
+        url = reverse("materials-list")
+        first = self._etag(url, course=self.course.id)
+        Material.objects.create(course=self.course, title="Notes", file=SimpleUploadedFile("n.txt", b"x"))
+        second = self._etag(url, course=self.course.id)
+        self.assertNotEqual(second, first)
+
+        Course.objects.create(title="Unrelated", teacher=self.teacher)  # no material change for this course
+        self.assertEqual(self._etag(url, course=self.course.id), second)
+
+        Enrollment.objects.filter(student=self.student).get().delete()
+        self.assertNotEqual(self._etag(url, course=self.course.id), second)
+
+    def test_notification_etag_follows_bulk_writes(self):
+        url = reverse("notifications-list")
+        first = self._etag(url)
+        fanout.deliver([self.student.id], Notification.Type.NEW_MATERIAL, course=self.course)
+        second = self._etag(url)
+        self.assertNotEqual(second, first)
+
+        self.client.post(reverse("notifications-mark-all-read"))
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=second)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.data["results"][0]["is_read"])
+
+    def test_notification_etag_follows_cascade_deletes(self):
+        url = reverse("notifications-list")
+        fanout.deliver([self.student.id], Notification.Type.NEW_MATERIAL, course=self.course)
+        etag = self._etag(url)
+        self.course.delete()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["results"], [])
+
+    def test_other_users_changes_keep_the_etag(self):
+        url = reverse("notifications-list")
+        etag = self._etag(url)
+        Notification.objects.create(recipient=self.teacher, type=Notification.Type.NEW_MATERIAL)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
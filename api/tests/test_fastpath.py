@@ -0,0 +1,82 @@
+# api/tests/test_fastpath.py
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from api.fastpath import compile_rows
+from api.renderers import FastJSONRenderer
+from api.serializers import CourseSerializer, MaterialSerializer, NotificationSerializer
+from api.views import CourseViewSet, NotificationViewSet
+from courses.models import Course, CourseStats, Enrollment, Feedback, Material
+from social.models import Notification
+
+User = get_user_model()
+
+
+class FastListTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher",
+                                                display_name="Ms T", bio="Maths and more")
+        self.student = User.objects.create_user(username="stud", password="x", role="student")
+        self.course = Course.objects.create(title="Algebra", teacher=self.teacher, description="Ünïcode")
+        Course.objects.create(title="Geometry", teacher=self.teacher)
+        CourseStats.objects.filter(course__title="Geometry").delete()  # rendered as zeros
+        Enrollment.objects.create(course=self.course, student=self.student, status=Enrollment.Status.ACTIVE)
+        Feedback.objects.create(course=self.course, student=self.student, rating=4)
+        self.client.force_authenticate(self.student)
+
+    def test_only_mappable_serializers_compile(self):
+        self.assertIsNotNone(compile_rows(CourseSerializer()))
+        self.assertIsNotNone(compile_rows(NotificationSerializer()))
+        self.assertIsNone(compile_rows(MaterialSerializer()))  # file URLs need the instance
+
+    def _both(self, view, url, params):
+        fast = self.client.get(url, params)
+        with mock.patch.object(view, "fast_list", False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, 200)
+        return fast.content, slow.content
+
+    def test_courses_match_the_serializer(self):
+        url = reverse("courses-list")
+        for params in ({}, {"sort": "popular"}, {"sort": "rating"}, {"sort": "newest", "limit": 1},
+                       {"fields": "id,teacher,rating_avg"}):
+            with self.subTest(params=params):
+                fast, slow = self._both(CourseViewSet, url, params)
+                self.assertEqual(fast, slow)
+
+    def test_notifications_match_the_serializer(self):
+        material = Material.objects.create(course=self.course, title="", file="materials/week1.pdf")
+        Notification.objects.all().delete()
+        Notification.objects.bulk_create([
+            Notification(recipient=self.student, type=Notification.Type.ENROLMENT, course=self.course, actor=self.teacher),
+            Notification(recipient=self.student, type=Notification.Type.ENROLMENT, course=self.course, count=3),
+            Notification(recipient=self.student, type=Notification.Type.NEW_MATERIAL, course=self.course, material=material),
+            Notification(recipient=self.student, type=Notification.Type.NEW_MATERIAL, course=self.course, count=2),
+            Notification(recipient=self.student, type=Notification.Type.REMOVED, course=self.course, actor=self.teacher),
+            Notification(recipient=self.student, type=Notification.Type.REMOVED, is_read=True),
+        ])
+        fast, slow = self._both(NotificationViewSet, reverse("notifications-list"), {})
+        self.assertEqual(fast, slow)
+        self.assertIn(b"week1.pdf", fast)
+
+    def test_renderer_shares_one_encoder(self):
+        self.client.get(reverse("courses-list"))
+        encoder = FastJSONRenderer._get_encoder()
+        self.client.get(reverse("courses-list"))
+        self.assertIs(FastJSONRenderer()._get_encoder(), encoder)
+
+    def test_next_cursor_reads_the_row(self):
+        url = reverse("courses-list")
+        first = self.client.get(url, {"sort": "popular", "limit": 1})
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(first.data["next"])
+        self.assertEqual([c["title"] for c in first.data["results"] + second.data["results"]],
+                         ["Algebra", "Geometry"])
+        self.assertEqual(len([q for q in queries.captured_queries if "courses_course" in q["sql"]]), 1)
@@ -0,0 +1,73 @@
+# api/tests/test_fieldsets.py
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from courses.models import Course, Enrollment, Feedback, Material
+
+User = get_user_model()
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.student = User.objects.create_user(username="stud", password="x", role="student")
+        self.course = Course.objects.create(title="Algebra", teacher=self.teacher)
+        Enrollment.objects.create(course=self.course, student=self.student, status=Enrollment.Status.ACTIVE)
+        Feedback.objects.create(course=self.course, student=self.student, rating=4)
+        self.client.force_authenticate(self.student)
+
+    def _get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url, params)
+        self.assertEqual(resp.status_code, 200, resp.data)
+        sql = [q["sql"] for q in queries.captured_queries if '"courses_' in q["sql"] or '"accounts_' in q["sql"]]
+        return resp, sql[-1]
+
+    def test_default_response_is_unchanged(self):
+        resp, sql = self._get(reverse("courses-list"))
+        course = resp.data["results"][0]
+        self.assertEqual(course["teacher"]["username"], "teach")
+        self.assertEqual(course["enrollment_count"], 1)
+        self.assertEqual(course["rating_avg"], 4.0)
+        self.assertIn("accounts_user", sql)
+        self.assertIn("courses_coursestats", sql)
+
+    def test_fields_drop_columns_and_joins(self):
+        resp, sql = self._get(reverse("courses-list"), fields="id,title")
+        self.assertEqual(resp.data["results"], [{"id": self.course.id, "title": "Algebra"}])
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn("description", sql)
+
+        resp, sql = self._get(reverse("courses-list"), fields="id,enrollment_count", sort="popular")
+        self.assertEqual(resp.data["results"], [{"id": self.course.id, "enrollment_count": 1}])
+        self.assertNotIn("accounts_user", sql)
+
+    def test_fields_narrow_the_materials_query(self):
+        Material.objects.create(course=self.course, title="Week 1", file="materials/week1.pdf")
+        resp, sql = self._get(reverse("materials-list"), fields="id,title")
+        self.assertEqual([set(m) for m in resp.data["results"]], [{"id", "title"}])
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn('"file"', sql)
+
+    def test_expand_nests_the_course(self):
+        url = reverse("feedback-list")
+        resp, sql = self._get(url, fields="id,course")
+        self.assertEqual(resp.data["results"], [{"id": resp.data["results"][0]["id"], "course": self.course.id}])
+        self.assertNotIn("JOIN", sql)
+
+        resp, sql = self._get(url, fields="id,course", expand="course")
+        self.assertEqual(resp.data["results"][0]["course"],
+                         {"id": self.course.id, "title": "Algebra", "slug": self.course.slug})
+        self.assertIn("JOIN", sql)
+        self.assertNotIn("accounts_user", sql)
+
+    def test_writes_ignore_the_parameters(self):
+        self.client.force_authenticate(self.teacher)
+        resp = self.client.post(reverse("courses-list") + "?fields=id", {"title": "Geometry"})
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data["teacher"]["username"], "teach")
@@ -0,0 +1,89 @@
+# api/tests/test_pagination.py
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.pagination import encode_cursor
+from courses.models import Course, CourseStats
+from social.models import Notification
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.student = User.objects.create_user(username="stud", password="x", role="student")
+
+    def _walk(self, url, params=None):
+        pages, seen = 0, []
+        resp = self.client.get(url, params or {})
+        while True:
+            self.assertEqual(resp.status_code, 200, resp.data)
+            self.assertNotIn("count", resp.data)
+            seen.extend(resp.data["results"])
+            pages += 1
+            if not resp.data["next"]:
+                return pages, seen
+            resp = self.client.get(resp.data["next"])
+
+    def test_pages_are_stable_when_sort_keys_tie(self):
+        Notification.objects.bulk_create(
+            [Notification(recipient=self.student, type=Notification.Type.NEW_MATERIAL) for _ in range(7)]
+        )
+        Notification.objects.update(created_at=timezone.now())  # every row ties on created_at
+        self.client.force_authenticate(self.student)
+        pages, seen = self._walk(reverse("notifications-list"), {"limit": 3})
+        self.assertEqual(pages, 3)
+        ids = [n["id"] for n in seen]
+        self.assertEqual(ids, sorted(Notification.objects.values_list("id", flat=True), reverse=True))
+
+    def test_deep_page_costs_the_same_as_the_first(self):
+        Notification.objects.bulk_create(
+            [Notification(recipient=self.student, type=Notification.Type.NEW_MATERIAL) for _ in range(30)]
+        )
+        self.client.force_authenticate(self.student)
+        url = reverse("notifications-list")
+        first = self.client.get(url, {"limit": 5})
+        with CaptureQueriesContext(connection) as page_one:
+            self.client.get(url, {"limit": 5})
+        resp = first
+        for _ in range(4):
+            resp = self.client.get(resp.data["next"])
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(resp.data["next"])
+        self.assertEqual(len(deep), len(page_one))
+        sql = " ".join(q["sql"] for q in deep.captured_queries).upper()
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_invalid_cursor_is_rejected(self):
+        self.client.force_authenticate(self.student)
+        resp = self.client.get(reverse("notifications-list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(resp.status_code, 404)
+
+    def test_cursor_with_bad_values_is_rejected(self):
+        self.client.force_authenticate(self.student)
+        for url in (reverse("submissions-list"), reverse("notifications-list")):
+            for values in (["notadate", 1], ["2025-01-01T00:00:00+00:00", "x"], [{}, 1]):
+                with self.subTest(url=url, values=values):
+                    resp = self.client.get(url, {"cursor": encode_cursor(values)})
+                    self.assertEqual(resp.status_code, 404)
+
+    def test_users_are_ordered_by_username(self):
+        for name in ["zed", "amy", "kim"]:
+            User.objects.create_user(username=name, password="x")
+        self.client.force_authenticate(self.student)
+        _, seen = self._walk(reverse("users-list"), {"limit": 2})
+        self.assertEqual([u["username"] for u in seen], ["amy", "kim", "stud", "teach", "zed"])
+
+    def test_catalogue_sort_pages_by_popularity(self):
+        courses = [Course.objects.create(title=f"C{i}", teacher=self.teacher) for i in range(5)]
+        for i, course in enumerate(courses):
+            CourseStats.objects.filter(course=course).update(active_enrollments=i % 2)
+        self.client.force_authenticate(self.student)
+        _, seen = self._walk(reverse("courses-list"), {"sort": "popular", "limit": 2})
+        self.assertEqual([c["title"] for c in seen], ["C1", "C3", "C0", "C2", "C4"])
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     MeViewSet, PublicUserViewSet,
     CourseViewSet, EnrollmentViewSet, MaterialViewSet, FeedbackViewSet,
-    StatusUpdateViewSet, NotificationViewSet
+    StatusUpdateViewSet, NotificationViewSet, SubmissionViewSet
 )
 
 router = DefaultRouter()
@@ -15,6 +15,7 @@ router.register(r"materials", MaterialViewSet, basename="materials")
 router.register(r"feedback", FeedbackViewSet, basename="feedback")
 router.register(r"status-updates", StatusUpdateViewSet, basename="status-updates")
 router.register(r"notifications", NotificationViewSet, basename="notifications")
+router.register(r"submissions", SubmissionViewSet, basename="submissions")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -1,12 +1,16 @@
 from rest_framework import viewsets, mixins, permissions, status
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
 from rest_framework.request import Request
 from typing import cast
 from rest_framework.parsers import MultiPartParser, FormParser
-from drf_spectacular.utils import extend_schema_view, extend_schema
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
 from typing import cast
 from courses.models import Course
 from api.serializers import CourseSerializer
@@ -15,17 +19,36 @@ from api.permissions import IsTeacher
 
 
 
+from . import bulk
+from .etags import ConditionalGetMixin
+from .fastpath import FastListMixin
+from .fieldsets import SparseFieldsFilter
 from .permissions import IsTeacher, IsOwnerOrReadOnly, IsAuthenticatedReadOnly
 from .serializers import (
     PublicUserSerializer, MeSerializer,
     CourseSerializer, EnrollmentSerializer, MaterialSerializer, FeedbackSerializer,
-    StatusUpdateSerializer, NotificationSerializer
+    StatusUpdateSerializer, NotificationSerializer, SubmissionSerializer,
+    BulkEnrollmentItemSerializer, SubmissionGradeItemSerializer,
 )
-from courses.models import Course, Enrollment, Material, Feedback
-from social.models import StatusUpdate, Notification
+from courses.membership import course_members
+from courses.models import Course, Enrollment, Material, Feedback, Submission
+from social.models import StatusUpdate, Notification, NotificationCounter, notifications_changed
+from social import timeline
+from social.push import publish_unread
 
 User = get_user_model()
 
+
+def _id_param(request, name):
+    """``?<name>=`` as an int, None when absent; 400 when it isn't one."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: "A valid integer is required."})
+
 # ----- Users -----
 class MeViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
@@ -37,11 +60,20 @@ class PublicUserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = PublicUserSerializer
     lookup_field = "username"
+    keyset = ("username",)  # unique, so no id tie-break is needed
     permission_classes = [permissions.IsAuthenticated]  # profiles are visible to logged-in users
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
     serializer_class = CourseSerializer
+    filter_backends = [SparseFieldsFilter]  # ?fields= / ?expand=, see api/fieldsets.py
+    # keyset per catalogue ?sort= (see api/pagination.py); nullable stats are coalesced
+    CATALOGUE_KEYSETS = {
+        "popular": ("-popularity", "title", "id"),
+        "rating": ("-rating_key", "-rating_n", "title", "id"),
+        "newest": ("-created_at", "-id"),
+        "title": ("title", "id"),
+    }
 
     # def get_queryset(self):
     #     user = self.request.user
@@ -51,11 +83,50 @@ class CourseViewSet(viewsets.ModelViewSet):
 
     # api/views.py  (inside CourseViewSet)
     def get_queryset(self):
+        user = self.request.user
+        qs = Course.objects.select_related("teacher", "stats")
+        if getattr(user, "role", None) == "teacher":
+            return qs.filter(teacher=user).order_by("id")
+        # let students see available courses via the API,
+        # optionally ?sort=popular|rating|newest and ?min_rating=
+        req = cast(Request, self.request)
+        sort = req.query_params.get("sort")
+        min_rating = req.query_params.get("min_rating")
+        if sort or min_rating:
+            try:
+                min_rating = float(min_rating) if min_rating else None
+            except ValueError:
+                min_rating = None
+            qs = qs.catalogue(sort=sort or "title", min_rating=min_rating)
+            if sort == "popular":
+                qs = qs.annotate(popularity=Coalesce("stats__active_enrollments", 0))
+            elif sort == "rating":
+                qs = qs.annotate(rating_key=Coalesce("rating_avg", Value(-1.0)),
+                                 rating_n=Coalesce("stats__rating_count", 0))
+            return qs
+        return qs.order_by("id")
+
+    def get_keyset(self):
+        params = self.request.query_params
+        if getattr(self.request.user, "role", None) == "teacher" or not (params.get("sort") or params.get("min_rating")):
+            return ("id",)
+        return self.CATALOGUE_KEYSETS.get(params.get("sort"), self.CATALOGUE_KEYSETS["title"])
+
+    def get_etag_scopes(self):
+        # "courses" is bumped when courses come or go; the rest per course or per teacher
         user = self.request.user
         if getattr(user, "role", None) == "teacher":
-            return Course.objects.filter(teacher=user).order_by("id")
-        # let students see available courses via the API
-        return Course.objects.all().order_by("id")
+            return ["courses", f"courses:teacher:{user.id}"]
+        if self.action == "retrieve":
+            return ["courses", f"course:{self.kwargs['pk']}"]
+        # the catalogue: stamp the courses on this page, found with one narrow query
+        keys = [key.lstrip("-") for key in self.paginator.get_keyset(self)]
+        rows = self.get_queryset().values(*dict.fromkeys(["id", *keys]))
+        page = self.paginator.paginate_queryset(rows, self.request, view=self)
+        return ["courses", *(f"course:{row['id']}" for row in page)]
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
 
 
     def get_permissions(self):
@@ -72,7 +143,9 @@ class EnrollmentViewSet(mixins.CreateModelMixin,
                         mixins.ListModelMixin,
                         viewsets.GenericViewSet):
     serializer_class = EnrollmentSerializer
+    filter_backends = [SparseFieldsFilter]
     permission_classes = [permissions.IsAuthenticated]
+    keyset = ("-created_at", "-id")
 
     def get_queryset(self):
         user = self.request.user
@@ -85,6 +158,13 @@ class EnrollmentViewSet(mixins.CreateModelMixin,
         # Student self-enrols
         serializer.save(student=self.request.user, status=Enrollment.Status.ACTIVE)
 
+    @extend_schema(request=BulkEnrollmentItemSerializer(many=True), responses=OpenApiTypes.OBJECT)
+    @action(detail=False, methods=["post"], permission_classes=[IsTeacher])
+    def bulk(self, request):
+        """Enrol a list of students (by username) in the caller's courses; one result per item."""
+        created, results = bulk.enroll(request.user, request.data)
+        return Response({"created": created, "results": results})
+
 # ----- Materials -----
 
 # @extend_schema_view(
@@ -126,13 +206,16 @@ class EnrollmentViewSet(mixins.CreateModelMixin,
         responses=MaterialSerializer,
     )
 )
-class MaterialViewSet(mixins.CreateModelMixin,
+class MaterialViewSet(ConditionalGetMixin,
+                      mixins.CreateModelMixin,
                       mixins.ListModelMixin,
                       mixins.DestroyModelMixin,
                       viewsets.GenericViewSet):
     serializer_class = MaterialSerializer
+    filter_backends = [SparseFieldsFilter]
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    keyset = ("-created_at", "-id")
 
     def get_permissions(self):
         # Teachers only for create/destroy; anyone logged in may list their accessible materials
@@ -146,14 +229,24 @@ class MaterialViewSet(mixins.CreateModelMixin,
         if getattr(user, "role", None) == "teacher":
             qs = qs.filter(course__teacher=user)
         else:
-            qs = qs.filter(course__enrollments__student=user,
-                           course__enrollments__status="active")
+            qs = qs.filter(course_id__in=Enrollment.objects.filter(
+                student=user, status=Enrollment.Status.ACTIVE).values("course_id"))
 
-        course_id = self.request.query_params.get("course")
-        if course_id:
+        course_id = _id_param(self.request, "course")
+        if course_id is not None:
             qs = qs.filter(course_id=course_id)
         return qs.order_by("-created_at")
 
+    def get_etag_scopes(self):
+        user = self.request.user
+        if getattr(user, "role", None) == "teacher":
+            return [f"materials:teacher:{user.id}"]
+        try:
+            course_ids = [int(self.request.query_params["course"])]
+        except (KeyError, ValueError):
+            course_ids = sorted(course_members.courses_of(user.id))
+        return [f"enrollments:user:{user.id}", *(f"materials:course:{cid}" for cid in course_ids)]
+
     def perform_create(self, serializer):
         course = serializer.validated_data["course"]
         # Only the owning teacher may upload
@@ -170,14 +263,15 @@ class FeedbackViewSet(mixins.CreateModelMixin,
                       mixins.ListModelMixin,
                       viewsets.GenericViewSet):
     serializer_class = FeedbackSerializer
+    filter_backends = [SparseFieldsFilter]
     permission_classes = [permissions.IsAuthenticated]
+    keyset = ("-created_at", "-id")
 
     def get_queryset(self):
         # Public read on course page later; API requires auth
         qs = Feedback.objects.select_related("course", "student")
-        req = cast(Request, self.request)
-        course_id = req.query_params.get("course")
-        if course_id:
+        course_id = _id_param(self.request, "course")
+        if course_id is not None:
             qs = qs.filter(course_id=course_id)
         return qs
 
@@ -187,7 +281,9 @@ class FeedbackViewSet(mixins.CreateModelMixin,
 # ----- Status Updates -----
 class StatusUpdateViewSet(viewsets.ModelViewSet):
     serializer_class = StatusUpdateSerializer
+    filter_backends = [SparseFieldsFilter]
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
+    keyset = ("-created_at", "-id")
 
     def get_queryset(self):
         qs = StatusUpdate.objects.select_related("author")
@@ -200,18 +296,97 @@ class StatusUpdateViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @extend_schema(parameters=[
+        OpenApiParameter("cursor", str, description="`next` from the previous page"),
+        OpenApiParameter("limit", int),
+    ])
+    @action(detail=False, methods=["get"])
+    def feed(self, request):
+        """The caller's classmates feed, keyset-paginated on (created_at, id)."""
+        try:
+            size, before = timeline.page_args(request.query_params)
+        except ValueError:
+            return Response({"detail": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+        updates, next_cursor = timeline.feed_page(request.user, size, before)
+        return Response({
+            "results": self.get_serializer(updates, many=True).data,
+            "next": next_cursor,
+        })
+
 # ----- Notifications -----
-class NotificationViewSet(mixins.ListModelMixin,
+class NotificationViewSet(ConditionalGetMixin,
+                          FastListMixin,
+                          mixins.ListModelMixin,
                           mixins.UpdateModelMixin,
                           viewsets.GenericViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset = ("-created_at", "-id")
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        return Notification.objects.for_display().filter(recipient=self.request.user)
+
+    def get_etag_scopes(self):
+        return [f"notifications:user:{self.request.user.id}"]
+
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        with transaction.atomic():
+            notification = serializer.save()
+            if notification.is_read != was_read:
+                NotificationCounter.add([notification.recipient_id], -1 if notification.is_read else 1)
+                self._publish_unread()
 
     @action(detail=False, methods=["post"])
     def mark_all_read(self, request):
-        qs = self.get_queryset().filter(is_read=False)
-        updated = qs.update(is_read=True)
+        qs = Notification.objects.filter(recipient=request.user, is_read=False)
+        with transaction.atomic():
+            updated = qs.update(is_read=True)
+            # subtract what was actually marked, so rows that arrived meanwhile still count
+            NotificationCounter.add([request.user.id], -updated)
+            self._publish_unread()
+            notifications_changed.send(sender=Notification, user_ids=[request.user.id])
         return Response({"updated": updated})
+
+    @extend_schema(request={"application/json": {"type": "array", "items": {"type": "integer"}}},
+                   responses=OpenApiTypes.OBJECT)
+    @action(detail=False, methods=["post"])
+    def mark_read(self, request):
+        """Mark the notifications with the posted ids read; one result per id."""
+        updated, results = bulk.mark_read(request.user, request.data)
+        return Response({"updated": updated, "results": results})
+
+    def _publish_unread(self):
+        # keeps the user's other tabs in sync
+        user_id = self.request.user.id
+        publish_unread({user_id: NotificationCounter.unread_for(user_id)})
+
+    @action(detail=False, methods=["get"])
+    def unread_count(self, request):
+        return Response({"unread": NotificationCounter.unread_for(request.user.id)})
+
+# ----- Submissions -----
+class SubmissionViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    serializer_class = SubmissionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    keyset = ("-submitted_at", "-id")
+
+    def get_queryset(self):
+        user = self.request.user
+        # Teachers see submissions to their assignments; students see their own
+        qs = Submission.objects.select_related("student")
+        if getattr(user, "role", None) == "teacher":
+            qs = qs.filter(assignment__course__teacher=user)
+        else:
+            qs = qs.filter(student=user)
+        assignment_id = _id_param(self.request, "assignment")
+        if assignment_id is not None:
+            qs = qs.filter(assignment_id=assignment_id)
+        return qs
+
+    @extend_schema(request=SubmissionGradeItemSerializer(many=True), responses=OpenApiTypes.OBJECT)
+    @action(detail=False, methods=["post"], permission_classes=[IsTeacher])
+    def grade(self, request):
+        """Set grade and/or feedback on several submissions; one result per item."""
+        updated, results = bulk.grade(request.user, request.data)
+        return Response({"updated": updated, "results": results})
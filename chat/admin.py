@@ -1,8 +1,14 @@
 from django.contrib import admin
-from .models import ChatMessage
+from .models import ChatMessage, Conversation
 
 @admin.register(ChatMessage)
 class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ("sender", "receiver", "message", "timestamp")
     search_fields = ("sender__username", "receiver__username", "message")
     list_filter = ("timestamp",)
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ("user_a", "user_b", "last_activity", "unread_a", "unread_b")
+    search_fields = ("user_a__username", "user_b__username")
+    raw_id_fields = ("user_a", "user_b", "last_message")
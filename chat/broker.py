@@ -0,0 +1,224 @@
+# chat/broker.py
+"""A channel layer broker for several worker processes on one host.
+
+One broker process (``manage.py channel_broker``) owns every channel queue
+and group; each ASGI worker talks to it over a Unix domain socket through
+:class:`chat.layers.UnixSocketChannelLayer`. Frames are a 4-byte big-endian
+length followed by a msgpack map, the same encoding ``channels_redis`` uses,
+so message contents follow the same rules.
+
+Requests carry an ``id`` that is echoed in the reply. ``receive`` is the
+only request that may wait: its reply is sent once a message arrives.
+Queues honour the sender's capacity and expiry; group memberships lapse
+after ``group_expiry`` seconds, as in the other layers.
+"""
+import asyncio
+import logging
+import os
+import struct
+import time
+from collections import deque
+
+import msgpack
+
+logger = logging.getLogger(__name__)
+
+_LENGTH = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024
+SWEEP_SECONDS = 1.0
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    if length > MAX_FRAME:
+        raise ValueError(f"frame of {length} bytes exceeds {MAX_FRAME}")
+    return msgpack.unpackb(await reader.readexactly(length), raw=False)
+
+
+def write_frame(writer: asyncio.StreamWriter, payload):
+    data = msgpack.packb(payload, use_bin_type=True)
+    writer.write(_LENGTH.pack(len(data)) + data)
+
+
+class Broker:
+    def __init__(self, group_expiry=86400):
+        self.group_expiry = group_expiry
+        # channel -> deque of (expires_at, message)
+        self.queues: dict[str, deque] = {}
+        # channel -> deque of (writer, request id) blocked in receive
+        self.waiters: dict[str, deque] = {}
+        # group -> {channel: joined_at}
+        self.groups: dict[str, dict[str, float]] = {}
+        self.delivered = 0
+
+    # ----- operations -----
+
+    def send(self, channel, message, capacity, expiry):
+        """Queue or hand over one message; False if the channel is full."""
+        waiters = self.waiters.get(channel)
+        while waiters:
+            writer, request_id = waiters.popleft()
+            if not writer.is_closing():
+                write_frame(writer, {"id": request_id, "message": message})
+                self.delivered += 1
+                return True
+        queue = self.queues.get(channel)
+        if queue:
+            self._drop_expired(channel, queue)
+        queue = self.queues.setdefault(channel, deque())
+        if len(queue) >= capacity:
+            return False
+        queue.append((time.monotonic() + expiry, message))
+        return True
+
+    def receive(self, channel, writer, request_id):
+        queue = self.queues.get(channel)
+        if queue:
+            self._drop_expired(channel, queue)
+        if queue:
+            _, message = queue.popleft()
+            if not queue:
+                del self.queues[channel]
+            write_frame(writer, {"id": request_id, "message": message})
+            self.delivered += 1
+        else:
+            self.waiters.setdefault(channel, deque()).append((writer, request_id))
+
+    def cancel(self, channel, writer, request_id):
+        """Withdraw a blocked receive; False if its message was already sent."""
+        waiters = self.waiters.get(channel)
+        if waiters and (writer, request_id) in waiters:
+            waiters.remove((writer, request_id))
+            if not waiters:
+                del self.waiters[channel]
+            return True
+        return False
+
+    def group_add(self, group, channel):
+        self.groups.setdefault(group, {})[channel] = time.monotonic()
+
+    def group_discard(self, group, channel):
+        members = self.groups.get(group)
+        if members is not None:
+            members.pop(channel, None)
+            if not members:
+                del self.groups[group]
+
+    def group_send(self, group, message, capacity, expiry):
+        """Send to every member; full channels are skipped, as in other layers."""
+        members = self.groups.get(group, {})
+        cutoff = time.monotonic() - self.group_expiry
+        for channel, joined_at in list(members.items()):
+            if joined_at < cutoff:
+                del members[channel]
+            else:
+                self.send(channel, message, capacity, expiry)
+
+    def flush(self):
+        self.queues.clear()
+        self.groups.clear()
+
+    def forget(self, writer):
+        """Drop receive waiters held by a closed connection."""
+        for channel, waiters in list(self.waiters.items()):
+            kept = deque(w for w in waiters if w[0] is not writer)
+            if kept:
+                self.waiters[channel] = kept
+            else:
+                del self.waiters[channel]
+
+    def sweep(self):
+        for channel, queue in list(self.queues.items()):
+            self._drop_expired(channel, queue)
+        cutoff = time.monotonic() - self.group_expiry
+        for group, members in list(self.groups.items()):
+            for channel in [c for c, joined in members.items() if joined < cutoff]:
+                del members[channel]
+            if not members:
+                del self.groups[group]
+
+    def stats(self):
+        return {
+            "channels": len(self.queues),
+            "queued": sum(len(q) for q in self.queues.values()),
+            "waiting": sum(len(w) for w in self.waiters.values()),
+            "groups": len(self.groups),
+            "delivered": self.delivered,
+        }
+
+    def _drop_expired(self, channel, queue):
+        now = time.monotonic()
+        while queue and queue[0][0] < now:
+            queue.popleft()
+        if not queue:
+            self.queues.pop(channel, None)
+
+    # ----- serving -----
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await read_frame(reader)
+                self.dispatch(request, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception:
+            logger.exception("Closing broker connection after a bad request")
+        finally:
+            self.forget(writer)
+            writer.close()
+
+    def dispatch(self, request, writer):
+        op, request_id = request["op"], request.get("id")
+        reply = {"id": request_id}
+        if op == "send":
+            if not self.send(request["channel"], request["message"], request["capacity"], request["expiry"]):
+                reply["error"] = "full"
+        elif op == "receive":
+            self.receive(request["channel"], writer, request_id)
+            return
+        elif op == "cancel":
+            reply["removed"] = self.cancel(request["channel"], writer, request["target"])
+        elif op == "group_add":
+            self.group_add(request["group"], request["channel"])
+        elif op == "group_discard":
+            self.group_discard(request["group"], request["channel"])
+        elif op == "group_send":
+            self.group_send(request["group"], request["message"], request["capacity"], request["expiry"])
+        elif op == "flush":
+            self.flush()
+        elif op == "stats":
+            reply["stats"] = self.stats()
+        else:
+            reply["error"] = f"unknown op {op!r}"
+        write_frame(writer, reply)
+
+    async def start(self, path):
+        """Listen on ``path``; returns the server once it accepts connections."""
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self.handle, path=path)
+        os.chmod(path, 0o660)
+        self.path = path
+        self._sweeper = asyncio.ensure_future(self._sweep_forever())
+        return server
+
+    async def serve(self, path):
+        """Serve on ``path`` until cancelled."""
+        server = await self.start(path)
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop(server)
+
+    async def stop(self, server):
+        self._sweeper.cancel()
+        server.close()
+        await server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(SWEEP_SECONDS)
+            self.sweep()
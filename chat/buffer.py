@@ -0,0 +1,140 @@
+# chat/buffer.py
+"""Write-behind persistence for chat messages.
+
+With ``CHAT_WRITE_BEHIND`` on, ``ChatConsumer`` broadcasts a message first
+and hands it to :data:`message_buffer` instead of inserting it on the
+receive path. The buffer writes everything pending with one ``bulk_create``
+once ``CHAT_FLUSH_BATCH_SIZE`` messages are waiting or
+``CHAT_FLUSH_INTERVAL_MS`` after the first one arrived, whichever comes
+first. Consumers flush on disconnect and the process flushes at exit, so
+a message is only lost if the process dies outright.
+
+``bulk_create`` skips ``ChatMessage.save`` and its signals, so a flush also
+advances the conversations and invalidates the dashboards itself.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+import time
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from accounts.cache import invalidate_dashboard
+
+from .models import ChatMessage, Conversation
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: list[ChatMessage] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._exit_hook = False
+        # reported by stats()
+        self.peak_depth = 0
+        self.flushes = 0
+        self.written = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "peak_depth": self.peak_depth,
+            "flushes": self.flushes,
+            "written": self.written,
+            "failures": self.failures,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+    def add(self, message: ChatMessage):
+        """Queue an unsaved message; call from the event loop."""
+        with self._lock:
+            self._pending.append(message)
+            depth = len(self._pending)
+        self.peak_depth = max(self.peak_depth, depth)
+        if not self._exit_hook:
+            self._exit_hook = True
+            atexit.register(self.flush_sync)
+
+        if depth >= getattr(settings, "CHAT_FLUSH_BATCH_SIZE", 100):
+            self._cancel_timer()
+            asyncio.ensure_future(self.flush())
+        elif self._timer is None:
+            delay = getattr(settings, "CHAT_FLUSH_INTERVAL_MS", 200) / 1000
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    async def flush(self):
+        """Write everything pending; returns how many messages were taken."""
+        self._cancel_timer()
+        batch = self._take()
+        if batch:
+            # thread-sensitive: flushes run one after another, in order
+            await database_sync_to_async(self._write)(batch)
+        return len(batch)
+
+    def flush_sync(self):
+        """Blocking flush for callers outside the event loop (e.g. at exit)."""
+        batch = self._take()
+        if batch:
+            self._write(batch)
+        return len(batch)
+
+    def _on_timer(self):
+        self._timer = None
+        asyncio.ensure_future(self.flush())
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _take(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        return batch
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                ChatMessage.objects.bulk_create(batch)
+                Conversation.record_messages(batch)
+            written = len(batch)
+        except Exception:
+            self.failures += 1
+            logger.exception("Chat flush of %d messages failed; saving them one by one", len(batch))
+            written = self._write_each(batch)
+        invalidate_dashboard(*{uid for m in batch for uid in (m.sender_id, m.receiver_id)})
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.flushes += 1
+        self.written += written
+        self.last_flush_ms = elapsed
+        self.max_flush_ms = max(self.max_flush_ms, elapsed)
+        logger.debug("Flushed %d chat messages in %.1f ms (%d still buffered)", written, elapsed, self.depth)
+
+    def _write_each(self, batch):
+        written = 0
+        for m in batch:
+            m.pk, m._state.adding = None, True  # undo a rolled-back bulk insert
+            try:
+                m.save()
+                written += 1
+            except Exception:
+                logger.exception("Dropping chat message from %s to %s", m.sender_id, m.receiver_id)
+        return written
+
+
+message_buffer = MessageBuffer()
@@ -1,34 +1,127 @@
+import asyncio
 import json
+import time
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import ChatMessage
+from . import limits, presence
+from .buffer import message_buffer
+from .limits import counters, limit
+from .models import ChatMessage, Conversation
 from asgiref.sync import sync_to_async
+from social.models import NotificationCounter
+from social.push import group_name as notification_group
 
 
 User = get_user_model()
 
 class ChatConsumer(AsyncWebsocketConsumer):
+    """One side of a direct-message room.
+
+    Inbound frames go through the checks in :mod:`chat.limits` (size, rate,
+    room fan-out) before they are broadcast; outbound frames go through a
+    bounded queue so a slow reader can't hold up the room.
+
+    Besides ``{"message": ...}`` the client may send ``{"type": "heartbeat"}``
+    to stay online (:mod:`chat.presence`) and ``{"type": "typing"}``, which is
+    broadcast at most once per ``CHAT_TYPING_INTERVAL_SECONDS`` per user.
+    """
+
     async def connect(self):
         self.receiver_username = self.scope["url_route"]["kwargs"]["username"]
         self.sender = self.scope["user"]
         self.receiver = await self.get_user(self.receiver_username)
-        self.room_name = self.get_room_name(self.sender.username, self.receiver_username)
-        self.room_group_name = f"chat_{self.room_name}"
+        self.conversation = await self.open_conversation(self.sender, self.receiver)
+        self.room_group_name = self.conversation.room_name
+
+        if not limits.groups.join(self.room_group_name):
+            await self.close(code=1013)  # try again later
+            return
+        self.joined = True
+        try:
+            await self._open()
+        except BaseException:
+            # disconnect() won't run for a socket that never opened: give the slot back here
+            self.joined = False
+            limits.groups.leave(self.room_group_name)
+            if getattr(self, "writer", None):
+                self.writer.cancel()
+            raise
+
+    async def _open(self):
+        self.bucket = limits.TokenBucket(limit("CHAT_RATE_PER_SECOND"), limit("CHAT_RATE_BURST"))
+        self.control_bucket = limits.TokenBucket(limit("CHAT_CONTROL_RATE_PER_SECOND"),
+                                                 limit("CHAT_CONTROL_RATE_BURST"))
+        self.outbound = asyncio.Queue(maxsize=limit("CHAT_OUTBOUND_QUEUE"))
+        self.writer = asyncio.create_task(self._write_outbound())
 
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
 
+        self.last_heartbeat = time.monotonic()
+        self.last_typing = 0.0
+        self.seen_live = False
+        if await sync_to_async(presence.connect)(self.sender.id):
+            await self._broadcast_presence(True)
+        other_online = await sync_to_async(presence.is_online)(self.receiver.id)
+        await self._enqueue({"type": "presence", "user": self.receiver.username, "online": other_online})
+
     async def disconnect(self, close_code):
+        if not getattr(self, "joined", False):
+            return
+        self.joined = False
+        limits.groups.leave(self.room_group_name)
+        self.writer.cancel()
+        if await sync_to_async(presence.disconnect)(self.sender.id):
+            await self._broadcast_presence(False)
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        if settings.CHAT_WRITE_BEHIND:
+            await message_buffer.flush()
+        if self.seen_live:
+            # record_messages counted what this socket was shown as unread
+            await database_sync_to_async(self.conversation.mark_read)(self.sender)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if text_data is None:
+            counters["bad_frames"] += 1
+            return
+        if len(text_data.encode()) > limit("CHAT_MAX_FRAME_BYTES"):
+            counters["frames_too_large"] += 1
+            await self.close(code=1009)  # message too big
+            return
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            data = None
+        kind = data.get("type") if isinstance(data, dict) else None
+        if kind in ("heartbeat", "typing"):
+            if not self.control_bucket.take():
+                counters["control_rate_limited"] += 1
+                return
+            await (self._heartbeat() if kind == "heartbeat" else self._typing())
+            return
+
+        if not self.bucket.take():
+            counters["rate_limited"] += 1
+            await self._enqueue({"error": "rate_limited"})
+            return
+        message = data.get("message") if isinstance(data, dict) else None
+        if not isinstance(message, str) or not message or len(message) > limit("CHAT_MAX_MESSAGE_CHARS"):
+            counters["bad_frames"] += 1
+            await self._enqueue({"error": "bad_frame"})
+            return
+        if not limits.groups.allow_send(self.room_group_name):
+            await self._enqueue({"error": "room_busy"})
+            return
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        message = data["message"]
         sender = self.sender
         receiver = self.receiver
+        write_behind = settings.CHAT_WRITE_BEHIND
 
-        # ✅ Save message to DB
-        await self.save_message(sender, receiver, message)
+        # ✅ Save message to DB (after the broadcast when buffered, see chat/buffer.py)
+        if not write_behind:
+            await self.save_message(sender, receiver, message, self.conversation)
 
         await self.channel_layer.group_send(
             self.room_group_name,
@@ -38,25 +131,128 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 "sender": sender.username,
             },
         )
+        if write_behind:
+            message_buffer.add(ChatMessage(
+                sender=sender, receiver=receiver, message=message, conversation=self.conversation,
+            ))
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps({
+        if event["sender"] != self.sender.username:
+            self.seen_live = True
+        await self._enqueue({
             "message": event["message"],
             "sender": event["sender"],
-        }))
+        })
+
+    async def presence_update(self, event):
+        await self._enqueue({"type": "presence", "user": event["user"], "online": event["online"]})
+
+    async def typing_update(self, event):
+        if event["user"] != self.sender.username:
+            await self._enqueue({"type": "typing", "user": event["user"]})
+
+    async def _broadcast_presence(self, online):
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {"type": "presence_update", "user": self.sender.username, "online": online},
+        )
+
+    async def _heartbeat(self):
+        # several tabs may beat for one socket's worth of presence; ignore extras
+        now = time.monotonic()
+        if now - self.last_heartbeat < getattr(settings, "PRESENCE_HEARTBEAT_SECONDS", 25) / 2:
+            return
+        self.last_heartbeat = now
+        await sync_to_async(presence.heartbeat)(self.sender.id)
+
+    async def _typing(self):
+        now = time.monotonic()
+        if now - self.last_typing < getattr(settings, "CHAT_TYPING_INTERVAL_SECONDS", 3):
+            counters["typing_coalesced"] += 1
+            return
+        self.last_typing = now
+        # other tabs or workers may have announced this user already
+        if not await sync_to_async(presence.typing_allowed)(self.sender.id, self.room_group_name):
+            counters["typing_coalesced"] += 1
+            return
+        await self.channel_layer.group_send(
+            self.room_group_name, {"type": "typing_update", "user": self.sender.username},
+        )
+
+    async def _enqueue(self, frame):
+        try:
+            self.outbound.put_nowait(frame)
+        except asyncio.QueueFull:
+            if limit("CHAT_SLOW_CONSUMER") == "close":
+                counters["slow_closed"] += 1
+                await self.close(code=1013)
+            else:
+                counters["outbound_dropped"] += 1
+
+    async def _write_outbound(self):
+        while True:
+            frame = await self.outbound.get()
+            await self.send(text_data=json.dumps(frame))
 
     @staticmethod
     async def get_user(username):
         return await sync_to_async(User.objects.get)(username=username)
 
     @staticmethod
-    async def save_message(sender, receiver, message):
+    async def save_message(sender, receiver, message, conversation=None):
         await sync_to_async(ChatMessage.objects.create)(
             sender=sender,
             receiver=receiver,
-            message=message
+            message=message,
+            conversation=conversation,
         )
 
     @staticmethod
-    def get_room_name(user1, user2):
-        return "_".join(sorted([user1, user2]))
+    @database_sync_to_async
+    def open_conversation(user, other):
+        conversation = Conversation.for_pair(user.id, other.id)
+        conversation.mark_read(user)
+        return conversation
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """Streams unread-count updates to the signed-in user.
+
+    Updates arriving within ``NOTIFICATION_PUSH_COALESCE_SECONDS`` of each
+    other are merged, so a burst (e.g. a batch of material uploads) reaches
+    the browser as one frame: ``{"new": <received in the burst>, "unread": <latest count>}``.
+    """
+
+    async def connect(self):
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            await self.close()
+            return
+        self.group_name = notification_group(user.id)
+        self.window = getattr(settings, "NOTIFICATION_PUSH_COALESCE_SECONDS", 0.5)
+        self.pending_new = 0
+        self.pending_unread = None
+        self.flush_task = None
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        unread = await database_sync_to_async(NotificationCounter.unread_for)(user.id)
+        await self.send(text_data=json.dumps({"new": 0, "unread": unread}))
+
+    async def disconnect(self, close_code):
+        if getattr(self, "group_name", None):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if getattr(self, "flush_task", None):
+            self.flush_task.cancel()
+
+    async def notification_update(self, event):
+        self.pending_new += event["new"]
+        self.pending_unread = event["unread"]
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        frame = {"new": self.pending_new, "unread": self.pending_unread}
+        self.pending_new, self.pending_unread, self.flush_task = 0, None, None
+        await self.send(text_data=json.dumps(frame))
@@ -0,0 +1,205 @@
+# chat/layers.py
+"""Channel layer backed by the Unix socket broker in :mod:`chat.broker`.
+
+``InMemoryChannelLayer`` only connects consumers inside one process. With
+this layer every ASGI worker on the host shares the broker's channels and
+groups, so a chat message sent through one worker reaches sockets held by
+another. Enable it by setting ``CHANNEL_BROKER_SOCKET`` (see settings) and
+running ``manage.py channel_broker``.
+
+Each event loop gets its own connection. Loops made by ``async_to_sync``
+are short-lived, so their connection is closed together with the loop.
+"""
+import asyncio
+import itertools
+import types
+import uuid
+import weakref
+from collections import deque
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+from .broker import read_frame, write_frame
+
+DEFAULT_PATH = "/tmp/studywithkimy-channels.sock"
+RECONNECT_DELAY = 0.5
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.futures: dict[int, asyncio.Future] = {}
+        self.ids = itertools.count(1)
+        self.closed = False
+        self.reader_task = asyncio.ensure_future(self._read())
+
+    @classmethod
+    async def open(cls, path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    def start(self, op, **fields):
+        """Send a request; returns its id and the future of its reply."""
+        if self.closed:
+            raise ConnectionError("channel broker connection is closed")
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.futures[request_id] = future
+        write_frame(self.writer, {"op": op, "id": request_id, **fields})
+        return request_id, future
+
+    async def request(self, op, **fields):
+        _, future = self.start(op, **fields)
+        await self.writer.drain()
+        return await future
+
+    async def _read(self):
+        try:
+            while True:
+                reply = await read_frame(self.reader)
+                future = self.futures.pop(reply["id"], None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.closed = True
+            for future in self.futures.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("channel broker connection lost"))
+            self.futures.clear()
+
+    async def close(self):
+        self.closed = True
+        self.writer.close()
+        self.reader_task.cancel()
+        await asyncio.gather(self.reader_task, return_exceptions=True)
+
+
+class UnixSocketChannelLayer(BaseChannelLayer):
+    """Channel layer for several worker processes on one host.
+
+    Supports groups, per-channel capacity (``capacity``/``channel_capacity``)
+    and message expiry (``expiry``); group expiry is set on the broker.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(self, path=None, expiry=60, capacity=100, channel_capacity=None):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = path or DEFAULT_PATH
+        self.client_prefix = uuid.uuid4().hex
+        self._connections: dict[asyncio.AbstractEventLoop, _Connection] = {}
+        self._locks = weakref.WeakKeyDictionary()
+        self._hooked_loops = weakref.WeakSet()
+        # messages whose receive() was cancelled after the broker had sent them
+        self._stash: dict[str, deque] = {}
+
+    # ----- channel layer API -----
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        assert "__asgi_channel__" not in message
+        reply = await self._request(
+            "send", channel=channel, message=message,
+            capacity=self.get_capacity(channel), expiry=self.expiry,
+        )
+        if reply.get("error") == "full":
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        assert self.valid_channel_name(channel)
+        stash = self._stash.get(channel)
+        if stash:
+            message = stash.popleft()
+            if not stash:
+                del self._stash[channel]
+            return message
+        while True:
+            conn = await self._connection()
+            request_id, future = conn.start("receive", channel=channel)
+            try:
+                await conn.writer.drain()
+                reply = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                asyncio.ensure_future(self._withdraw(conn, channel, request_id, future))
+                raise
+            except ConnectionError:
+                await asyncio.sleep(RECONNECT_DELAY)  # broker restarting; its queues are gone
+                continue
+            return reply["message"]
+
+    async def new_channel(self, prefix="specific"):
+        return f"{prefix}.{self.client_prefix}!{uuid.uuid4().hex}"
+
+    async def group_add(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        await self._request("group_add", group=group, channel=channel)
+
+    async def group_discard(self, group, channel):
+        assert self.valid_group_name(group), "Group name not valid"
+        assert self.valid_channel_name(channel), "Channel name not valid"
+        await self._request("group_discard", group=group, channel=channel)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        assert self.valid_group_name(group), "Group name not valid"
+        await self._request("group_send", group=group, message=message, capacity=self.capacity, expiry=self.expiry)
+
+    async def flush(self):
+        self._stash.clear()
+        await self._request("flush")
+
+    async def close(self):
+        conn = self._connections.pop(asyncio.get_running_loop(), None)
+        if conn is not None:
+            await conn.close()
+
+    async def stats(self):
+        return (await self._request("stats"))["stats"]
+
+    # ----- connections -----
+
+    async def _request(self, op, **fields):
+        return await (await self._connection()).request(op, **fields)
+
+    async def _connection(self):
+        loop = asyncio.get_running_loop()
+        conn = self._connections.get(loop)
+        if conn is not None and not conn.closed:
+            return conn
+        lock = self._locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            conn = self._connections.get(loop)
+            if conn is None or conn.closed:
+                if loop not in self._hooked_loops:
+                    self._hooked_loops.add(loop)
+                    self._close_with_loop(loop)
+                conn = self._connections[loop] = await _Connection.open(self.path)
+        return conn
+
+    def _close_with_loop(self, loop):
+        original = loop.close
+
+        def close(this, *args, **kwargs):
+            conn = self._connections.pop(this, None)
+            if conn is not None and not this.is_closed():
+                this.run_until_complete(conn.close())
+            this.close = original
+            return original(*args, **kwargs)
+
+        loop.close = types.MethodType(close, loop)
+
+    async def _withdraw(self, conn, channel, request_id, future):
+        try:
+            reply = await conn.request("cancel", channel=channel, target=request_id)
+        except ConnectionError:
+            return
+        # replies arrive in order, so an unwithdrawn receive has its message by now
+        if not reply["removed"] and future.done() and not future.exception():
+            self._stash.setdefault(channel, deque()).append(future.result()["message"])
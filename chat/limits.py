@@ -0,0 +1,98 @@
+# chat/limits.py
+"""Limits that keep one chat client from flooding a room or the database.
+
+``ChatConsumer`` applies, per connection: a maximum frame size, token
+buckets on messages and on control frames (heartbeat, typing) sent, and a
+bounded outbound queue (a reader too slow
+to keep up has frames dropped or is disconnected). Per room group it caps
+how many sockets this process joins and how fast messages are fanned out.
+
+Every rejection increments a counter in :data:`counters`; the staff-only
+``chat:stats`` endpoint returns them with the write-behind buffer's stats.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+
+# event name -> times it happened in this process
+counters: Counter = Counter()
+
+DEFAULTS = {
+    "CHAT_MAX_FRAME_BYTES": 8192,
+    "CHAT_MAX_MESSAGE_CHARS": 4000,
+    "CHAT_RATE_PER_SECOND": 5,
+    "CHAT_RATE_BURST": 10,
+    "CHAT_CONTROL_RATE_PER_SECOND": 2,
+    "CHAT_CONTROL_RATE_BURST": 10,
+    "CHAT_OUTBOUND_QUEUE": 100,
+    "CHAT_SLOW_CONSUMER": "drop",
+    "CHAT_GROUP_MAX_MEMBERS": 20,
+    "CHAT_GROUP_RATE_PER_SECOND": 20,
+    "CHAT_GROUP_RATE_BURST": 40,
+}
+
+
+def limit(name):
+    """Current value of a ``CHAT_*`` limit setting."""
+    return getattr(settings, name, DEFAULTS[name])
+
+
+class TokenBucket:
+    """Allows ``rate`` events per second on average, ``burst`` at once."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class GroupLimits:
+    """Per-process bookkeeping for room groups: members joined and send rate."""
+
+    def __init__(self):
+        self.members: Counter = Counter()
+        self.buckets: dict[str, TokenBucket] = {}
+
+    def join(self, group) -> bool:
+        if self.members[group] >= limit("CHAT_GROUP_MAX_MEMBERS"):
+            counters["group_full"] += 1
+            return False
+        self.members[group] += 1
+        return True
+
+    def leave(self, group):
+        self.members[group] -= 1
+        if self.members[group] <= 0:
+            del self.members[group]
+            self.buckets.pop(group, None)
+
+    def allow_send(self, group) -> bool:
+        bucket = self.buckets.get(group)
+        if bucket is None:
+            bucket = self.buckets[group] = TokenBucket(
+                limit("CHAT_GROUP_RATE_PER_SECOND"), limit("CHAT_GROUP_RATE_BURST"),
+            )
+        if bucket.take():
+            return True
+        counters["group_rate_limited"] += 1
+        return False
+
+
+groups = GroupLimits()
+
+
+def stats():
+    return dict(counters)
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from chat.broker import Broker
+from chat.layers import UnixSocketChannelLayer
+
+
+class Command(BaseCommand):
+    help = "Compare messages/sec and group fan-out latency of the in-memory and Unix socket channel layers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=5000, help="Messages for the throughput run.")
+        parser.add_argument("--group-size", type=int, default=50, help="Channels in the fan-out group.")
+        parser.add_argument("--rounds", type=int, default=200, help="group_send rounds for the latency run.")
+        parser.add_argument("--path", help="Use a running broker on this socket instead of starting one.")
+
+    def handle(self, *args, **options):
+        asyncio.run(self._run(options))
+
+    async def _run(self, options):
+        capacity = max(options["messages"], 100)
+        layers = [("in-memory", InMemoryChannelLayer(capacity=capacity))]
+        server = broker = None
+        path = options["path"]
+        if not path:
+            path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+            broker = Broker()
+            server = await broker.start(path)
+        layers.append(("unix socket", UnixSocketChannelLayer(path=path, capacity=capacity)))
+
+        try:
+            for name, layer in layers:
+                rate = await self._throughput(layer, options["messages"])
+                p50, p95 = await self._fanout(layer, options["group_size"], options["rounds"])
+                self.stdout.write(
+                    f"{name:>12}: {rate:>10,.0f} msg/s   fan-out to {options['group_size']}: "
+                    f"p50 {p50:.2f} ms, p95 {p95:.2f} ms"
+                )
+                await layer.flush()
+                if isinstance(layer, UnixSocketChannelLayer):
+                    await layer.close()
+        finally:
+            if server is not None:
+                await broker.stop(server)
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    @staticmethod
+    async def _throughput(layer, count):
+        channel = await layer.new_channel()
+        message = {"type": "chat.message", "message": "x" * 64, "sender": "bench"}
+
+        async def produce():
+            for _ in range(count):
+                await layer.send(channel, message)
+
+        async def consume():
+            for _ in range(count):
+                await layer.receive(channel)
+
+        started = time.perf_counter()
+        await asyncio.gather(produce(), consume())
+        return count / (time.perf_counter() - started)
+
+    @staticmethod
+    async def _fanout(layer, size, rounds):
+        group = "bench_fanout"
+        channels = [await layer.new_channel() for _ in range(size)]
+        for channel in channels:
+            await layer.group_add(group, channel)
+        samples = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            await layer.group_send(group, {"type": "bench", "sent": started})
+            await asyncio.gather(*(layer.receive(c) for c in channels))
+            samples.append((time.perf_counter() - started) * 1000)
+        for channel in channels:
+            await layer.group_discard(group, channel)
+        samples.sort()
+        return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
@@ -0,0 +1,26 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chat.broker import Broker
+from chat.layers import DEFAULT_PATH
+
+
+class Command(BaseCommand):
+    help = "Run the channel layer broker that ASGI workers on this host share (chat.layers.UnixSocketChannelLayer)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Socket path (default: CHANNEL_BROKER_SOCKET).")
+        parser.add_argument("--group-expiry", type=int, default=86400,
+                            help="Seconds before a group membership lapses.")
+
+    def handle(self, *args, **options):
+        path = options["path"] or getattr(settings, "CHANNEL_BROKER_SOCKET", None) or DEFAULT_PATH
+        broker = Broker(group_expiry=options["group_expiry"])
+        self.stdout.write(self.style.SUCCESS(f"Channel broker listening on {path}"))
+        try:
+            asyncio.run(broker.serve(path))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Stopped after delivering {broker.delivered} message(s).")
@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Max, Q
+
+
+def backfill(apps, schema_editor):
+    ChatMessage = apps.get_model("chat", "ChatMessage")
+    Conversation = apps.get_model("chat", "Conversation")
+
+    latest = {}
+    pairs = (
+        ChatMessage.objects.filter(conversation__isnull=True)
+        .values_list("sender_id", "receiver_id")
+        .annotate(last_id=Max("id"))
+        .order_by()
+    )
+    for sender_id, receiver_id, last_id in pairs:
+        pair = tuple(sorted((sender_id, receiver_id)))
+        latest[pair] = max(latest.get(pair, 0), last_id)
+
+    for (a, b), last_id in latest.items():
+        conversation, _ = Conversation.objects.get_or_create(user_a_id=a, user_b_id=b)
+        ChatMessage.objects.filter(
+            Q(sender_id=a, receiver_id=b) | Q(sender_id=b, receiver_id=a), conversation__isnull=True
+        ).update(conversation=conversation)
+        last = ChatMessage.objects.get(pk=last_id)
+        # history predates read tracking: start everyone at zero unread
+        Conversation.objects.filter(pk=conversation.pk).update(last_message=last, last_activity=last.timestamp)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0003_conversations"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,122 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
 
+
+class ConversationQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """The user's conversations, most recently active first (the inbox)."""
+        return (
+            self.filter(Q(user_a=user) | Q(user_b=user), last_activity__isnull=False)
+            .select_related("user_a", "user_b", "last_message")
+            .order_by("-last_activity", "-id")
+        )
+
+
+class Conversation(models.Model):
+    """A direct-message thread between two users.
+
+    The pair is stored canonically (``user_a`` has the lower id), so each
+    pair has exactly one row. ``last_message``, ``last_activity`` and the
+    per-participant unread counters are kept current by ``record_messages``.
+    """
+    user_a = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    user_b = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    last_message = models.ForeignKey("ChatMessage", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    last_activity = models.DateTimeField(null=True, blank=True)
+    unread_a = models.PositiveIntegerField(default=0)
+    unread_b = models.PositiveIntegerField(default=0)
+
+    objects = ConversationQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_a", "user_b"], name="conversation_pair"),
+            models.CheckConstraint(check=Q(user_a__lte=F("user_b")), name="conversation_pair_ordered"),
+        ]
+        indexes = [
+            models.Index(fields=["user_a", "-last_activity"], name="conversation_inbox_a"),
+            models.Index(fields=["user_b", "-last_activity"], name="conversation_inbox_b"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_a_id} ↔ {self.user_b_id}"
+
+    @classmethod
+    def for_pair(cls, user1_id, user2_id):
+        a, b = sorted((user1_id, user2_id))
+        conversation, _ = cls.objects.get_or_create(user_a_id=a, user_b_id=b)
+        return conversation
+
+    @property
+    def room_name(self):
+        return f"chat_{self.pk}"
+
+    def other(self, user):
+        return self.user_b if user.id == self.user_a_id else self.user_a
+
+    def unread_for(self, user):
+        return self.unread_a if user.id == self.user_a_id else self.unread_b
+
+    def mark_read(self, user):
+        field = "unread_a" if user.id == self.user_a_id else "unread_b"
+        Conversation.objects.filter(pk=self.pk).update(**{field: 0})
+        setattr(self, field, 0)
+
+    @classmethod
+    def record_messages(cls, messages):
+        """Advance last_message/last_activity and unread counters for saved messages.
+
+        One UPDATE per conversation touched, all in one transaction.
+        """
+        latest = {}
+        unread = Counter()
+        for m in messages:
+            if m.conversation_id not in latest or m.id > latest[m.conversation_id].id:
+                latest[m.conversation_id] = m
+            if m.sender_id != m.receiver_id:
+                side = "unread_a" if m.receiver_id < m.sender_id else "unread_b"
+                unread[(m.conversation_id, side)] += 1
+        with transaction.atomic():
+            for conversation_id, m in latest.items():
+                counters = {
+                    side: F(side) + unread[(conversation_id, side)]
+                    for side in ("unread_a", "unread_b") if unread[(conversation_id, side)]
+                }
+                # Greatest() keeps a late, older batch from moving them backwards
+                cls.objects.filter(pk=conversation_id).update(
+                    last_message_id=Greatest(Coalesce("last_message_id", Value(0)), Value(m.id)),
+                    last_activity=Greatest(Coalesce("last_activity", Value(m.timestamp)), Value(m.timestamp)),
+                    **counters,
+                )
+
+
 class ChatMessage(models.Model):
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="sent_messages")
     receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="received_messages")
+    # always set on save; nullable only for rows older than conversations
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, null=True, blank=True,
+                                     related_name="messages")
     message = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # one direction of a conversation, newest first (chat history pages)
+            models.Index(fields=["sender", "receiver", "-id"], name="chatmessage_pair_recent"),
+        ]
+
     def __str__(self):
         return f"{self.sender} to {self.receiver}: {self.message[:20]}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            if self.conversation_id is None:
+                self.conversation = Conversation.for_pair(self.sender_id, self.receiver_id)
+            super().save(*args, **kwargs)
+            Conversation.record_messages([self])
@@ -0,0 +1,67 @@
+# chat/presence.py
+"""Who is online, kept in the shared cache.
+
+Each open chat socket counts toward its user's ``presence:<id>`` entry:
+``ChatConsumer`` increments it on connect and decrements it on disconnect.
+The entry expires ``PRESENCE_TTL_SECONDS`` after the last heartbeat, so a
+worker that dies without running ``disconnect`` can't leave users online
+for good.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _key(user_id):
+    return f"presence:{user_id}"
+
+
+def _ttl():
+    return getattr(settings, "PRESENCE_TTL_SECONDS", 60)
+
+
+def connect(user_id) -> bool:
+    """Count a new socket; True if the user just came online."""
+    key = _key(user_id)
+    cache.add(key, 0, _ttl())
+    try:
+        count = cache.incr(key)
+    except ValueError:  # expired between add and incr
+        cache.set(key, 1, _ttl())
+        count = 1
+    cache.touch(key, _ttl())
+    return count == 1
+
+
+def disconnect(user_id) -> bool:
+    """Uncount a socket; True if the user just went offline."""
+    key = _key(user_id)
+    try:
+        count = cache.decr(key)
+    except ValueError:
+        return True
+    if count <= 0:
+        cache.delete(key)
+        return True
+    return False
+
+
+def heartbeat(user_id):
+    """Keep the user online for another TTL; restores an expired entry."""
+    if not cache.touch(_key(user_id), _ttl()):
+        cache.add(_key(user_id), 1, _ttl())
+
+
+def is_online(user_id) -> bool:
+    return (cache.get(_key(user_id)) or 0) > 0
+
+
+def online(user_ids) -> set[int]:
+    """The subset of ``user_ids`` that is online, in one cache round trip."""
+    keys = {_key(uid): uid for uid in user_ids}
+    return {keys[k] for k, count in cache.get_many(keys).items() if count and count > 0}
+
+
+def typing_allowed(user_id, room) -> bool:
+    """At most one typing broadcast per user and room each ``CHAT_TYPING_INTERVAL_SECONDS``."""
+    interval = getattr(settings, "CHAT_TYPING_INTERVAL_SECONDS", 3)
+    return cache.add(f"typing:{room}:{user_id}", 1, interval)
@@ -0,0 +1,66 @@
+# chat/tests/test_buffer.py
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+
+from chat.buffer import message_buffer
+from chat.models import ChatMessage, Conversation
+from chat.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+application = URLRouter(websocket_urlpatterns)
+
+
+@override_settings(CHAT_WRITE_BEHIND=True, CHAT_FLUSH_INTERVAL_MS=60_000, CHAT_FLUSH_BATCH_SIZE=100)
+class WriteBehindTests(TransactionTestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="x")
+        self.bob = User.objects.create_user(username="bob", password="x")
+
+    async def _connect(self):
+        communicator = WebsocketCommunicator(application, f"/ws/chat/{self.bob.username}/")
+        communicator.scope["user"] = self.alice
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        for _ in range(2):  # presence frames sent on connect
+            await communicator.receive_json_from()
+        return communicator
+
+    async def test_broadcasts_before_writing_and_flushes_on_disconnect(self):
+        communicator = await self._connect()
+        for text in ("one", "two"):
+            await communicator.send_json_to({"message": text})
+            self.assertEqual(await communicator.receive_json_from(), {"message": text, "sender": "alice"})
+        self.assertEqual(await database_sync_to_async(ChatMessage.objects.count)(), 0)
+        self.assertEqual(message_buffer.depth, 2)
+
+        await communicator.disconnect()
+        messages = await database_sync_to_async(list)(ChatMessage.objects.order_by("id"))
+        self.assertEqual([m.message for m in messages], ["one", "two"])
+        conversation = await database_sync_to_async(Conversation.objects.get)()
+        self.assertEqual(conversation.last_message_id, messages[-1].id)
+        self.assertEqual(conversation.unread_for(self.bob), 2)
+        self.assertEqual(message_buffer.depth, 0)
+
+    @override_settings(CHAT_FLUSH_BATCH_SIZE=3)
+    async def test_full_batch_is_written_without_waiting(self):
+        communicator = await self._connect()
+        for i in range(3):
+            await communicator.send_json_to({"message": f"m{i}"})
+            await communicator.receive_json_from()
+        await communicator.receive_nothing(timeout=0.2)
+        self.assertEqual(await database_sync_to_async(ChatMessage.objects.count)(), 3)
+        await communicator.disconnect()
+
+    def test_failed_batch_falls_back_to_single_saves(self):
+        conversation = Conversation.for_pair(self.alice.id, self.bob.id)
+        good = ChatMessage(sender=self.alice, receiver=self.bob, message="ok", conversation=conversation)
+        bad = ChatMessage(sender=self.alice, receiver_id=10**9, message="lost", conversation=conversation)
+        message_buffer._pending.extend([good, bad])
+        with self.assertLogs("chat.buffer", "ERROR"):
+            self.assertEqual(message_buffer.flush_sync(), 2)
+        self.assertEqual(list(ChatMessage.objects.values_list("message", flat=True)), ["ok"])
+        self.assertEqual(message_buffer.depth, 0)
@@ -2,7 +2,7 @@
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from chat.models import ChatMessage
+from chat.models import ChatMessage, Conversation
 
 User = get_user_model()
 
@@ -22,3 +22,71 @@ class ChatHistoryTests(TestCase):
         self.assertIn("messages", data)
         self.assertEqual(len(data["messages"]), 2)
         self.assertEqual(data["messages"][0]["message"], "hi")
+
+    def test_history_pages_backwards_with_before_cursor(self):
+        for i in range(5):
+            ChatMessage.objects.create(sender=self.u1, receiver=self.u2, message=f"m{i}")
+        self.client.login(username="u1", password="pass123")
+        url = reverse("chat:chat_history", args=[self.u2.username])
+
+        page = self.client.get(url, {"limit": 3}).json()
+        self.assertEqual([m["message"] for m in page["messages"]], ["m2", "m3", "m4"])
+        page = self.client.get(url, {"limit": 3, "before": page["next_before"]}).json()
+        self.assertEqual([m["message"] for m in page["messages"]], ["hello", "m0", "m1"])
+        page = self.client.get(url, {"limit": 3, "before": page["next_before"]}).json()
+        self.assertEqual([m["message"] for m in page["messages"]], ["hi"])
+        self.assertIsNone(page["next_before"])
+        self.assertEqual(self.client.get(url, {"before": "x"}).status_code, 400)
+
+    def test_history_excludes_notes_to_self_and_other_conversations(self):
+        u3 = User.objects.create_user(username="u3", password="pass123")
+        ChatMessage.objects.create(sender=self.u1, receiver=self.u1, message="note to self")
+        ChatMessage.objects.create(sender=u3, receiver=self.u1, message="elsewhere")
+        self.client.login(username="u1", password="pass123")
+        data = self.client.get(reverse("chat:chat_history", args=[self.u2.username])).json()
+        self.assertEqual([m["message"] for m in data["messages"]], ["hi", "hello"])
+
+
+class ConversationTests(TestCase):
+    def setUp(self):
+        self.u1 = User.objects.create_user(username="u1", password="pass123", role="student")
+        self.u2 = User.objects.create_user(username="u2", password="pass123", role="teacher")
+        self.u3 = User.objects.create_user(username="u3", password="pass123", role="student")
+
+    def test_messages_share_one_canonical_conversation(self):
+        a = ChatMessage.objects.create(sender=self.u2, receiver=self.u1, message="hi")
+        b = ChatMessage.objects.create(sender=self.u1, receiver=self.u2, message="hello")
+        self.assertEqual(a.conversation_id, b.conversation_id)
+        self.assertEqual(Conversation.objects.count(), 1)
+        conversation = Conversation.objects.get()
+        self.assertEqual((conversation.user_a_id, conversation.user_b_id), (self.u1.id, self.u2.id))
+        self.assertEqual(conversation.last_message_id, b.id)
+        self.assertEqual(conversation.last_activity, b.timestamp)
+
+    def test_unread_counters_and_mark_read(self):
+        for _ in range(3):
+            ChatMessage.objects.create(sender=self.u2, receiver=self.u1, message="ping")
+        ChatMessage.objects.create(sender=self.u1, receiver=self.u2, message="pong")
+        conversation = Conversation.for_pair(self.u1.id, self.u2.id)
+        self.assertEqual(conversation.unread_for(self.u1), 3)
+        self.assertEqual(conversation.unread_for(self.u2), 1)
+
+        self.client.login(username="u1", password="pass123")
+        self.client.get(reverse("chat:room", args=[self.u2.username]))
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.unread_for(self.u1), 0)
+        self.assertEqual(conversation.unread_for(self.u2), 1)
+
+    def test_inbox_is_ordered_by_activity_in_one_query(self):
+        ChatMessage.objects.create(sender=self.u2, receiver=self.u1, message="older")
+        ChatMessage.objects.create(sender=self.u3, receiver=self.u1, message="newer")
+        with self.assertNumQueries(1):
+            conversations = list(Conversation.objects.for_user(self.u1))
+            previews = [(c.other(self.u1).username, c.last_message.message) for c in conversations]
+        self.assertEqual(previews, [("u3", "newer"), ("u2", "older")])
+
+        self.client.login(username="u1", password="pass123")
+        resp = self.client.get(reverse("chat:inbox"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, "newer")
+        self.assertContains(resp, "@u2")
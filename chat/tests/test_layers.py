@@ -0,0 +1,89 @@
+# chat/tests/test_layers.py
+import asyncio
+import os
+import tempfile
+from contextlib import asynccontextmanager
+
+from channels.exceptions import ChannelFull
+from django.test import SimpleTestCase
+
+from chat import broker as broker_module
+from chat.broker import Broker
+from chat.layers import UnixSocketChannelLayer
+
+
+class UnixSocketChannelLayerTests(SimpleTestCase):
+    @asynccontextmanager
+    async def _layers(self, **config):
+        path = os.path.join(tempfile.mkdtemp(), "broker.sock")
+        self.broker = Broker(group_expiry=60)
+        server = await self.broker.start(path)
+        # two layers stand in for two worker processes
+        one = UnixSocketChannelLayer(path=path, capacity=3, **config)
+        two = UnixSocketChannelLayer(path=path, capacity=3)
+        try:
+            yield one, two
+        finally:
+            await one.close()
+            await two.close()
+            await self.broker.stop(server)
+
+    async def test_send_and_receive_across_connections(self):
+        async with self._layers() as (one, two):
+            channel = await two.new_channel()
+            waiting = asyncio.ensure_future(two.receive(channel))
+            await asyncio.sleep(0.01)
+            await one.send(channel, {"type": "chat.message", "message": "hi", "raw": b"\x00"})
+            self.assertEqual(await waiting, {"type": "chat.message", "message": "hi", "raw": b"\x00"})
+
+    async def test_group_send_reaches_members_in_both_processes(self):
+        async with self._layers() as (one, two):
+            a, b = await one.new_channel(), await two.new_channel()
+            await one.group_add("chat_1", a)
+            await two.group_add("chat_1", b)
+            await one.group_send("chat_1", {"type": "ping"})
+            self.assertEqual(await one.receive(a), {"type": "ping"})
+            self.assertEqual(await two.receive(b), {"type": "ping"})
+
+            await two.group_discard("chat_1", b)
+            await one.group_send("chat_1", {"type": "again"})
+            self.assertEqual(await one.receive(a), {"type": "again"})
+            self.assertEqual((await one.stats())["queued"], 0)
+
+    async def test_capacity_raises_channel_full(self):
+        async with self._layers() as (one, two):
+            channel = await one.new_channel()
+            for i in range(3):
+                await one.send(channel, {"type": "n", "i": i})
+            with self.assertRaises(ChannelFull):
+                await one.send(channel, {"type": "n", "i": 3})
+            self.assertEqual((await two.receive(channel))["i"], 0)
+
+    async def test_expired_messages_are_dropped(self):
+        async with self._layers(expiry=0) as (one, two):
+            channel = await one.new_channel()
+            await one.send(channel, {"type": "stale"})
+            await asyncio.sleep(0.01)
+            await two.send(channel, {"type": "fresh"})
+            self.assertEqual(await two.receive(channel), {"type": "fresh"})
+            await one.send(channel, {"type": "stale"})
+            await asyncio.sleep(0.01)
+            self.broker.sweep()
+            self.assertEqual((await two.stats())["queued"], 0)
+
+    async def test_cancelled_receive_does_not_lose_a_message(self):
+        async with self._layers() as (one, two):
+            channel = await one.new_channel()
+            waiting = asyncio.ensure_future(one.receive(channel))
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            await two.send(channel, {"type": "kept"})
+            self.assertEqual(await asyncio.wait_for(one.receive(channel), 1), {"type": "kept"})
+
+
+class BrokerFramingTests(SimpleTestCase):
+    def test_oversized_frames_are_rejected(self):
+        reader = asyncio.StreamReader()
+        reader.feed_data((broker_module.MAX_FRAME + 1).to_bytes(4, "big"))
+        with self.assertRaises(ValueError):
+            asyncio.run(broker_module.read_frame(reader))
@@ -0,0 +1,120 @@
+# chat/tests/test_limits.py
+import asyncio
+from unittest import mock
+
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from chat import limits
+from chat.consumers import ChatConsumer
+from chat.limits import TokenBucket, counters
+from chat.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+application = URLRouter(websocket_urlpatterns)
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=1000, burst=2)
+        self.assertTrue(bucket.take())
+        self.assertTrue(bucket.take())
+        bucket.updated -= 0.01  # 10 ms later: refilled, but capped at the burst
+        self.assertTrue(bucket.take())
+        self.assertTrue(bucket.take())
+        self.assertFalse(bucket.take())
+
+
+@override_settings(CHAT_WRITE_BEHIND=False)
+class ChatLimitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        counters.clear()
+        self.alice = User.objects.create_user(username="alice", password="x")
+        self.bob = User.objects.create_user(username="bob", password="x")
+
+    async def _connect(self):
+        communicator = WebsocketCommunicator(application, f"/ws/chat/{self.bob.username}/")
+        communicator.scope["user"] = self.alice
+        connected, code = await communicator.connect()
+        if connected:
+            for _ in range(2):  # presence frames sent on connect
+                await communicator.receive_json_from()
+        return communicator, connected, code
+
+    @override_settings(CHAT_MAX_FRAME_BYTES=64)
+    async def test_oversized_frame_closes_the_socket(self):
+        communicator, connected, _ = await self._connect()
+        self.assertTrue(connected)
+        await communicator.send_to(text_data='{"message": "' + "x" * 100 + '"}')
+        self.assertEqual(await communicator.receive_output(), {"type": "websocket.close", "code": 1009})
+        self.assertEqual(counters["frames_too_large"], 1)
+        await communicator.disconnect()
+
+    @override_settings(CHAT_RATE_PER_SECOND=0.001, CHAT_RATE_BURST=2)
+    async def test_rate_limit_and_bad_frames_are_rejected(self):
+        communicator, _, _ = await self._connect()
+        await communicator.send_to(text_data="not json")
+        self.assertEqual(await communicator.receive_json_from(), {"error": "bad_frame"})
+        await communicator.send_json_to({"message": "hi"})
+        self.assertEqual((await communicator.receive_json_from())["message"], "hi")
+        await communicator.send_json_to({"message": "again"})
+        self.assertEqual(await communicator.receive_json_from(), {"error": "rate_limited"})
+        self.assertEqual((counters["bad_frames"], counters["rate_limited"]), (1, 1))
+        await communicator.disconnect()
+
+    @override_settings(CHAT_GROUP_MAX_MEMBERS=1)
+    async def test_room_member_cap(self):
+        first, connected, _ = await self._connect()
+        self.assertTrue(connected)
+        second, connected, code = await self._connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 1013)
+        self.assertEqual(counters["group_full"], 1)
+        await first.disconnect()
+        self.assertEqual(limits.groups.members, {})
+
+    @override_settings(CHAT_CONTROL_RATE_PER_SECOND=0.001, CHAT_CONTROL_RATE_BURST=2)
+    async def test_control_frames_are_rate_limited(self):
+        communicator, _, _ = await self._connect()
+        for _ in range(5):
+            await communicator.send_json_to({"type": "heartbeat"})
+        await communicator.send_json_to({"message": "still allowed"})
+        self.assertEqual((await communicator.receive_json_from())["message"], "still allowed")
+        self.assertEqual(counters["control_rate_limited"], 3)
+        await communicator.disconnect()
+
+    async def test_failed_connect_gives_the_room_slot_back(self):
+        with mock.patch("chat.consumers.presence.connect", side_effect=RuntimeError("cache down")):
+            communicator = WebsocketCommunicator(application, f"/ws/chat/{self.bob.username}/")
+            communicator.scope["user"] = self.alice
+            await communicator.connect()
+            with self.assertRaises(RuntimeError):
+                await communicator.wait()
+        self.assertEqual(limits.groups.members, {})
+
+    async def test_slow_reader_frames_are_dropped_or_closed(self):
+        consumer = ChatConsumer()
+        consumer.sender = self.alice
+        consumer.outbound = asyncio.Queue(maxsize=1)  # no writer task: the reader is stuck
+        closed = []
+        consumer.close = lambda code=None: closed.append(code) or asyncio.sleep(0)
+        for i in range(3):
+            await consumer.chat_message({"message": str(i), "sender": "bob"})
+        self.assertEqual(counters["outbound_dropped"], 2)
+        with override_settings(CHAT_SLOW_CONSUMER="close"):
+            await consumer.chat_message({"message": "3", "sender": "bob"})
+        self.assertEqual((counters["slow_closed"], closed), (1, [1013]))
+        self.assertEqual(consumer.outbound.get_nowait()["message"], "0")
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse("chat:stats")).status_code, 302)
+        User.objects.filter(pk=self.alice.pk).update(is_staff=True)
+        data = self.client.get(reverse("chat:stats")).json()
+        self.assertEqual(set(data), {"limits", "buffer"})
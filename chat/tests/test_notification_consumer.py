@@ -0,0 +1,44 @@
+# chat/tests/test_notification_consumer.py
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import TransactionTestCase, override_settings
+
+from chat.routing import websocket_urlpatterns
+from social.fanout import deliver
+from social.models import Notification
+
+User = get_user_model()
+
+application = URLRouter(websocket_urlpatterns)
+
+
+# Consumers run on their own threads, so these tests can't use TestCase's
+# wrapping transaction.
+@override_settings(NOTIFICATION_PUSH_COALESCE_SECONDS=0.05)
+class NotificationConsumerTests(TransactionTestCase):
+    def _connect(self, user):
+        communicator = WebsocketCommunicator(application, "/ws/notifications/")
+        communicator.scope["user"] = user
+        return communicator
+
+    async def test_anonymous_connection_is_refused(self):
+        communicator = self._connect(AnonymousUser())
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
+
+    async def test_burst_is_coalesced_into_one_frame(self):
+        user = await database_sync_to_async(User.objects.create_user)(username="s1", password="x")
+        communicator = self._connect(user)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(await communicator.receive_json_from(), {"new": 0, "unread": 0})
+
+        for _ in range(3):
+            await database_sync_to_async(deliver)([user.id], Notification.Type.NEW_MATERIAL)
+
+        self.assertEqual(await communicator.receive_json_from(timeout=1), {"new": 3, "unread": 3})
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+        await communicator.disconnect()
@@ -0,0 +1,102 @@
+# chat/tests/test_presence.py
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from chat import presence
+from chat.limits import counters
+from chat.models import Conversation
+from chat.routing import websocket_urlpatterns
+
+User = get_user_model()
+
+application = URLRouter(websocket_urlpatterns)
+
+
+class PresenceRegistryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_sockets_per_user(self):
+        self.assertTrue(presence.connect(1))
+        self.assertFalse(presence.connect(1))  # second tab
+        self.assertTrue(presence.connect(2))
+        self.assertEqual(presence.online([1, 2, 3]), {1, 2})
+
+        self.assertFalse(presence.disconnect(1))
+        self.assertTrue(presence.is_online(1))
+        self.assertTrue(presence.disconnect(1))
+        self.assertEqual(presence.online([1, 2, 3]), {2})
+
+    @override_settings(PRESENCE_TTL_SECONDS=0.01)
+    def test_entries_expire_without_heartbeats(self):
+        import time
+        presence.connect(1)
+        time.sleep(0.05)
+        self.assertFalse(presence.is_online(1))
+        presence.heartbeat(1)
+        self.assertTrue(presence.is_online(1))
+
+    def test_typing_is_allowed_once_per_interval(self):
+        self.assertTrue(presence.typing_allowed(1, "chat_1"))
+        self.assertFalse(presence.typing_allowed(1, "chat_1"))
+        self.assertTrue(presence.typing_allowed(2, "chat_1"))
+
+    def test_online_endpoint(self):
+        user = User.objects.create_user(username="u", password="x")
+        presence.connect(user.id)
+        self.client.force_login(user)
+        url = reverse("chat:online_users")
+        self.assertEqual(self.client.get(url, {"ids": f"{user.id},999"}).json(), {"online": [user.id]})
+        self.assertEqual(self.client.get(url, {"ids": "a"}).status_code, 400)
+
+
+@override_settings(CHAT_WRITE_BEHIND=False)
+class ChatPresenceTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        counters.clear()
+        self.alice = User.objects.create_user(username="alice", password="x")
+        self.bob = User.objects.create_user(username="bob", password="x")
+
+    async def _connect(self, user, other):
+        communicator = WebsocketCommunicator(application, f"/ws/chat/{other.username}/")
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_presence_and_coalesced_typing(self):
+        alice = await self._connect(self.alice, self.bob)
+        self.assertEqual(await alice.receive_json_from(), {"type": "presence", "user": "bob", "online": False})
+        self.assertEqual(await alice.receive_json_from(), {"type": "presence", "user": "alice", "online": True})
+
+        bob = await self._connect(self.bob, self.alice)
+        self.assertEqual(await alice.receive_json_from(), {"type": "presence", "user": "bob", "online": True})
+
+        for _ in range(5):
+            await bob.send_json_to({"type": "typing"})
+        self.assertEqual(await alice.receive_json_from(), {"type": "typing", "user": "bob"})
+        self.assertTrue(await alice.receive_nothing(timeout=0.1))
+        self.assertEqual(counters["typing_coalesced"], 4)
+
+        await bob.disconnect()
+        self.assertEqual(await alice.receive_json_from(), {"type": "presence", "user": "bob", "online": False})
+        await alice.disconnect()
+        self.assertFalse(presence.is_online(self.alice.id))
+
+    async def test_messages_seen_live_are_not_left_unread(self):
+        alice = await self._connect(self.alice, self.bob)
+        bob = await self._connect(self.bob, self.alice)
+        await alice.send_json_to({"message": "hi bob"})
+        while (await bob.receive_json_from()).get("message") != "hi bob":
+            pass
+        await bob.disconnect()
+        await alice.disconnect()
+        conversation = await database_sync_to_async(Conversation.for_pair)(self.alice.id, self.bob.id)
+        self.assertEqual(conversation.unread_for(self.bob), 0)
+        self.assertEqual(conversation.unread_for(self.alice), 0)
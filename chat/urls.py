@@ -4,6 +4,9 @@ from . import views
 app_name = "chat"
 
 urlpatterns = [
+    path('', views.inbox, name='inbox'),
     path('history/<str:username>/', views.chat_history, name='chat_history'),
+    path('stats/counters/', views.chat_stats, name='stats'),
+    path('presence/online/', views.online_users, name='online_users'),
     path('<str:username>/', views.chat_room, name='room'),
 ]
@@ -1,28 +1,64 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth import get_user_model
-from .models import ChatMessage
+from . import limits, presence
+from .buffer import message_buffer
+from .models import ChatMessage, Conversation
 
 User = get_user_model()
 
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+
+
+def _history_page_args(request):
+    try:
+        size = int(request.GET.get("limit", HISTORY_PAGE_SIZE))
+    except (TypeError, ValueError):
+        size = HISTORY_PAGE_SIZE
+    before = request.GET.get("before")
+    if before is not None and not before.isdigit():
+        raise ValueError("before must be a message id")
+    return max(1, min(size, MAX_HISTORY_PAGE_SIZE)), int(before) if before else None
+
+
 @login_required
 def chat_history(request, username):
+    """One page of the conversation with ``username``, oldest first.
+
+    Pass ``?before=<next_before>`` to fetch the page before it. Each direction
+    of the pair is read with its own range scan on chatmessage_pair_recent and
+    the two are merged, so a page costs O(limit) however long the chat is.
+    """
     try:
         other_user = User.objects.get(username=username)
     except User.DoesNotExist:
         return JsonResponse({"error": "User not found"}, status=404)
+    try:
+        size, before = _history_page_args(request)
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
 
-    messages = ChatMessage.objects.filter(
-        sender__in=[request.user, other_user],
-        receiver__in=[request.user, other_user]
-    ).order_by("timestamp")
+    pairs = {(request.user.id, other_user.id), (other_user.id, request.user.id)}
+    rows = []
+    for sender_id, receiver_id in pairs:
+        qs = ChatMessage.objects.filter(sender_id=sender_id, receiver_id=receiver_id)
+        if before:
+            qs = qs.filter(id__lt=before)
+        rows += qs.order_by("-id").values("id", "sender__username", "message", "timestamp")[:size + 1]
+    rows.sort(key=lambda m: m["id"], reverse=True)
+    has_more = len(rows) > size
+    rows = rows[:size]
 
     history = [
-        {"sender": m.sender.username, "message": m.message, "timestamp": m.timestamp.isoformat()}
-        for m in messages
+        {"id": m["id"], "sender": m["sender__username"], "message": m["message"],
+         "timestamp": m["timestamp"].isoformat()}
+        for m in reversed(rows)
     ]
-    return JsonResponse({"messages": history})
+    return JsonResponse({"messages": history, "next_before": rows[-1]["id"] if has_more else None})
 
 # NEW: thin HTML page that hosts the WebSocket chat UI
 # @login_required
@@ -37,5 +73,39 @@ def chat_room(request, username):
     #   "/ws/chat/"               -> re_path(r"ws/chat/(?P<username>[^/]+)/$", ...)
     #   "/ws/chatroom/"           -> re_path(r"ws/chatroom/(?P<username>[^/]+)/$", ...)
     ws_base = "/ws/chat/"
-    return render(request, "chat/room.html", {"recipient": recipient, "ws_base": ws_base})
+    Conversation.for_pair(request.user.id, recipient.id).mark_read(request.user)
+    return render(request, "chat/room.html", {
+        "recipient": recipient,
+        "ws_base": ws_base,
+        "max_message_chars": limits.limit("CHAT_MAX_MESSAGE_CHARS"),
+        "heartbeat_seconds": getattr(settings, "PRESENCE_HEARTBEAT_SECONDS", 25),
+    })
+
+INBOX_SIZE = 50
+
+@login_required
+def inbox(request):
+    conversations = list(Conversation.objects.for_user(request.user)[:INBOX_SIZE])
+    rows = [
+        {"conversation": c, "other": c.other(request.user), "unread": c.unread_for(request.user)}
+        for c in conversations
+    ]
+    return render(request, "chat/inbox.html", {"rows": rows})
+
+
+MAX_PRESENCE_IDS = 200
+
+@login_required
+def online_users(request):
+    """Which of ``?ids=1,2,3`` are online: ``{"online": [ids]}``, one cache read."""
+    try:
+        ids = [int(i) for i in request.GET.get("ids", "").split(",") if i]
+    except ValueError:
+        return JsonResponse({"detail": "ids must be comma-separated user ids"}, status=400)
+    return JsonResponse({"online": sorted(presence.online(ids[:MAX_PRESENCE_IDS]))})
+
 
+@staff_member_required
+def chat_stats(request):
+    """This process's chat limit counters and write-behind buffer stats."""
+    return JsonResponse({"limits": limits.stats(), "buffer": message_buffer.stats()})
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -25,6 +26,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "social.context_processors.notifications",
             ],
         },
     },
@@ -169,8 +171,14 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    # keyset (cursor) pages: ?cursor=<next>&limit=, see api/pagination.py
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.KeysetPagination",
     "PAGE_SIZE": 10,
+    # same JSON as DRF's renderer, with the encoder built once (api/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 
@@ -202,9 +210,89 @@ ASGI_APPLICATION = "config.asgi.application"
     #     "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
     # }
 
-CHANNEL_LAYERS = {
-    "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
-}
+# Several ASGI workers on one host: run `manage.py channel_broker` and point
+# CHANNEL_BROKER_SOCKET at its socket (chat/layers.py). Otherwise in-memory,
+# which only reaches consumers in the same process.
+CHANNEL_BROKER_SOCKET = os.getenv("CHANNEL_BROKER_SOCKET")
+if CHANNEL_BROKER_SOCKET:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "chat.layers.UnixSocketChannelLayer",
+            "CONFIG": {"path": CHANNEL_BROKER_SOCKET},
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+
+# Notification fan-out (social/fanout.py): write notifications on a background
+# thread after commit, in bulk_create chunks of this size.
+NOTIFICATION_FANOUT_ASYNC = True
+NOTIFICATION_FANOUT_CHUNK_SIZE = 1000
+# Open notification sockets merge updates that arrive within this window
+# into a single frame (chat.consumers.NotificationConsumer).
+NOTIFICATION_PUSH_COALESCE_SECONDS = 0.5
+# prune_notifications archives read notifications older than this.
+NOTIFICATION_RETENTION_DAYS = 30
+# ...and digests only notifications older than this, so fresh ones stay
+# separate while their recipients are still likely to be looking.
+NOTIFICATION_DIGEST_MIN_AGE_MINUTES = 60
+# Status updates are copied into each classmate's timeline unless the author's
+# courses hold more students than this; those are read on demand instead.
+TIMELINE_FANOUT_LIMIT = 5000
+# Opt-in: chat messages are broadcast first and written in batches by
+# chat.buffer, every CHAT_FLUSH_INTERVAL_MS or CHAT_FLUSH_BATCH_SIZE messages.
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "") == "1"
+CHAT_FLUSH_INTERVAL_MS = 200
+CHAT_FLUSH_BATCH_SIZE = 100
+# Chat flood limits (chat/limits.py). Frames over CHAT_MAX_FRAME_BYTES close
+# the socket; each connection may send CHAT_RATE_PER_SECOND messages with
+# bursts of CHAT_RATE_BURST, and heartbeat/typing frames at the CHAT_CONTROL_*
+# rate (extras are ignored); readers more than CHAT_OUTBOUND_QUEUE frames
+# behind are dropped from ("drop") or disconnected ("close").
+CHAT_MAX_FRAME_BYTES = 8192
+CHAT_MAX_MESSAGE_CHARS = 4000
+CHAT_RATE_PER_SECOND = 5
+CHAT_RATE_BURST = 10
+CHAT_CONTROL_RATE_PER_SECOND = 2
+CHAT_CONTROL_RATE_BURST = 10
+CHAT_OUTBOUND_QUEUE = 100
+CHAT_SLOW_CONSUMER = "drop"
+# per room, per process: sockets joined and messages fanned out per second
+CHAT_GROUP_MAX_MEMBERS = 20
+CHAT_GROUP_RATE_PER_SECOND = 20
+CHAT_GROUP_RATE_BURST = 40
+# Presence (chat/presence.py): chat pages send a heartbeat every
+# PRESENCE_HEARTBEAT_SECONDS; users silent for PRESENCE_TTL_SECONDS go offline.
+PRESENCE_HEARTBEAT_SECONDS = 25
+PRESENCE_TTL_SECONDS = 60
+CHAT_TYPING_INTERVAL_SECONDS = 3
+
+# Cache: shared Redis when REDIS_URL is set (needed for cache invalidation to
+# reach every worker process), otherwise per-process memory for development.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+# Whether all worker processes share the default cache. Version stamps kept
+# there (course member index, api/ ETags) are only trusted when they do.
+SHARED_CACHE = bool(os.getenv("REDIS_URL"))
+
+# Snapshot of the in-memory course member index (courses/membership.py),
+# written at exit and read on start; unset keeps it in memory only.
+COURSE_MEMBER_INDEX_PATH = os.getenv("COURSE_MEMBER_INDEX_PATH")
+
+# Dashboard fragments are cached per user and invalidated by accounts/signals.py;
+# this bounds staleness for changes no signal tracks.
+DASHBOARD_CACHE_SECONDS = 300
 
 #Login 
 LOGIN_URL = "/accounts/login/"
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Course, Enrollment, Material, Feedback
+from .models import Course, CourseStats, Enrollment, Material, Feedback
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
@@ -21,3 +21,10 @@ class MaterialAdmin(admin.ModelAdmin):
 class FeedbackAdmin(admin.ModelAdmin):
     list_display = ("course", "student", "rating", "created_at")
     list_filter = ("rating", "course")
+
+
+@admin.register(CourseStats)
+class CourseStatsAdmin(admin.ModelAdmin):
+    list_display = ("course", "active_enrollments", "material_count", "assignment_count",
+                    "rating_avg", "rating_count", "updated_at")
+    readonly_fields = [f for f in CourseStats.COUNTER_FIELDS] + ["updated_at"]
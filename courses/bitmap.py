@@ -0,0 +1,230 @@
+# courses/bitmap.py
+"""A compact set of non-negative integers (user or course ids).
+
+Roaring-style layout: ids are split into a 16-bit high part, which selects a
+container, and a 16-bit low part stored in it. Sparse containers are sorted
+``array('H')`` (2 bytes per id); once one holds more than ``ARRAY_MAX`` ids
+it becomes an 8 KiB bitset, whose unions and intersections run as single
+big-integer operations.
+"""
+import struct
+from array import array
+from bisect import bisect_left
+
+ARRAY_MAX = 4096
+BITSET_BYTES = 1 << 13  # 65536 bits
+
+_HEADER = struct.Struct("<I")
+_CONTAINER = struct.Struct("<HBI")  # high bits, kind, payload length
+_ARRAY, _BITSET = 0, 1
+
+
+def _bits_to_array(bits: int) -> array:
+    out = array("H")
+    for i, byte in enumerate(bits.to_bytes(BITSET_BYTES, "little")):
+        if byte:
+            base = i << 3
+            out.extend(base | j for j in range(8) if byte >> j & 1)
+    return out
+
+
+def _array_to_bits(values) -> int:
+    buf = bytearray(BITSET_BYTES)
+    for v in values:
+        buf[v >> 3] |= 1 << (v & 7)
+    return int.from_bytes(buf, "little")
+
+
+class _Container:
+    """One 2**16 slice of the id space: an array or a bitset (as an int)."""
+    __slots__ = ("values", "bits", "size")
+
+    def __init__(self, values=None, bits=None):
+        self.values = values
+        self.bits = bits
+        self.size = len(values) if values is not None else bits.bit_count()
+
+    @classmethod
+    def from_bits(cls, bits: int):
+        if bits.bit_count() <= ARRAY_MAX:
+            return cls(values=_bits_to_array(bits))
+        return cls(bits=bits)
+
+    def as_bits(self) -> int:
+        return self.bits if self.values is None else _array_to_bits(self.values)
+
+    def __contains__(self, low):
+        if self.values is None:
+            return bool(self.bits >> low & 1)
+        i = bisect_left(self.values, low)
+        return i < len(self.values) and self.values[i] == low
+
+    def add(self, low) -> bool:
+        if self.values is None:
+            if self.bits >> low & 1:
+                return False
+            self.bits |= 1 << low
+        else:
+            i = bisect_left(self.values, low)
+            if i < len(self.values) and self.values[i] == low:
+                return False
+            self.values.insert(i, low)
+            if len(self.values) > ARRAY_MAX:
+                self.bits, self.values = _array_to_bits(self.values), None
+        self.size += 1
+        return True
+
+    def discard(self, low) -> bool:
+        if low not in self:
+            return False
+        if self.values is None:
+            self.bits &= ~(1 << low)
+            if self.size - 1 <= ARRAY_MAX:
+                self.values, self.bits = _bits_to_array(self.bits), None
+        else:
+            del self.values[bisect_left(self.values, low)]
+        self.size -= 1
+        return True
+
+    def __iter__(self):
+        if self.values is not None:
+            return iter(self.values)
+        return iter(_bits_to_array(self.bits))
+
+    def copy(self):
+        if self.values is None:
+            return _Container(bits=self.bits)
+        return _Container(values=array("H", self.values))
+
+    def to_bytes(self) -> tuple[int, bytes]:
+        if self.values is None:
+            return _BITSET, self.bits.to_bytes(BITSET_BYTES, "little")
+        return _ARRAY, self.values.tobytes()
+
+    @classmethod
+    def from_bytes(cls, kind, payload):
+        if kind == _BITSET:
+            return cls(bits=int.from_bytes(payload, "little"))
+        values = array("H")
+        values.frombytes(payload)
+        return cls(values=values)
+
+
+class Bitmap:
+    """A set of ints in ``[0, 2**32)`` with fast union, intersection and membership."""
+
+    __slots__ = ("_containers",)
+
+    def __init__(self, ids=()):
+        self._containers: dict[int, _Container] = {}
+        lows: dict[int, set[int]] = {}
+        for i in ids:
+            lows.setdefault(i >> 16, set()).add(i & 0xFFFF)
+        for high, values in lows.items():
+            if len(values) > ARRAY_MAX:
+                self._containers[high] = _Container(bits=_array_to_bits(values))
+            else:
+                self._containers[high] = _Container(values=array("H", sorted(values)))
+
+    def add(self, i: int) -> None:
+        high, low = i >> 16, i & 0xFFFF
+        container = self._containers.get(high)
+        if container is None:
+            self._containers[high] = _Container(values=array("H", [low]))
+        else:
+            container.add(low)
+
+    def discard(self, i: int) -> None:
+        high = i >> 16
+        container = self._containers.get(high)
+        if container is not None and container.discard(i & 0xFFFF) and not container.size:
+            del self._containers[high]
+
+    def __contains__(self, i) -> bool:
+        container = self._containers.get(i >> 16)
+        return container is not None and (i & 0xFFFF) in container
+
+    def __len__(self) -> int:
+        return sum(c.size for c in self._containers.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._containers)
+
+    def __iter__(self):
+        for high in sorted(self._containers):
+            base = high << 16
+            for low in self._containers[high]:
+                yield base | low
+
+    def __eq__(self, other):
+        return isinstance(other, Bitmap) and list(self) == list(other)
+
+    def __repr__(self):
+        return f"Bitmap({len(self)} ids)"
+
+    def copy(self) -> "Bitmap":
+        out = Bitmap()
+        out._containers = {h: c.copy() for h, c in self._containers.items()}
+        return out
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        out = self.copy()
+        for high, container in other._containers.items():
+            mine = out._containers.get(high)
+            if mine is None:
+                out._containers[high] = container.copy()
+            else:
+                out._containers[high] = _Container.from_bits(mine.as_bits() | container.as_bits())
+        return out
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        out = Bitmap()
+        small, large = sorted((self, other), key=lambda b: len(b._containers))
+        for high, container in small._containers.items():
+            theirs = large._containers.get(high)
+            if theirs is None:
+                continue
+            bits = container.as_bits() & theirs.as_bits()
+            if bits:
+                out._containers[high] = _Container.from_bits(bits)
+        return out
+
+    @classmethod
+    def union(cls, bitmaps) -> "Bitmap":
+        out = cls()
+        for b in bitmaps:
+            out = out | b
+        return out
+
+    @classmethod
+    def intersection(cls, bitmaps) -> "Bitmap":
+        bitmaps = sorted(bitmaps, key=len)
+        if not bitmaps:
+            return cls()
+        out = bitmaps[0]
+        for b in bitmaps[1:]:
+            if not out:
+                break
+            out = out & b
+        return out.copy() if out is bitmaps[0] else out
+
+    def to_bytes(self) -> bytes:
+        parts = [_HEADER.pack(len(self._containers))]
+        for high in sorted(self._containers):
+            kind, payload = self._containers[high].to_bytes()
+            parts.append(_CONTAINER.pack(high, kind, len(payload)))
+            parts.append(payload)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, offset: int = 0) -> tuple["Bitmap", int]:
+        """Decode a bitmap at ``offset``; returns it and the offset just past it."""
+        out = cls()
+        (count,) = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        for _ in range(count):
+            high, kind, length = _CONTAINER.unpack_from(data, offset)
+            offset += _CONTAINER.size
+            out._containers[high] = _Container.from_bytes(kind, data[offset:offset + length])
+            offset += length
+        return out, offset
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.membership import course_members
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = "Build the active course member index and write it to COURSE_MEMBER_INDEX_PATH for warm restarts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", help="Snapshot file (default: COURSE_MEMBER_INDEX_PATH).")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        ids = Course.objects.order_by("id").values_list("id", flat=True)
+        batch, courses, members = [], 0, 0
+        for course_id in ids.iterator(chunk_size=options["batch_size"]):
+            batch.append(course_id)
+            if len(batch) >= options["batch_size"]:
+                members += len(course_members.union(batch))
+                courses += len(batch)
+                batch = []
+        if batch:
+            members += len(course_members.union(batch))
+            courses += len(batch)
+        written = course_members.save(options["path"])
+        if not written and courses:
+            raise CommandError("No snapshot path: pass --path or set COURSE_MEMBER_INDEX_PATH.")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {courses} course(s), {members} membership(s) in {elapsed:.2f}s; wrote {written} entries."
+        ))
@@ -0,0 +1,228 @@
+# courses/membership.py
+"""In-memory index of active course members.
+
+``course_members`` answers "who is actively enrolled in course X" and "which
+courses does user U attend" from :class:`~courses.bitmap.Bitmap` sets
+instead of joins over Enrollment. Both directions are loaded lazily, one
+course or student at a time, and kept current by ``courses.signals``.
+
+Every entry carries a version stamp that is also stored in the Django
+cache. Writers bump it after commit. Before an entry is used, its stamp is
+compared with the cache, so a change made by another worker process is
+reloaded rather than served stale. Reads made inside a transaction are
+not kept, as they may include uncommitted enrolments.
+
+The stamps are only as shared as the cache: with a per-process backend
+such as LocMemCache, workers can't see each other's bumps. Unless
+``SHARED_CACHE`` is set, nothing is kept and every lookup queries
+Enrollment. Access checks and notification fan-out query Enrollment
+regardless.
+
+With ``COURSE_MEMBER_INDEX_PATH`` set, the index is written to that file at
+exit (or by ``manage.py course_member_index --save``) and read back on the
+next start.
+"""
+import atexit
+import logging
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .bitmap import Bitmap
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"CMIX1"
+_ENTRY = struct.Struct("<BQQ")  # kind, id, version
+_COURSE, _STUDENT = 0, 1
+
+
+def _version_key(kind, obj_id):
+    return f"course_members:{'c' if kind == _COURSE else 's'}:{obj_id}"
+
+
+class CourseMemberIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        # (kind, id) -> (version, Bitmap)
+        self._entries: dict[tuple[int, int], tuple[int, Bitmap]] = {}
+        self._loaded_snapshot = False
+
+    # ----- queries -----
+
+    def students(self, course_id) -> Bitmap:
+        """Active students of ``course_id``. Treat as read-only."""
+        return self._get_many(_COURSE, [course_id])[course_id]
+
+    def courses_of(self, user_id) -> Bitmap:
+        """Courses ``user_id`` is actively enrolled in. Treat as read-only."""
+        return self._get_many(_STUDENT, [user_id])[user_id]
+
+    def is_member(self, course_id, user_id) -> bool:
+        return user_id in self.students(course_id)
+
+    def union(self, course_ids) -> Bitmap:
+        """Students active in any of ``course_ids``."""
+        return Bitmap.union(self._get_many(_COURSE, course_ids).values())
+
+    def intersection(self, course_ids) -> Bitmap:
+        """Students active in every one of ``course_ids``."""
+        return Bitmap.intersection(list(self._get_many(_COURSE, course_ids).values()))
+
+    def shared_courses(self, user_a, user_b) -> Bitmap:
+        """Courses both users are actively enrolled in."""
+        found = self._get_many(_STUDENT, [user_a, user_b])
+        return found[user_a] & found[user_b]
+
+    def classmates(self, user_id) -> Bitmap:
+        """Everyone sharing an active course with ``user_id`` (excluding them)."""
+        out = self.union(self.courses_of(user_id))
+        out.discard(user_id)
+        return out
+
+    # ----- maintenance -----
+
+    def forget(self, course_id, student_id):
+        """Drop local entries touched by an uncommitted enrolment change."""
+        with self._lock:
+            self._entries.pop((_COURSE, course_id), None)
+            self._entries.pop((_STUDENT, student_id), None)
+
+    def record(self, course_id, student_id, active):
+        """Apply one enrolment change; call after it has been committed."""
+        self.record_many([(course_id, student_id, active)])
+
+    def record_many(self, changes):
+        stamp = time.time_ns()
+        stamps = {}
+        with self._lock:
+            for course_id, student_id, active in changes:
+                for key, member in (((_COURSE, course_id), student_id), ((_STUDENT, student_id), course_id)):
+                    stamps[_version_key(*key)] = stamp
+                    entry = self._entries.get(key)
+                    if entry is None:
+                        continue  # not loaded here; loaded fresh when first needed
+                    bitmap = entry[1]
+                    if active:
+                        bitmap.add(member)
+                    else:
+                        bitmap.discard(member)
+                    self._entries[key] = (stamp, bitmap)
+        cache.set_many(stamps, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get_many(self, kind, ids):
+        ids = list(ids)
+        if not getattr(settings, "SHARED_CACHE", False):
+            found = {obj_id: [] for obj_id in ids}
+            for obj_id, member in self._query(kind, ids):
+                found[obj_id].append(member)
+            return {obj_id: Bitmap(member_ids) for obj_id, member_ids in found.items()}
+        self._load_snapshot_once()
+        keys = {obj_id: _version_key(kind, obj_id) for obj_id in ids}
+        remote = cache.get_many(keys.values())
+        found, stale = {}, []
+        for obj_id in ids:
+            entry = self._entries.get((kind, obj_id))
+            version = remote.get(keys[obj_id])
+            if entry is not None and version is not None and entry[0] == version:
+                found[obj_id] = entry[1]
+            else:
+                stale.append(obj_id)
+        if not stale:
+            return found
+
+        loaded = {obj_id: [] for obj_id in stale}
+        for obj_id, member in self._query(kind, stale):
+            loaded[obj_id].append(member)
+        # A read inside a transaction may see uncommitted enrolments: use it,
+        # but don't keep it.
+        keep = not connection.in_atomic_block
+        for obj_id, member_ids in loaded.items():
+            bitmap = found[obj_id] = Bitmap(member_ids)
+            if not keep:
+                continue
+            version = remote.get(keys[obj_id])
+            if version is None:
+                version = time.time_ns()
+                if not cache.add(keys[obj_id], version, None):
+                    # bumped by a commit after our read: the read may predate it
+                    continue
+            with self._lock:
+                self._entries[(kind, obj_id)] = (version, bitmap)
+        return found
+
+    @staticmethod
+    def _query(kind, ids):
+        from .models import Enrollment
+
+        active = Enrollment.objects.filter(status=Enrollment.Status.ACTIVE)
+        if kind == _COURSE:
+            return active.filter(course_id__in=ids).values_list("course_id", "student_id")
+        return active.filter(student_id__in=ids).values_list("student_id", "course_id")
+
+    # ----- persistence -----
+
+    def save(self, path=None):
+        path = path or getattr(settings, "COURSE_MEMBER_INDEX_PATH", None)
+        if not path:
+            return 0
+        with self._lock:
+            entries = list(self._entries.items())
+        tmp = f"{path}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC + struct.pack("<I", len(entries)))
+            for (kind, obj_id), (version, bitmap) in entries:
+                f.write(_ENTRY.pack(kind, obj_id, version))
+                f.write(bitmap.to_bytes())
+        os.replace(tmp, path)
+        return len(entries)
+
+    def load(self, path=None):
+        path = path or getattr(settings, "COURSE_MEMBER_INDEX_PATH", None)
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(_MAGIC):
+            logger.warning("Ignoring %s: not a course member index", path)
+            return 0
+        offset = len(_MAGIC)
+        (count,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        loaded = {}
+        for _ in range(count):
+            kind, obj_id, version = _ENTRY.unpack_from(data, offset)
+            bitmap, offset = Bitmap.from_bytes(data, offset + _ENTRY.size)
+            loaded[(kind, obj_id)] = (version, bitmap)
+        with self._lock:
+            # entries loaded since start are at least as fresh as the file
+            for key, entry in loaded.items():
+                self._entries.setdefault(key, entry)
+        return count
+
+    def _load_snapshot_once(self):
+        if self._loaded_snapshot:
+            return
+        with self._lock:
+            if self._loaded_snapshot:
+                return
+            self._loaded_snapshot = True
+            try:
+                self.load()
+            except (OSError, struct.error):
+                logger.exception("Could not read the course member index snapshot")
+            if getattr(settings, "COURSE_MEMBER_INDEX_PATH", None):
+                atexit.register(self.save)
+
+
+course_members = CourseMemberIndex()
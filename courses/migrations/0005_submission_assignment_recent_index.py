@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_assignment_submission'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assignment', '-submitted_at', '-id'], name='submission_assignment_recent'),
+        ),
+    ]
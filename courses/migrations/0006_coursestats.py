@@ -0,0 +1,35 @@
+# Generated by Django 5.0.6 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_submission_assignment_recent_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='courses.course')),
+                ('active_enrollments', models.IntegerField(default=0)),
+                ('material_count', models.IntegerField(default=0)),
+                ('assignment_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('rating_1', models.IntegerField(default=0)),
+                ('rating_2', models.IntegerField(default=0)),
+                ('rating_3', models.IntegerField(default=0)),
+                ('rating_4', models.IntegerField(default=0)),
+                ('rating_5', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'course stats',
+                'indexes': [models.Index(fields=['-active_enrollments'], name='coursestats_popularity')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_coursestats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['teacher', 'id'], name='course_teacher_id'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['title', 'id'], name='course_title_id'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['-created_at', '-id'], name='course_newest'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['student', '-created_at', '-id'], name='enrollment_student_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['course', '-created_at', '-id'], name='enrollment_course_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['course', '-created_at', '-id'], name='feedback_course_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['-created_at', '-id'], name='feedback_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['course', '-created_at', '-id'], name='material_course_recent'),
+        ),
+    ]
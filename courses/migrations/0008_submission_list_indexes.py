@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 10:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_api_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['student', '-submitted_at', '-id'], name='submission_student_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['-submitted_at', '-id'], name='submission_recent'),
+        ),
+    ]
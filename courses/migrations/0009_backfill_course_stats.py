@@ -0,0 +1,56 @@
+from django.db import migrations
+from django.db.models import Count
+
+COUNTER_FIELDS = [
+    "active_enrollments", "material_count", "assignment_count",
+    "rating_sum", "rating_count",
+    "rating_1", "rating_2", "rating_3", "rating_4", "rating_5",
+]
+
+
+def backfill(apps, schema_editor):
+    # The same GROUP BY queries as CourseStats.objects.rebuild(), against the
+    # historical models so later schema changes can't break this migration.
+    Course = apps.get_model("courses", "Course")
+    CourseStats = apps.get_model("courses", "CourseStats")
+    Enrollment = apps.get_model("courses", "Enrollment")
+    Material = apps.get_model("courses", "Material")
+    Assignment = apps.get_model("courses", "Assignment")
+    Feedback = apps.get_model("courses", "Feedback")
+
+    ids = list(Course.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        rows = {cid: CourseStats(course_id=cid) for cid in chunk}
+
+        active = (Enrollment.objects.filter(course_id__in=chunk, status="active")
+                  .values_list("course_id").annotate(n=Count("id")))
+        for cid, n in active:
+            rows[cid].active_enrollments = n
+        for cid, n in Material.objects.filter(course_id__in=chunk).values_list("course_id").annotate(n=Count("id")):
+            rows[cid].material_count = n
+        for cid, n in Assignment.objects.filter(course_id__in=chunk).values_list("course_id").annotate(n=Count("id")):
+            rows[cid].assignment_count = n
+        ratings = (Feedback.objects.filter(course_id__in=chunk)
+                   .values_list("course_id", "rating").annotate(n=Count("id")))
+        for cid, rating, n in ratings:
+            stats = rows[cid]
+            stats.rating_sum += rating * n
+            stats.rating_count += n
+            if 1 <= rating <= 5:
+                setattr(stats, f"rating_{rating}", n)
+
+        CourseStats.objects.bulk_create(
+            rows.values(), update_conflicts=True, unique_fields=["course"], update_fields=COUNTER_FIELDS,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0008_submission_list_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,133 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
 from django.utils.text import slugify
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import Count, ExpressionWrapper, F, Q
+from django.db.models.functions import Cast, NullIf
+from django.dispatch import Signal
 
 User = settings.AUTH_USER_MODEL
 
+SLUG_MAX_LENGTH = 50
+SLUG_RETRIES = 5
+
+# Sent with ``courses`` after CourseQuerySet.bulk_create_with_slugs, which
+# inserts without per-row signals. Defined here because courses.signals
+# imports this module.
+courses_bulk_created = Signal()
+
+
+def slug_base(title):
+    """Slugified title, trimmed so a ``-<n>`` suffix still fits the column."""
+    return (slugify(title)[:SLUG_MAX_LENGTH - 7].strip("-")) or "course"
+
+
+def _taken_suffixes(base, slugs):
+    """Suffix numbers already used for ``base``; the bare base counts as 1."""
+    taken = set()
+    prefix = f"{base}-"
+    for slug in slugs:
+        if slug == base:
+            taken.add(1)
+        elif slug.startswith(prefix) and slug[len(prefix):].isdigit():
+            taken.add(int(slug[len(prefix):]))
+    return taken
+
+
+def _next_slug(base, taken):
+    n = max(taken, default=0) + 1
+    return base if n == 1 else f"{base}-{n}"
+
+
+def allocate_slug(base, exclude_pk=None):
+    """Next free slug for ``base`` using a single prefix scan."""
+    qs = Course.objects.filter(slug__startswith=base)
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    return _next_slug(base, _taken_suffixes(base, qs.values_list("slug", flat=True)))
+
+
+class CourseQuerySet(models.QuerySet):
+    def with_stats(self):
+        """Join the CourseStats row and expose ``rating_avg`` for sorting/filtering."""
+        return self.select_related("stats").annotate(
+            rating_avg=ExpressionWrapper(
+                Cast("stats__rating_sum", models.FloatField()) / NullIf("stats__rating_count", 0),
+                output_field=models.FloatField(),
+            )
+        )
+
+    def catalogue(self, sort="title", min_rating=None):
+        """Catalogue listing sorted by ``title``, ``popular``, ``rating`` or ``newest``."""
+        qs = self.with_stats()
+        if min_rating is not None:
+            qs = qs.filter(rating_avg__gte=min_rating)
+        if sort == "popular":
+            return qs.order_by(F("stats__active_enrollments").desc(nulls_last=True), "title")
+        if sort == "rating":
+            return qs.order_by(F("rating_avg").desc(nulls_last=True), F("stats__rating_count").desc(nulls_last=True), "title")
+        if sort == "newest":
+            return qs.order_by("-created_at")
+        return qs.order_by("title")
+
+    def bulk_create_with_slugs(self, courses, batch_size=1000):
+        """Insert many courses at once, allocating unique slugs for those without one.
+
+        Costs one prefix scan per ``batch_size`` distinct title bases plus the
+        inserts, instead of a save() (and a slug search) per course. Signals do
+        not fire for bulk inserts, so the CourseStats rows are created here
+        and ``courses_bulk_created`` is sent instead.
+        """
+        courses = list(courses)
+        for attempt in range(SLUG_RETRIES):
+            self._assign_slugs(courses, batch_size)
+            try:
+                with transaction.atomic():
+                    created = self.bulk_create(courses, batch_size=batch_size)
+                    if any(c.pk is None for c in created):  # backends that can't return ids
+                        ids = dict(Course.objects.filter(slug__in=[c.slug for c in created])
+                                   .values_list("slug", "id"))
+                        for c in created:
+                            c.pk = ids[c.slug]
+                    CourseStats.objects.bulk_create(
+                        [CourseStats(course_id=c.pk) for c in created],
+                        batch_size=batch_size, ignore_conflicts=True,
+                    )
+                    courses_bulk_created.send(sender=Course, courses=created)
+                    return created
+            except IntegrityError:
+                # lost a race for one of the slugs: forget the generated ones and rescan
+                for c in courses:
+                    if getattr(c, "_generated_slug", False):
+                        c.slug = ""
+                if attempt == SLUG_RETRIES - 1:
+                    raise
+
+    @staticmethod
+    def _assign_slugs(courses, batch_size):
+        pending = [c for c in courses if not c.slug]
+        reserved = {c.slug for c in courses if c.slug}
+        bases = [slug_base(c.title) for c in pending]
+        distinct = sorted(set(bases))
+        taken: dict[str, set[int]] = {}
+        for start in range(0, len(distinct), batch_size):
+            chunk = distinct[start:start + batch_size]
+            prefix_filter = Q()
+            for base in chunk:
+                prefix_filter |= Q(slug__startswith=base)
+            existing = list(Course.objects.filter(prefix_filter).values_list("slug", flat=True)) + list(reserved)
+            for base in chunk:
+                taken[base] = _taken_suffixes(base, existing)
+        for c, base in zip(pending, bases):
+            c.slug = _next_slug(base, taken[base])
+            taken[base] |= _taken_suffixes(base, [c.slug])
+            c._generated_slug = True
+
+
 class Course(models.Model):
     title = models.CharField(max_length=200)
-    slug = models.SlugField(unique=True, blank=True)
+    slug = models.SlugField(max_length=SLUG_MAX_LENGTH, unique=True, blank=True)
     thumbnail = models.ImageField(upload_to="course_thumbs/%Y/%m/%d", blank=True, null=True)
     description = models.TextField(blank=True)
     teacher = models.ForeignKey(
@@ -19,20 +138,67 @@ class Course(models.Model):
     end_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # api/ keyset orders (see api/pagination.py)
+            models.Index(fields=["teacher", "id"], name="course_teacher_id"),
+            models.Index(fields=["title", "id"], name="course_title_id"),
+            models.Index(fields=["-created_at", "-id"], name="course_newest"),
+        ]
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base = slugify(self.title) or "course"
-            slug = base
-            i = 1
-            while Course.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-                i += 1
-                slug = f"{base}-{i}"
-            self.slug = slug
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+        # Pick the next free slug with one prefix scan; if a concurrent create
+        # takes it first the unique index rejects ours and we scan again.
+        base = slug_base(self.title)
+        for attempt in range(SLUG_RETRIES):
+            self.slug = allocate_slug(base, exclude_pk=self.pk)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken = Course.objects.filter(slug=self.slug).exclude(pk=self.pk).exists()
+                self.slug = ""
+                if not taken or attempt == SLUG_RETRIES - 1:
+                    raise
 
     def __str__(self):
         return self.title
 
+class EnrollmentQuerySet(models.QuerySet):
+    def insert_active(self, pairs):
+        """Insert active enrolments for ``(course_id, student_id)`` pairs.
+
+        Returns the set of pairs actually inserted. One ``bulk_create``; if a
+        concurrent writer got some pair in first, the insert is retried row by
+        row in savepoints, skipping the conflicts, so callers count and
+        signal only rows they wrote. Like ``bulk_create``, sends no signals.
+        """
+        pairs = list(pairs)
+
+        def rows(chunk):
+            return [Enrollment(course_id=c, student_id=s, status=Enrollment.Status.ACTIVE) for c, s in chunk]
+
+        try:
+            with transaction.atomic():
+                self.bulk_create(rows(pairs))
+            return set(pairs)
+        except IntegrityError:
+            pass
+        inserted = set()
+        for pair in pairs:
+            try:
+                with transaction.atomic():
+                    self.bulk_create(rows([pair]))
+            except IntegrityError:
+                continue
+            inserted.add(pair)
+        return inserted
+
+
 class Enrollment(models.Model):
     class Status(models.TextChoices):
         ACTIVE = "active", "Active"
@@ -47,9 +213,15 @@ class Enrollment(models.Model):
     status = models.CharField(max_length=10, choices=Status.choices, default=Status.ACTIVE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = EnrollmentQuerySet.as_manager()
+
     class Meta:
         unique_together = ("student", "course")
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["student", "-created_at", "-id"], name="enrollment_student_recent"),
+            models.Index(fields=["course", "-created_at", "-id"], name="enrollment_course_recent"),
+        ]
 
     def __str__(self):
         return f"{self.student} → {self.course} ({self.status})"
@@ -60,6 +232,11 @@ class Material(models.Model):
     file = models.FileField(upload_to="materials/%Y/%m/%d")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["course", "-created_at", "-id"], name="material_course_recent"),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.course})"
 
@@ -77,6 +254,10 @@ class Feedback(models.Model):
 
     class Meta:
         unique_together = ("course", "student")
+        indexes = [
+            models.Index(fields=["course", "-created_at", "-id"], name="feedback_course_recent"),
+            models.Index(fields=["-created_at", "-id"], name="feedback_recent"),
+        ]
 
     def __str__(self):
         return f"{self.course} ← {self.student} [{self.rating}]"
@@ -113,6 +294,128 @@ class Submission(models.Model):
     class Meta:
         unique_together = ("assignment", "student")
         ordering = ("-submitted_at",)
+        indexes = [
+            # keyset pagination of a course's submission panel
+            models.Index(fields=["assignment", "-submitted_at", "-id"], name="submission_assignment_recent"),
+            # api/ submissions list: a student's own, and a teacher's across courses
+            models.Index(fields=["student", "-submitted_at", "-id"], name="submission_student_recent"),
+            models.Index(fields=["-submitted_at", "-id"], name="submission_recent"),
+        ]
 
     def __str__(self):
         return f"{self.assignment} ← @{self.student.username}"
+
+
+class CourseStatsQuerySet(models.QuerySet):
+    def rebuild(self, course_ids=None, batch_size=500):
+        """Recompute stats rows from the source tables; returns the number of courses written.
+
+        Runs a handful of GROUP BY queries per batch of courses and upserts the
+        results, so it is safe to run against a live site.
+        """
+        course_qs = Course.objects.order_by("id").values_list("id", flat=True)
+        if course_ids is not None:
+            course_qs = course_qs.filter(id__in=list(course_ids))
+        ids = list(course_qs)
+        written = 0
+        for start in range(0, len(ids), batch_size):
+            chunk = ids[start:start + batch_size]
+            rows = {cid: CourseStats(course_id=cid) for cid in chunk}
+
+            active = (Enrollment.objects.filter(course_id__in=chunk, status=Enrollment.Status.ACTIVE)
+                      .values_list("course_id").annotate(n=Count("id")))
+            for cid, n in active:
+                rows[cid].active_enrollments = n
+            for cid, n in Material.objects.filter(course_id__in=chunk).values_list("course_id").annotate(n=Count("id")):
+                rows[cid].material_count = n
+            for cid, n in Assignment.objects.filter(course_id__in=chunk).values_list("course_id").annotate(n=Count("id")):
+                rows[cid].assignment_count = n
+            ratings = (Feedback.objects.filter(course_id__in=chunk)
+                       .values_list("course_id", "rating").annotate(n=Count("id")))
+            for cid, rating, n in ratings:
+                stats = rows[cid]
+                stats.rating_sum += rating * n
+                stats.rating_count += n
+                field = CourseStats.histogram_field(rating)
+                if field:
+                    setattr(stats, field, n)
+
+            self.bulk_create(
+                rows.values(),
+                update_conflicts=True,
+                unique_fields=["course"],
+                update_fields=CourseStats.COUNTER_FIELDS,
+            )
+            written += len(chunk)
+        return written
+
+
+class CourseStats(models.Model):
+    """Denormalized per-course counters for catalogue pages and the API.
+
+    Kept current incrementally by the signals in ``courses/signals.py``;
+    ``manage.py rebuild_course_stats`` recomputes it from scratch.
+    """
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    active_enrollments = models.IntegerField(default=0)
+    material_count = models.IntegerField(default=0)
+    assignment_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_count = models.IntegerField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    COUNTER_FIELDS = [
+        "active_enrollments", "material_count", "assignment_count",
+        "rating_sum", "rating_count",
+        "rating_1", "rating_2", "rating_3", "rating_4", "rating_5",
+    ]
+
+    objects = CourseStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = "course stats"
+        indexes = [
+            models.Index(fields=["-active_enrollments"], name="coursestats_popularity"),
+        ]
+
+    def __str__(self):
+        return f"Stats for {self.course_id}"
+
+    @staticmethod
+    def histogram_field(rating):
+        return f"rating_{rating}" if 1 <= rating <= 5 else None
+
+    @staticmethod
+    def average(rating_sum, rating_count):
+        return round(rating_sum / rating_count, 2) if rating_count else None
+
+    @property
+    def rating_avg(self):
+        return self.average(self.rating_sum, self.rating_count)
+
+    @property
+    def rating_histogram(self):
+        return {i: getattr(self, f"rating_{i}") for i in range(1, 6)}
+
+    @classmethod
+    def apply(cls, course_id, create_missing=True, **deltas):
+        """Add ``deltas`` to the course's counters in one UPDATE.
+
+        If the row does not exist yet (a course created before stats existed)
+        it is rebuilt from the source tables instead, unless ``create_missing``
+        is False, as on delete paths where the course may be going away too.
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(course_id=course_id).update(
+            updated_at=timezone.now(),
+            **{field: F(field) + delta for field, delta in deltas.items()},
+        )
+        if not updated and create_missing:
+            cls.objects.rebuild([course_id])
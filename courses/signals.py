@@ -1,46 +1,115 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 from django.db import transaction
-from .models import Enrollment, Material
-from social.models import Notification
+from django.db.models.signals import post_save, post_delete, post_init
+from django.dispatch import Signal, receiver
+from .membership import course_members
+from .models import Course, CourseStats, Enrollment, Material, Feedback, Assignment
+
+# Sent after enrolments are inserted with bulk_create (which skips post_save),
+# e.g. by ``manage.py import_roster``. ``members`` maps a course id to the ids
+# of the students who became active members of it; ``notify=False`` skips the
+# teacher notifications.
+enrollments_bulk_created = Signal()
+
+# Notifications for these events live in social/signals.py.
+
+# --- CourseStats maintenance ---
+# Each handler turns one row change into counter deltas and applies them with a
+# single UPDATE on the course's stats row (see CourseStats.apply).
+
+@receiver(post_save, sender=Course)
+def create_course_stats(sender, instance: Course, created, **kwargs):
+    if created:
+        CourseStats.objects.get_or_create(course=instance)
+
+@receiver(post_init, sender=Enrollment)
+def remember_enrollment_status(sender, instance: Enrollment, **kwargs):
+    # skip deferred loads so we never trigger a query here
+    instance._stats_status = instance.__dict__.get("status")  # type: ignore
 
 @receiver(post_save, sender=Enrollment)
-def notify_teacher_on_enrollment(sender, instance: Enrollment, created, **kwargs):
-    if not created or instance.status != Enrollment.Status.ACTIVE:
-        return
-    teacher = instance.course.teacher
-    def _create():
-        Notification.objects.create(
-            recipient=teacher,
-            type=Notification.Type.ENROLMENT,
-            payload={
-                "course": instance.course.title,
-                "course_slug": instance.course.slug,
-                "student": instance.student.username,
-            },
-        )
-    transaction.on_commit(_create)
+def count_enrollment(sender, instance: Enrollment, created, **kwargs):
+    was_active = not created and instance._stats_status == Enrollment.Status.ACTIVE  # type: ignore
+    is_active = instance.status == Enrollment.Status.ACTIVE
+    CourseStats.apply(instance.course_id, active_enrollments=int(is_active) - int(was_active))
+    instance._stats_status = instance.status  # type: ignore
+    instance._active_changed = is_active != was_active  # type: ignore  # read by social.signals
+
+@receiver(post_delete, sender=Enrollment)
+def uncount_enrollment(sender, instance: Enrollment, **kwargs):
+    if instance.status == Enrollment.Status.ACTIVE:
+        CourseStats.apply(instance.course_id, create_missing=False, active_enrollments=-1)
 
 @receiver(post_save, sender=Material)
-def notify_students_on_new_material(sender, instance: Material, created, **kwargs):
-    if not created:
-        return
-    course = instance.course
-    def _bulk():
-        to_create = []
-        qs = course.enrollments.filter(status="active").select_related("student")  # type: ignore
-        for enr in qs:
-            to_create.append(Notification(
-                recipient=enr.student,
-                type=Notification.Type.NEW_MATERIAL,
-                payload={
-                    "course": course.title,
-                    "course_slug": course.slug,
-                    "material_title": instance.title,
-                    "material_id": instance.id,  # type: ignore
-                },
-            ))
-        if to_create:
-            Notification.objects.bulk_create(to_create)
-    transaction.on_commit(_bulk)
+def count_material(sender, instance: Material, created, **kwargs):
+    if created:
+        CourseStats.apply(instance.course_id, material_count=1)
+
+@receiver(post_delete, sender=Material)
+def uncount_material(sender, instance: Material, **kwargs):
+    CourseStats.apply(instance.course_id, create_missing=False, material_count=-1)
+
+@receiver(post_save, sender=Assignment)
+def count_assignment(sender, instance: Assignment, created, **kwargs):
+    if created:
+        CourseStats.apply(instance.course_id, assignment_count=1)
+
+@receiver(post_delete, sender=Assignment)
+def uncount_assignment(sender, instance: Assignment, **kwargs):
+    CourseStats.apply(instance.course_id, create_missing=False, assignment_count=-1)
+
+@receiver(post_init, sender=Feedback)
+def remember_feedback_rating(sender, instance: Feedback, **kwargs):
+    instance._stats_rating = instance.__dict__.get("rating")  # type: ignore
+
+def _rating_deltas(rating, sign):
+    deltas = {"rating_sum": sign * rating, "rating_count": sign}
+    field = CourseStats.histogram_field(rating)
+    if field:
+        deltas[field] = sign
+    return deltas
+
+@receiver(post_save, sender=Feedback)
+def count_feedback(sender, instance: Feedback, created, **kwargs):
+    old = None if created else instance._stats_rating  # type: ignore
+    new = instance.rating
+    if old != new:
+        deltas = _rating_deltas(new, 1)
+        if old is not None:
+            for field, delta in _rating_deltas(old, -1).items():
+                deltas[field] = deltas.get(field, 0) + delta
+        CourseStats.apply(instance.course_id, **deltas)
+    instance._stats_rating = new  # type: ignore
+
+@receiver(post_delete, sender=Feedback)
+def uncount_feedback(sender, instance: Feedback, **kwargs):
+    CourseStats.apply(instance.course_id, create_missing=False, **_rating_deltas(instance.rating, -1))
+
+@receiver(enrollments_bulk_created)
+def count_bulk_enrollments(sender, members, **kwargs):
+    for course_id, student_ids in members.items():
+        CourseStats.apply(course_id, active_enrollments=len(student_ids))
+
+
+# --- Active-member index (courses/membership.py) ---
+# Local entries are dropped at once, so this transaction reads its own
+# change; the committed state is applied, and published to other processes,
+# after commit.
+
+def _record_membership(changes):
+    for course_id, student_id, _ in changes:
+        course_members.forget(course_id, student_id)
+    transaction.on_commit(lambda: course_members.record_many(changes))
+
+@receiver(post_save, sender=Enrollment)
+def index_enrollment(sender, instance: Enrollment, **kwargs):
+    _record_membership([(instance.course_id, instance.student_id, instance.status == Enrollment.Status.ACTIVE)])
+
+@receiver(post_delete, sender=Enrollment)
+def unindex_enrollment(sender, instance: Enrollment, **kwargs):
+    _record_membership([(instance.course_id, instance.student_id, False)])
 
+@receiver(enrollments_bulk_created)
+def index_bulk_enrollments(sender, members, **kwargs):
+    _record_membership([
+        (course_id, student_id, True) for course_id, student_ids in members.items() for student_id in student_ids
+    ])
@@ -0,0 +1,71 @@
+# courses/tests/test_course_panels.py
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import Course, Enrollment, Assignment, Submission
+
+User = get_user_model()
+
+
+class CoursePanelsTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="t1", password="pass123", role="teacher")
+        self.course = Course.objects.create(title="MOOC", teacher=self.teacher)
+        self.students = [
+            User.objects.create_user(username=f"stud{i:02d}", password="pass123", role="student")
+            for i in range(5)
+        ]
+        for s in self.students:
+            Enrollment.objects.create(course=self.course, student=s)
+        self.assignment = Assignment.objects.create(
+            course=self.course, title="HW1", due_date=timezone.now() + timedelta(days=3)
+        )
+        for s in self.students:
+            Submission.objects.create(assignment=self.assignment, student=s, text=f"by {s.username}")
+        self.roster_url = reverse("course_roster", args=[self.course.slug])
+        self.subs_url = reverse("course_submissions", args=[self.course.slug])
+
+    def test_roster_pages_by_username(self):
+        self.client.login(username="t1", password="pass123")
+        first = self.client.get(self.roster_url, {"limit": 2}).json()
+        self.assertEqual([r["username"] for r in first["results"]], ["stud00", "stud01"])
+        self.assertEqual(first["next"], "stud01")
+
+        rest = self.client.get(self.roster_url, {"limit": 10, "after": first["next"]}).json()
+        self.assertEqual([r["username"] for r in rest["results"]], ["stud02", "stud03", "stud04"])
+        self.assertIsNone(rest["next"])
+
+    def test_roster_search(self):
+        self.client.login(username="t1", password="pass123")
+        data = self.client.get(self.roster_url, {"q": "d03"}).json()
+        self.assertEqual([r["username"] for r in data["results"]], ["stud03"])
+
+    def test_submissions_cursor_walks_every_row_once(self):
+        self.client.login(username="t1", password="pass123")
+        seen, cursor = [], None
+        while True:
+            params = {"assignment": self.assignment.id, "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            data = self.client.get(self.subs_url, params).json()
+            seen += [r["id"] for r in data["results"]]
+            cursor = data["next"]
+            if not cursor:
+                break
+        expected = list(Submission.objects.order_by("-submitted_at", "-id").values_list("id", flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_panels_are_teacher_only(self):
+        self.client.login(username="stud00", password="pass123")
+        self.assertEqual(self.client.get(self.roster_url).status_code, 403)
+        self.assertEqual(self.client.get(self.subs_url).status_code, 403)
+
+    def test_course_page_does_not_render_roster(self):
+        self.client.login(username="t1", password="pass123")
+        resp = self.client.get(reverse("course_detail", args=[self.course.slug]))
+        self.assertContains(resp, "Submissions (5)")
+        self.assertNotContains(resp, "@stud00")
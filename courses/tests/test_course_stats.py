@@ -0,0 +1,67 @@
+# courses/tests/test_course_stats.py
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import Course, CourseStats, Enrollment, Material, Feedback, Assignment
+
+User = get_user_model()
+
+
+class CourseStatsTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="t1", password="pass123", role="teacher")
+        self.s1 = User.objects.create_user(username="s1", password="pass123", role="student")
+        self.s2 = User.objects.create_user(username="s2", password="pass123", role="student")
+        self.course = Course.objects.create(title="Stats 101", teacher=self.teacher)
+
+    def stats(self):
+        return CourseStats.objects.get(course=self.course)
+
+    def test_counters_follow_signals(self):
+        e1 = Enrollment.objects.create(course=self.course, student=self.s1)
+        Enrollment.objects.create(course=self.course, student=self.s2)
+        Material.objects.create(course=self.course, title="W1", file="materials/x.txt")
+        Assignment.objects.create(course=self.course, title="HW", due_date=timezone.now() + timedelta(days=1))
+        Feedback.objects.create(course=self.course, student=self.s1, rating=5)
+        fb = Feedback.objects.create(course=self.course, student=self.s2, rating=2)
+        self.assertEqual(self.stats().active_enrollments, 2)
+
+        e1.status = Enrollment.Status.BLOCKED
+        e1.save()
+        fb.rating = 4
+        fb.save()
+
+        stats = self.stats()
+        self.assertEqual(stats.active_enrollments, 1)
+        self.assertEqual(stats.material_count, 1)
+        self.assertEqual(stats.assignment_count, 1)
+        self.assertEqual((stats.rating_sum, stats.rating_count), (9, 2))
+        self.assertEqual(stats.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 1, 5: 1})
+        self.assertEqual(stats.rating_avg, 4.5)
+
+        Enrollment.objects.filter(course=self.course).delete()
+        Feedback.objects.filter(course=self.course).delete()
+        stats = self.stats()
+        self.assertEqual((stats.active_enrollments, stats.rating_sum, stats.rating_count), (0, 0, 0))
+
+    def test_rebuild_command_matches_incremental(self):
+        Enrollment.objects.create(course=self.course, student=self.s1)
+        Feedback.objects.create(course=self.course, student=self.s1, rating=3)
+        expected = {f: getattr(self.stats(), f) for f in CourseStats.COUNTER_FIELDS}
+
+        CourseStats.objects.all().delete()
+        call_command("rebuild_course_stats", stdout=open("/dev/null", "w"))
+        self.assertEqual({f: getattr(self.stats(), f) for f in CourseStats.COUNTER_FIELDS}, expected)
+
+    def test_course_list_sorts_by_popularity(self):
+        other = Course.objects.create(title="Another", teacher=self.teacher)
+        Enrollment.objects.create(course=self.course, student=self.s1)
+        Enrollment.objects.create(course=self.course, student=self.s2)
+        Enrollment.objects.create(course=other, student=self.s1)
+        resp = self.client.get(reverse("course_list"), {"sort": "popular"})
+        self.assertEqual([c.title for c in resp.context["courses"]], ["Stats 101", "Another"])
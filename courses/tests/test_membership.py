@@ -0,0 +1,127 @@
+# courses/tests/test_membership.py
+import os
+import random
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.bitmap import ARRAY_MAX, Bitmap
+from courses.membership import CourseMemberIndex, course_members
+from courses.models import Assignment, Course, Enrollment
+
+User = get_user_model()
+
+
+class BitmapTests(SimpleTestCase):
+    def test_matches_set_semantics_across_container_kinds(self):
+        rng = random.Random(7)
+        for size in (10, ARRAY_MAX + 500, 40000):
+            a = set(rng.sample(range(200000), size))
+            b = set(rng.sample(range(200000), 3000))
+            A, B = Bitmap(a), Bitmap(b)
+            self.assertEqual(list(A), sorted(a))
+            self.assertEqual(len(A), len(a))
+            self.assertEqual(set(A | B), a | b)
+            self.assertEqual(set(A & B), a & b)
+            self.assertEqual(set(Bitmap.intersection([A, B, A | B])), a & b)
+            self.assertEqual(Bitmap.from_bytes(A.to_bytes())[0], A)
+
+    def test_add_and_discard_convert_between_array_and_bitset(self):
+        bm = Bitmap()
+        for i in range(ARRAY_MAX + 10):
+            bm.add(i * 3)
+        self.assertIn(3 * ARRAY_MAX, bm)
+        for i in range(20):
+            bm.discard(i * 3)
+        self.assertNotIn(0, bm)
+        self.assertEqual(len(bm), ARRAY_MAX - 10)
+        self.assertEqual(list(bm)[:2], [60, 63])
+
+
+# The index only keeps reads made outside a transaction, so these tests
+# can't use TestCase's wrapping transaction.
+@override_settings(NOTIFICATION_FANOUT_ASYNC=False, SHARED_CACHE=True)
+class CourseMemberIndexTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        course_members.clear()
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.a = User.objects.create_user(username="a", password="x")
+        self.b = User.objects.create_user(username="b", password="x")
+        self.ml = Course.objects.create(title="ML", teacher=self.teacher)
+        self.db = Course.objects.create(title="Databases", teacher=self.teacher)
+        for course, student in ((self.ml, self.a), (self.ml, self.b), (self.db, self.a)):
+            Enrollment.objects.create(course=course, student=student)
+
+    def tearDown(self):
+        course_members.clear()
+        cache.clear()
+
+    def test_queries_are_answered_from_memory_once_loaded(self):
+        self.assertEqual(set(course_members.students(self.ml.id)), {self.a.id, self.b.id})
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(course_members.is_member(self.ml.id, self.b.id))
+            self.assertFalse(course_members.is_member(self.db.id, self.b.id))
+            self.assertEqual(set(course_members.union([self.ml.id, self.db.id])), {self.a.id, self.b.id})
+            self.assertEqual(set(course_members.intersection([self.ml.id, self.db.id])), {self.a.id})
+        self.assertEqual(len([q for q in ctx.captured_queries if "courses_enrollment" in q["sql"]]), 1)
+        self.assertEqual(set(course_members.shared_courses(self.a.id, self.b.id)), {self.ml.id})
+        self.assertEqual(set(course_members.classmates(self.b.id)), {self.a.id})
+
+    def test_signals_keep_the_index_current(self):
+        self.assertTrue(course_members.is_member(self.ml.id, self.b.id))
+        enrolment = Enrollment.objects.get(course=self.ml, student=self.b)
+        enrolment.status = Enrollment.Status.BLOCKED
+        enrolment.save()
+        self.assertFalse(course_members.is_member(self.ml.id, self.b.id))
+        enrolment.delete()
+        Enrollment.objects.create(course=self.db, student=self.b)
+        self.assertEqual(set(course_members.courses_of(self.b.id)), {self.db.id})
+
+    def test_other_processes_notice_changes_through_the_version_stamp(self):
+        other = CourseMemberIndex()
+        self.assertEqual(set(other.students(self.db.id)), {self.a.id})
+        Enrollment.objects.create(course=self.db, student=self.b)  # recorded by course_members only
+        self.assertEqual(set(other.students(self.db.id)), {self.a.id, self.b.id})
+
+    def test_access_checks_do_not_trust_a_stale_index(self):
+        assignment = Assignment.objects.create(course=self.ml, title="HW1", due_date=timezone.now())
+        url = reverse("submission_add", args=[self.ml.slug, assignment.id])
+        self.assertTrue(course_members.is_member(self.ml.id, self.b.id))
+        # e.g. blocked by another worker whose cache bumps this one can't see
+        Enrollment.objects.filter(course=self.ml, student=self.b).update(status=Enrollment.Status.BLOCKED)
+        self.assertTrue(course_members.is_member(self.ml.id, self.b.id))
+        self.client.force_login(self.b)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_nothing_is_kept_without_a_shared_cache(self):
+        with override_settings(SHARED_CACHE=False):
+            course_members.students(self.ml.id)
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertTrue(course_members.is_member(self.ml.id, self.b.id))
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_a_read_racing_a_commit_is_not_kept(self):
+        index = CourseMemberIndex()
+        cache.clear()  # no stamp yet: the reader adds one, unless a writer got there first
+        with mock.patch("courses.membership.cache.add", return_value=False):
+            index.students(self.ml.id)
+        self.assertNotIn((0, self.ml.id), index._entries)
+
+    def test_snapshot_round_trip(self):
+        course_members.union([self.ml.id, self.db.id])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "members.idx")
+            self.assertEqual(course_members.save(path), 2)
+            restored = CourseMemberIndex()
+            self.assertEqual(restored.load(path), 2)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(set(restored.students(self.ml.id)), {self.a.id, self.b.id})
+        self.assertEqual(len(ctx.captured_queries), 0)
@@ -0,0 +1,73 @@
+# courses/tests/test_query_budget.py
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from courses.models import Course, Enrollment, Material, Feedback, Assignment, Submission
+
+User = get_user_model()
+
+# Maximum number of SQL queries each view may run, whatever the course size.
+# Session + user lookups count towards the budget. Raise these only together
+# with a change to the view's query plan. The navbar's unread badge is one
+# more (a NotificationCounter primary-key lookup).
+QUERY_BUDGETS = {
+    "course_detail:teacher": 7,
+    "course_detail:student": 9,
+}
+
+
+@override_settings(MEDIA_ROOT="/tmp/test_media")
+class CourseDetailQueryBudgetTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="t1", password="pass123", role="teacher")
+        self.student = User.objects.create_user(username="s1", password="pass123", role="student")
+        self.course = Course.objects.create(title="Big Course", teacher=self.teacher)
+        Enrollment.objects.create(course=self.course, student=self.student)
+        self.url = reverse("course_detail", args=[self.course.slug])
+
+    def _grow(self, n_students, n_assignments):
+        offset = User.objects.count()
+        students = User.objects.bulk_create([
+            User(username=f"bulk{offset + i}", role="student") for i in range(n_students)
+        ])
+        Enrollment.objects.bulk_create([Enrollment(course=self.course, student=s) for s in students])
+        Feedback.objects.bulk_create([Feedback(course=self.course, student=s, rating=4) for s in students])
+        Material.objects.bulk_create([
+            Material(course=self.course, title=f"m{i}", file="materials/x.txt") for i in range(n_assignments)
+        ])
+        due = timezone.now() + timedelta(days=7)
+        assignments = Assignment.objects.bulk_create([
+            Assignment(course=self.course, title=f"a{i}", due_date=due) for i in range(n_assignments)
+        ])
+        Submission.objects.bulk_create([
+            Submission(assignment=a, student=s, text="done") for a in assignments for s in students
+        ])
+
+    def _count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def _assert_budget(self, key):
+        self._count_queries()  # first page view seeds per-user rows (unread counter)
+        self._grow(2, 2)
+        small = self._count_queries()
+        self._grow(15, 12)
+        large = self._count_queries()
+        self.assertLessEqual(large, QUERY_BUDGETS[key], f"{key} exceeded its query budget")
+        self.assertEqual(small, large, f"{key} query count grows with course size")
+
+    def test_teacher_view_within_budget(self):
+        self.client.login(username="t1", password="pass123")
+        self._assert_budget("course_detail:teacher")
+
+    def test_student_view_within_budget(self):
+        self.client.login(username="s1", password="pass123")
+        self._assert_budget("course_detail:student")
@@ -0,0 +1,62 @@
+# courses/tests/test_slugs.py
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from courses import models as course_models
+from courses.models import Course, CourseStats
+
+User = get_user_model()
+
+
+class SlugAllocationTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="t1", password="pass123", role="teacher")
+
+    def _create(self, title="Introduction to Python"):
+        return Course.objects.create(title=title, teacher=self.teacher)
+
+    def test_duplicates_get_numbered_suffixes(self):
+        slugs = [self._create().slug for _ in range(3)]
+        self.assertEqual(slugs, ["introduction-to-python", "introduction-to-python-2", "introduction-to-python-3"])
+
+    def test_query_count_does_not_grow_with_duplicates(self):
+        self._create()
+        with CaptureQueriesContext(connection) as second:
+            self._create()
+        for _ in range(20):
+            self._create()
+        with CaptureQueriesContext(connection) as later:
+            course = self._create()
+        self.assertEqual(course.slug, "introduction-to-python-23")
+        self.assertEqual(len(second.captured_queries), len(later.captured_queries))
+
+    def test_long_titles_fit_the_column(self):
+        course = self._create("x" * 120)
+        self.assertLessEqual(len(course.slug), 50)
+        self.assertLessEqual(len(self._create("x" * 120).slug), 50)
+
+    def test_retries_when_slug_taken_concurrently(self):
+        self._create()
+        real = course_models.allocate_slug
+        # first allocation returns a slug someone else just took
+        with mock.patch.object(course_models, "allocate_slug",
+                               side_effect=["introduction-to-python", real("introduction-to-python")]):
+            course = self._create()
+        self.assertEqual(course.slug, "introduction-to-python-2")
+
+    def test_bulk_create_with_slugs(self):
+        self._create()
+        courses = [Course(title="Introduction to Python", teacher=self.teacher) for _ in range(3)]
+        courses.append(Course(title="Data Science", teacher=self.teacher))
+        with CaptureQueriesContext(connection) as ctx:
+            created = Course.objects.bulk_create_with_slugs(courses)
+        self.assertEqual(
+            [c.slug for c in created],
+            ["introduction-to-python-2", "introduction-to-python-3", "introduction-to-python-4", "data-science"],
+        )
+        self.assertLess(len(ctx.captured_queries), 10)
+        self.assertEqual(CourseStats.objects.filter(course__in=created).count(), 4)
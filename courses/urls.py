@@ -20,6 +20,8 @@ urlpatterns = [
     path("courses/<slug:slug>/assignments/add/", views.assignment_create, name="assignment_add"),
     path("courses/<slug:slug>/assignments/<int:assignment_id>/submit/",
          views.submission_create, name="submission_add"),
+    path("courses/<slug:slug>/roster/", views.course_roster, name="course_roster"),
+    path("courses/<slug:slug>/submissions/", views.course_submissions, name="course_submissions"),
 
     # keep this AFTER all specific routes
     path("courses/<slug:slug>/", views.course_detail, name="course_detail"),
@@ -1,10 +1,17 @@
 # courses/views.py
+import base64
+
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.db.models import Count, Prefetch, Q
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.http import require_POST
+from social.fanout import fan_out
 from social.models import Notification
 from .forms import CourseForm, AssignmentForm, SubmissionForm
 from .models import Course, Enrollment, Material, Feedback, Assignment, Submission
@@ -12,73 +19,191 @@ from .models import Course, Enrollment, Material, Feedback, Assignment, Submissi
 
 User = get_user_model()
 
+COURSE_SORTS = {"title": "A–Z", "popular": "Most popular", "rating": "Top rated", "newest": "Newest"}
+
 def course_list(request):
-    qs = Course.objects.select_related("teacher").order_by("title")
-    return render(request, "courses/course_list.html", {"courses": qs})
+    sort = request.GET.get("sort") or "title"
+    if sort not in COURSE_SORTS:
+        sort = "title"
+    try:
+        min_rating = float(request.GET["min_rating"]) if request.GET.get("min_rating") else None
+    except ValueError:
+        min_rating = None
+    # Popularity and rating come from the CourseStats row, so sorting never aggregates.
+    qs = Course.objects.select_related("teacher").catalogue(sort=sort, min_rating=min_rating)
+    q = (request.GET.get("q") or "").strip()
+    if q:
+        qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q) | Q(teacher__username__icontains=q))
+    return render(request, "courses/course_list.html", {
+        "courses": qs,
+        "sort": sort,
+        "sorts": COURSE_SORTS,
+        "min_rating": min_rating,
+    })
 
 @login_required
 def course_detail(request, slug):
-    course = get_object_or_404(Course.objects.select_related("teacher"), slug=slug)
-    materials = Material.objects.filter(course=course).order_by("-created_at")
-    enrolled = Enrollment.objects.filter(course=course, student=request.user,
-                                         status=Enrollment.Status.ACTIVE).exists()
-    enrollments = Enrollment.objects.select_related("student")\
-                                   .filter(course=course).order_by("student__username")
-    feedback_list = Feedback.objects.select_related("student")\
-                                    .filter(course=course).order_by("-created_at")
-
-    assignments = Assignment.objects.filter(course=course).order_by("due_date", "id")
-
-    # Submissions
+    role = getattr(request.user, "role", None)
+
+    # One query per relation: the course row (+ teacher), then one prefetch each
+    # for materials and feedback, then the assignments.
+    assignments_qs = Assignment.objects.order_by("due_date", "id")
+    course = get_object_or_404(
+        Course.objects.select_related("teacher").prefetch_related(
+            Prefetch("materials", queryset=Material.objects.order_by("-created_at")),
+            Prefetch("feedback", queryset=Feedback.objects.select_related("student").order_by("-created_at")),
+        ),
+        slug=slug,
+    )
+    is_owner = role == "teacher" and course.teacher_id == request.user.id
+    if is_owner:
+        # The roster and submissions are fetched page by page from
+        # course_roster / course_submissions; here we only need the counts.
+        assignments_qs = assignments_qs.annotate(submission_count=Count("submissions"))
+    assignments = list(assignments_qs.filter(course=course))
+
+    enrolled = False
     submitted_ids = set()
-    submissions_by_assignment = {}
-    if getattr(request.user, "role", None) == "student":
+    if role == "student":
+        enrolled = Enrollment.objects.filter(course=course, student=request.user,
+                                             status=Enrollment.Status.ACTIVE).exists()
         # used to show the “Submitted” badge
         submitted_ids = set(
             Submission.objects
             .filter(assignment__course=course, student=request.user)
             .values_list("assignment_id", flat=True)
         )
-    elif getattr(request.user, "role", None) == "teacher" and course.teacher_id == request.user.id:
-        # teacher view: group submissions by assignment
-        for a in assignments:
-            submissions_by_assignment[a.id] = list(
-                Submission.objects
-                .select_related("student")
-                .filter(assignment=a)
-                .order_by("-submitted_at")
-            )
-
-    # Collect all submissions for this course (teacher view)
-    all_subs = (
-        Submission.objects
-        .select_related("student", "assignment")
-        .filter(assignment__course=course)
-    )
-
-    subs_by_assignment: dict[int, list[Submission]] = {}
-    for s in all_subs:
-        subs_by_assignment.setdefault(s.assignment_id, []).append(s)
-
-    # Build rows: (assignment, matching submissions)
-    assignment_rows = [
-        {"a": a, "subs": subs_by_assignment.get(a.id, [])}
-        for a in assignments
-    ]
 
     context = {
         "course": course,
-        "materials": materials,
+        "materials": course.materials.all(),
         "enrolled": enrolled,
-        "enrollments": enrollments,
-        "feedback_list": feedback_list,
+        "is_owner": is_owner,
+        "feedback_list": course.feedback.all(),
         "assignments": assignments,
-        "submitted_ids": submitted_ids,  
-        "submissions_by_assignment": submissions_by_assignment,
-        "assignment_rows": assignment_rows,
+        "submitted_ids": submitted_ids,
     }
     return render(request, "courses/course_detail.html", context)
 
+# --- Roster / submission panels (keyset paginated JSON) ---
+
+ROSTER_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get("limit", ROSTER_PAGE_SIZE))
+    except (TypeError, ValueError):
+        size = ROSTER_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def _encode_cursor(*parts) -> str:
+    raw = "|".join(str(p) for p in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> list[str]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        return base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+    except (ValueError, UnicodeDecodeError):
+        return []
+
+
+def _owned_course_or_403(request, slug):
+    course = get_object_or_404(Course, slug=slug)
+    if course.teacher_id != request.user.id:
+        raise PermissionDenied("Only the course teacher can view this course's roster.")
+    return course
+
+
+@login_required
+def course_roster(request, slug):
+    """One page of enrolled students, ordered by username.
+
+    ``?after=<username>`` continues from the last row of the previous page and
+    ``?q=`` filters by username. Usernames live on the user table, so no index
+    serves this order: each page finds the course's enrolments through
+    ``enrollment_course_recent``, joins their users and keeps the first
+    ``limit`` past the cursor (a top-N sort, with no OFFSET to walk).
+    """
+    course = _owned_course_or_403(request, slug)
+    size = _page_size(request)
+    qs = Enrollment.objects.filter(course=course).order_by("student__username")
+    q = (request.GET.get("q") or "").strip()
+    if q:
+        qs = qs.filter(student__username__icontains=q)
+    status = request.GET.get("status")
+    if status in Enrollment.Status.values:
+        qs = qs.filter(status=status)
+    after = request.GET.get("after")
+    if after:
+        qs = qs.filter(student__username__gt=after)
+
+    rows = list(qs.values("student__username", "status", "created_at")[:size + 1])
+    has_more = len(rows) > size
+    rows = rows[:size]
+    return JsonResponse({
+        "results": [
+            {"username": r["student__username"], "status": r["status"],
+             "enrolled_at": r["created_at"].isoformat()}
+            for r in rows
+        ],
+        "next": rows[-1]["student__username"] if has_more else None,
+    })
+
+
+@login_required
+def course_submissions(request, slug):
+    """One page of submissions for the course, newest first.
+
+    Filter with ``?assignment=<id>`` and ``?q=<username>``; ``?cursor=`` is the
+    opaque ``next`` value from the previous page, keyed on (submitted_at, id).
+    """
+    course = _owned_course_or_403(request, slug)
+    size = _page_size(request)
+    qs = Submission.objects.filter(assignment__course=course).order_by("-submitted_at", "-id")
+    assignment_id = request.GET.get("assignment")
+    if assignment_id:
+        if not assignment_id.isdigit():
+            return JsonResponse({"error": "Invalid assignment"}, status=400)
+        qs = qs.filter(assignment_id=int(assignment_id))
+    q = (request.GET.get("q") or "").strip()
+    if q:
+        qs = qs.filter(student__username__icontains=q)
+    cursor = request.GET.get("cursor")
+    if cursor:
+        parts = _decode_cursor(cursor)
+        submitted_at = parse_datetime(parts[0]) if len(parts) == 2 else None
+        if submitted_at is None or not parts[1].isdigit():
+            return JsonResponse({"error": "Invalid cursor"}, status=400)
+        qs = qs.filter(
+            Q(submitted_at__lt=submitted_at) | Q(submitted_at=submitted_at, id__lt=int(parts[1]))
+        )
+
+    rows = list(
+        qs.values("id", "assignment_id", "student__username", "submitted_at", "file", "text", "grade")[:size + 1]
+    )
+    has_more = len(rows) > size
+    rows = rows[:size]
+    return JsonResponse({
+        "results": [
+            {
+                "id": r["id"],
+                "assignment": r["assignment_id"],
+                "username": r["student__username"],
+                "submitted_at": r["submitted_at"].isoformat(),
+                "file_url": default_storage.url(r["file"]) if r["file"] else None,
+                "text": r["text"],
+                "grade": str(r["grade"]) if r["grade"] is not None else None,
+            }
+            for r in rows
+        ],
+        "next": _encode_cursor(rows[-1]["submitted_at"].isoformat(), rows[-1]["id"]) if has_more else None,
+    })
+
 @login_required
 @require_POST
 def enroll(request, slug):
@@ -111,15 +236,7 @@ def teacher_remove_student(request, slug, username):
     student = get_object_or_404(User, username=username)
     Enrollment.objects.filter(course=course, student=student).delete()
 
-    Notification.objects.create(
-        recipient=student,
-        type=Notification.Type.REMOVED,
-        payload={
-            "course_id": course.id,
-            "course_title": course.title,
-            "teacher_username": request.user.username,
-        },
-    )
+    fan_out([student.id], Notification.Type.REMOVED, course_id=course.id, actor_id=request.user.id)
 
     messages.success(request, f"Removed @{student.username} from {course.title}.")
     return redirect("course_detail", slug=slug)
@@ -186,7 +303,11 @@ def teacher_block_student(request, slug, username):
     if course.teacher_id != request.user.id:
         raise PermissionDenied()
     student = get_object_or_404(User, username=username)
-    Enrollment.objects.filter(course=course, student=student).update(status=Enrollment.Status.BLOCKED)
+    # save the row (rather than queryset.update) so the stats signals see the change
+    enrollment = Enrollment.objects.filter(course=course, student=student).first()
+    if enrollment:
+        enrollment.status = Enrollment.Status.BLOCKED
+        enrollment.save(update_fields=["status"])
     # Optional notification if you add types:
     # Notification.objects.create(recipient=student, type=Notification.Type.BLOCKED, payload={...})
     messages.success(request, f"Blocked @{student.username}.")
@@ -199,7 +320,11 @@ def teacher_unblock_student(request, slug, username):
     if course.teacher_id != request.user.id:
         raise PermissionDenied()
     student = get_object_or_404(User, username=username)
-    Enrollment.objects.filter(course=course, student=student).update(status=Enrollment.Status.ACTIVE)
+    # save the row (rather than queryset.update) so the stats signals see the change
+    enrollment = Enrollment.objects.filter(course=course, student=student).first()
+    if enrollment:
+        enrollment.status = Enrollment.Status.ACTIVE
+        enrollment.save(update_fields=["status"])
     # Optional notification:
     # Notification.objects.create(recipient=student, type=Notification.Type.UNBLOCKED, payload={...})
     messages.success(request, f"Unblocked @{student.username}.")
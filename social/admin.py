@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import StatusUpdate, Notification
+from .models import StatusUpdate, Notification, ArchivedNotification, NotificationCounter
 
 @admin.register(StatusUpdate)
 class StatusUpdateAdmin(admin.ModelAdmin):
@@ -10,3 +10,13 @@ class StatusUpdateAdmin(admin.ModelAdmin):
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ("recipient", "type", "is_read", "created_at")
     list_filter = ("type", "is_read")
+
+@admin.register(ArchivedNotification)
+class ArchivedNotificationAdmin(admin.ModelAdmin):
+    list_display = ("recipient", "type", "created_at", "archived_at")
+    list_filter = ("type",)
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(admin.ModelAdmin):
+    list_display = ("user", "unread", "updated_at")
+    search_fields = ("user__username",)
@@ -0,0 +1,15 @@
+# social/context_processors.py
+from django.utils.functional import SimpleLazyObject
+
+from .models import NotificationCounter
+
+
+def notifications(request):
+    """Expose ``unread_notification_count`` for the navbar badge.
+
+    Lazy, so pages that don't render the badge don't pay for the lookup.
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {"unread_notification_count": 0}
+    return {"unread_notification_count": SimpleLazyObject(lambda: NotificationCounter.unread_for(user.id))}
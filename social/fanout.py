@@ -0,0 +1,118 @@
+# social/fanout.py
+"""Notification fan-out.
+
+Every notification goes through :func:`fan_out`: it waits for the current
+transaction to commit, resolves the recipients as a flat list of ids,
+deduplicates them and writes the rows with chunked ``bulk_create``. With
+``NOTIFICATION_FANOUT_ASYNC`` on, that work runs on a background thread so the
+request that triggered it returns immediately. Each written chunk is then
+pushed to the recipients' open sockets (see :mod:`social.push`).
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import QuerySet
+
+from .models import Notification, NotificationCounter, notifications_changed
+from .push import publish_unread
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_setting("NOTIFICATION_FANOUT_WORKERS", 2),
+            thread_name_prefix="notification-fanout",
+        )
+    return _executor
+
+
+def after_commit(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` once the current transaction commits.
+
+    With ``NOTIFICATION_FANOUT_ASYNC`` on it runs on the fan-out thread pool,
+    otherwise inline. Used for every write that fans out to many users.
+    """
+    def _dispatch():
+        if _setting("NOTIFICATION_FANOUT_ASYNC", False):
+            _get_executor().submit(_run_in_thread, func, args, kwargs)
+        else:
+            func(*args, **kwargs)
+
+    transaction.on_commit(_dispatch)
+
+
+def fan_out(recipients, type, exclude=(), **fields):
+    """Notify ``recipients`` once the current transaction commits.
+
+    ``recipients`` is an iterable of user ids, typically a lazy
+    ``values_list(..., flat=True)`` queryset, which is only evaluated when
+    the notifications are written, off the request thread in async mode.
+    ``fields`` are the Notification columns shared by every row (``course``,
+    ``material``, ``actor``, ``count``). ``exclude`` holds ids that must not
+    be notified (e.g. the actor).
+    """
+    after_commit(deliver, recipients, type, set(exclude), **fields)
+
+
+def _run_in_thread(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Fan-out task %s failed", getattr(func, "__name__", func))
+    finally:
+        close_old_connections()
+
+
+def unique_ids(*sources, exclude=()):
+    """Yield each id from ``sources`` once, skipping None and ``exclude``.
+
+    Querysets are streamed in ``NOTIFICATION_FANOUT_CHUNK_SIZE`` chunks.
+    """
+    seen = set(exclude)
+    for ids in sources:
+        if isinstance(ids, QuerySet):
+            ids = ids.iterator(chunk_size=_setting("NOTIFICATION_FANOUT_CHUNK_SIZE", 1000))
+        for rid in ids:
+            if rid is None or rid in seen:
+                continue
+            seen.add(rid)
+            yield rid
+
+
+def deliver(recipients, type, exclude=(), **fields):
+    """Write the notifications now, in chunks; returns how many were created."""
+    chunk_size = _setting("NOTIFICATION_FANOUT_CHUNK_SIZE", 1000)
+    created = 0
+    chunk = []
+    for rid in unique_ids(recipients, exclude=exclude):
+        chunk.append(Notification(recipient_id=rid, type=type, **fields))
+        if len(chunk) >= chunk_size:
+            created += _write_chunk(chunk)
+            chunk = []
+    if chunk:
+        created += _write_chunk(chunk)
+    return created
+
+
+def _write_chunk(chunk):
+    # each recipient appears once per fan-out, so every counter moves by one
+    ids = [n.recipient_id for n in chunk]
+    with transaction.atomic():
+        Notification.objects.bulk_create(chunk)
+        NotificationCounter.add(ids, 1)
+        unread = NotificationCounter.objects.filter(user_id__in=ids).values_list("user_id", "unread")
+        publish_unread(unread, new=1)
+        notifications_changed.send(sender=Notification, user_ids=ids)
+    return len(chunk)
@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from social import retention
+
+
+class Command(BaseCommand):
+    help = "Collapse repeated notifications into digests and archive old read ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=getattr(settings, "NOTIFICATION_RETENTION_DAYS", 30),
+            help="Archive read notifications older than this many days.",
+        )
+        parser.add_argument(
+            "--digest-minutes", type=int, default=getattr(settings, "NOTIFICATION_DIGEST_MIN_AGE_MINUTES", 60),
+            help="Only digest notifications older than this many minutes.",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--no-digest", action="store_true", help="Skip the digest pass.")
+        parser.add_argument("--no-archive", action="store_true", help="Skip the archive pass.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size = options["batch_size"]
+        if not options["no_digest"]:
+            settled = now - timedelta(minutes=options["digest_minutes"])
+            self._run("Digest", retention.digest(settled, batch_size=batch_size), "rows collapsed",
+                      lambda progress: progress[1])
+        if not options["no_archive"]:
+            before = now - timedelta(days=options["days"])
+            self._run("Archive", retention.archive(before, batch_size=batch_size), "rows archived",
+                      lambda progress: progress)
+
+    def _run(self, label, batches, unit, rows_of):
+        started = time.monotonic()
+        total = 0
+        for i, progress in enumerate(batches, 1):
+            total += rows_of(progress)
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{label} batch {i}: {total} {unit} ({total / max(elapsed, 1e-6):.0f} rows/s)")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"{label}: {total} {unit} in {elapsed:.2f}s."))
@@ -0,0 +1,32 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from social import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild classmates-feed timelines from status updates (e.g. after first deploying them)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Only rebuild these users (default: all).")
+        parser.add_argument("--length", type=int, default=timeline.TIMELINE_BACKFILL,
+                            help="Updates to keep per timeline.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        started = time.monotonic()
+        done = 0
+        for user_id in users.values_list("id", flat=True).iterator(chunk_size=1000):
+            timeline.rebuild_timeline(user_id, limit=options["length"])
+            done += 1
+            if done % 1000 == 0:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{done} timelines ({done / elapsed:.0f}/s)")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {done} timeline(s) in {elapsed:.2f}s."))
@@ -0,0 +1,38 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from social.models import NotificationCounter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute per-user unread notification counters and fix any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Only reconcile these users (default: all).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        ids = users.values_list("id", flat=True).iterator(chunk_size=options["batch_size"])
+        started = time.monotonic()
+        checked = fixed = 0
+        batch = []
+        for uid in ids:
+            batch.append(uid)
+            if len(batch) >= options["batch_size"]:
+                fixed += NotificationCounter.reconcile(batch)
+                checked += len(batch)
+                batch = []
+        if batch:
+            fixed += NotificationCounter.reconcile(batch)
+            checked += len(batch)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} user(s) in {elapsed:.2f}s: {fixed} counter(s) corrected."
+        ))
@@ -0,0 +1,105 @@
+"""Copy each Notification's JSON payload into the typed columns.
+
+Runs outside a single transaction, one batch per commit, and only touches
+rows whose ``type_code`` is still empty, so an interrupted run can simply be
+restarted.
+"""
+from django.conf import settings
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+TYPE_CODES = {"enrolment": 1, "new_material": 2, "removed": 3}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def forwards(apps, schema_editor):
+    Notification = apps.get_model("social", "Notification")
+    Course = apps.get_model("courses", "Course")
+    Material = apps.get_model("courses", "Material")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Notification.objects.filter(id__gt=last_id, type_code__isnull=True)
+                .order_by("id")[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            payloads = [r.payload or {} for r in rows]
+            # both payload dialects ever written: course_id/course_title/student_username
+            # and course/course_slug/student
+            slugs = {p.get("course_slug") for p in payloads if p.get("course_slug")}
+            course_by_slug = dict(Course.objects.filter(slug__in=slugs).values_list("slug", "id"))
+            course_ids = {_as_int(p.get("course_id")) for p in payloads} - {None}
+            existing_courses = set(Course.objects.filter(id__in=course_ids).values_list("id", flat=True))
+            material_ids = {_as_int(p.get("material_id")) for p in payloads} - {None}
+            existing_materials = set(Material.objects.filter(id__in=material_ids).values_list("id", flat=True))
+            usernames = {
+                p.get("student_username") or p.get("student") or p.get("teacher_username")
+                for p in payloads
+            } - {None, ""}
+            user_by_name = dict(User.objects.filter(username__in=usernames).values_list("username", "id"))
+
+            for row, p in zip(rows, payloads):
+                row.type_code = TYPE_CODES.get(row.type, 1)
+                course_id = _as_int(p.get("course_id"))
+                row.course_id = course_id if course_id in existing_courses else course_by_slug.get(p.get("course_slug"))
+                material_id = _as_int(p.get("material_id"))
+                row.material_id = material_id if material_id in existing_materials else None
+                actor = p.get("student_username") or p.get("student") or p.get("teacher_username")
+                row.actor_id = user_by_name.get(actor)
+                row.count = _as_int(p.get("student_count")) or 1
+            Notification.objects.bulk_update(rows, ["type_code", "course", "material", "actor", "count"])
+
+
+def backwards(apps, schema_editor):
+    Notification = apps.get_model("social", "Notification")
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Notification.objects.filter(id__gt=last_id)
+                .select_related("course", "material", "actor").order_by("id")[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+            for row in rows:
+                row.type = TYPE_NAMES.get(row.type_code, "enrolment")
+                payload = {}
+                if row.course:
+                    payload.update(course_id=row.course_id, course_title=row.course.title, course_slug=row.course.slug)
+                if row.material:
+                    payload.update(material_id=row.material_id, material_title=row.material.title)
+                if row.actor:
+                    key = "teacher_username" if row.type == "removed" else "student_username"
+                    payload[key] = row.actor.username
+                if row.count > 1:
+                    payload["student_count"] = row.count
+                row.payload = payload
+                row.type_code = None
+            Notification.objects.bulk_update(rows, ["type", "payload", "type_code"])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('social', '0003_notification_typed_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
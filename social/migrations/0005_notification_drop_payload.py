@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0004_backfill_notification_columns'),
+    ]
+
+    operations = [
+        # give the legacy column a default first so this migration can be reversed
+        migrations.AlterField(
+            model_name='notification',
+            name='type',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='payload',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='type',
+        ),
+        migrations.RenameField(
+            model_name='notification',
+            old_name='type_code',
+            new_name='type',
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'New enrolment'), (2, 'New material'), (3, 'Removed from course')]),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0007_notification_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='statusupdate',
+            name='fanned_out',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='statusupdate',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['-created_at'], name='statusupdate_pull_recent'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='status',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='social.statusupdate'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['owner', '-created_at', '-status'], name='timelineentry_feed'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('owner', 'status'), name='timelineentry_unique'),
+        ),
+    ]
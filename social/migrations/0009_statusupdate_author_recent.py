@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0008_timelines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='statusupdate',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='statusupdate_author_recent'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 09:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_api_keyset_indexes'),
+        ('social', '0009_statusupdate_author_recent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='notification_recipient_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='statusupdate',
+            index=models.Index(fields=['-created_at', '-id'], name='statusupdate_recent'),
+        ),
+    ]
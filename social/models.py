@@ -1,5 +1,9 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.dispatch import Signal
+from django.utils import timezone
 
 User = settings.AUTH_USER_MODEL
 
@@ -7,27 +11,244 @@ class StatusUpdate(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="status_updates")
     text = models.CharField(max_length=280)
     created_at = models.DateTimeField(auto_now_add=True)
+    # False when the author's audience was too large to write to every
+    # timeline; such updates are pulled at read time (see social/timeline.py)
+    fanned_out = models.BooleanField(default=True)
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            # per-author keyset pages (profiles, ?user= API filter)
+            models.Index(fields=["author", "-created_at", "-id"], name="statusupdate_author_recent"),
+            models.Index(fields=["-created_at", "-id"], name="statusupdate_recent"),
+            models.Index(fields=["-created_at"], name="statusupdate_pull_recent",
+                         condition=models.Q(fanned_out=False)),
+        ]
 
     def __str__(self):
         return f"{self.author}: {self.text[:40]}"
 
+
+class TimelineEntry(models.Model):
+    """One status update in one user's classmates feed (fan-out on write).
+
+    ``created_at`` is copied from the update so a feed page is a single
+    range scan over ``(owner, created_at, status)``.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    status = models.ForeignKey(StatusUpdate, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "status"], name="timelineentry_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "-created_at", "-status"], name="timelineentry_feed"),
+        ]
+
+    def __str__(self):
+        return f"{self.status_id} → {self.owner_id}"
+
+# Sent with ``user_ids`` after bulk writes (bulk_create, queryset update or
+# delete) that change those users' notifications without per-row signals.
+# It lives here because social.signals imports the modules that send it.
+notifications_changed = Signal()
+
+
+class NotificationQuerySet(models.QuerySet):
+    def for_display(self):
+        return self.select_related("course", "material", "actor")
+
+
 class Notification(models.Model):
-    class Type(models.TextChoices):
-        ENROLMENT = "enrolment", "New enrolment"
-        NEW_MATERIAL = "new_material", "New material"
-        REMOVED = "removed", "Removed from course"
+    """A typed notification; the display text is rendered at read time.
+
+    Rows only store ids (course, material, actor) and a small type code.
+    Select ``course``, ``material`` and ``actor`` when reading lists of
+    notifications (see ``NotificationQuerySet.for_display``).
+    """
+    class Type(models.IntegerChoices):
+        ENROLMENT = 1, "New enrolment"
+        NEW_MATERIAL = 2, "New material"
+        REMOVED = 3, "Removed from course"
+
+    # stable string codes used by the API and templates
+    TYPE_CODES = {
+        Type.ENROLMENT: "enrolment",
+        Type.NEW_MATERIAL: "new_material",
+        Type.REMOVED: "removed",
+    }
 
     recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
-    type = models.CharField(max_length=20, choices=Type.choices)
-    payload = models.JSONField(default=dict, blank=True)
+    type = models.PositiveSmallIntegerField(choices=Type.choices)
+    course = models.ForeignKey("courses.Course", on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    material = models.ForeignKey("courses.Material", on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    # number of events this row stands for, e.g. students in a bulk enrolment
+    count = models.PositiveIntegerField(default=1)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = NotificationQuerySet.as_manager()
+
+    class Meta:
+        ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["recipient", "is_read", "-created_at"], name="notification_inbox"),
+            # api/ list pages, read and unread together
+            models.Index(fields=["recipient", "-created_at", "-id"], name="notification_recipient_recent"),
+            # scanned by social.retention when archiving
+            models.Index(fields=["is_read", "created_at"], name="notification_retention"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_type_display()} → {self.recipient_id}"
+
+    @property
+    def type_code(self):
+        return self.TYPE_CODES.get(self.type, "")
+
+    @property
+    def payload(self):
+        """The legacy JSON payload, computed from the typed columns."""
+        material = self.material if self.material_id else None
+        return self.build_payload(
+            self.type, self.count,
+            course_id=self.course_id,
+            course_title=self.course.title if self.course_id else None,
+            course_slug=self.course.slug if self.course_id else None,
+            actor_id=self.actor_id,
+            actor_username=self.actor.username if self.actor_id else None,
+            material_id=self.material_id,
+            material_title=material and (material.title or material.file.name),
+        )
+
+    @property
+    def text(self):
+        return self.build_text(self.type, self.count, self.payload)
+
+    # The two builders take plain column values, so api/fastpath.py can
+    # render values() rows without instantiating notifications.
+
+    @classmethod
+    def build_payload(cls, type, count, course_id=None, course_title=None, course_slug=None,
+                      actor_id=None, actor_username=None, material_id=None, material_title=None):
+        data = {}
+        if course_id:
+            data.update(course_id=course_id, course_title=course_title, course_slug=course_slug)
+        if type == cls.Type.ENROLMENT:
+            if count > 1 or not actor_id:
+                data["student_count"] = count
+            else:
+                data["student_username"] = actor_username
+        elif type == cls.Type.NEW_MATERIAL:
+            if material_id:
+                data.update(material_id=material_id, material_title=material_title)
+            if count > 1:
+                data["material_count"] = count
+        elif type == cls.Type.REMOVED and actor_id:
+            data["teacher_username"] = actor_username
+        return data
+
+    @classmethod
+    def build_text(cls, type, count, payload):
+        course = payload.get("course_title", "a course")
+        if type == cls.Type.ENROLMENT:
+            if "student_username" in payload:
+                return f"@{payload['student_username']} enrolled in {course}."
+            return f"{count} student{'s' if count != 1 else ''} enrolled in {course}."
+        if type == cls.Type.NEW_MATERIAL:
+            if count > 1:
+                return f"{count} new materials added to {course}."
+            title = payload.get("material_title")
+            return f"New material {title} added to {course}." if title else f"New material added to {course}."
+        if type == cls.Type.REMOVED:
+            return f"You were removed from {course}."
+        return "Update received."
+
+
+class ArchivedNotification(models.Model):
+    """A read notification moved out of the hot table by ``prune_notifications``.
+
+    Keeps the original id, so archiving a batch twice is harmless.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    type = models.PositiveSmallIntegerField(choices=Notification.Type.choices)
+    course = models.ForeignKey("courses.Course", on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    material = models.ForeignKey("courses.Material", on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    # columns copied verbatim from Notification
+    COPIED_FIELDS = ["id", "recipient_id", "type", "course_id", "material_id", "actor_id", "count", "created_at"]
+
     class Meta:
         ordering = ("-created_at",)
 
     def __str__(self):
-        return f"{self.type} → {self.recipient}"
+        return f"{self.get_type_display()} → {self.recipient_id} (archived)"
+
+
+class NotificationCounter(models.Model):
+    """Maintained count of a user's unread notifications.
+
+    Updated by the fan-out writer and the API's read/unread paths, so the
+    navbar badge is a primary-key lookup instead of a COUNT over
+    Notification. ``manage.py reconcile_notification_counts`` repairs drift.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name="notification_counter")
+    unread = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+    @classmethod
+    def add(cls, user_ids, delta):
+        """Add ``delta`` to each user's counter.
+
+        Call this after the notifications themselves were written or updated:
+        users without a counter row yet get one seeded from a COUNT, which
+        already includes the change.
+        """
+        user_ids = list(user_ids)
+        if not user_ids or not delta:
+            return
+        existing = set(cls.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True))
+        missing = [uid for uid in user_ids if uid not in existing]
+        if missing:
+            cls.reconcile(missing)
+        if existing:
+            cls.objects.filter(user_id__in=existing).update(
+                unread=Greatest(F("unread") + delta, 0), updated_at=timezone.now()
+            )
+
+    @classmethod
+    def unread_for(cls, user_id):
+        unread = cls.objects.filter(user_id=user_id).values_list("unread", flat=True).first()
+        if unread is None:
+            unread = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+            cls.objects.bulk_create([cls(user_id=user_id, unread=unread)], ignore_conflicts=True)
+        return unread
+
+    @classmethod
+    def reconcile(cls, user_ids):
+        """Set the given users' counters to their true unread count; returns how many changed."""
+        user_ids = list(user_ids)
+        actual = dict(
+            Notification.objects.filter(recipient_id__in=user_ids, is_read=False)
+            .values_list("recipient_id").annotate(n=Count("id")).order_by()
+        )
+        stored = dict(cls.objects.filter(user_id__in=user_ids).values_list("user_id", "unread"))
+        stale = [
+            cls(user_id=uid, unread=actual.get(uid, 0))
+            for uid in user_ids if stored.get(uid) != actual.get(uid, 0)
+        ]
+        cls.objects.bulk_create(stale, update_conflicts=True, unique_fields=["user"],
+                                update_fields=["unread", "updated_at"])
+        return len(stale)
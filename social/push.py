@@ -0,0 +1,44 @@
+# social/push.py
+"""Push unread-count updates to connected browsers over Channels.
+
+Each signed-in tab holds a ``NotificationConsumer`` socket that joins the
+user's group; the notification write paths call :func:`publish_unread` once
+their changes are committed. Delivery is best effort: a missing or failing
+channel layer never breaks the write, clients fall back to the page's
+rendered count.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def group_name(user_id):
+    return f"notifications_{user_id}"
+
+
+def publish_unread(unread_by_user, new=0):
+    """Tell each user's sockets their current unread count, after commit.
+
+    ``unread_by_user`` maps user id to unread count; ``new`` is how many
+    notifications each of them just received.
+    """
+    if not unread_by_user:
+        return
+    unread_by_user = dict(unread_by_user)
+    transaction.on_commit(lambda: _send(unread_by_user, new))
+
+
+def _send(unread_by_user, new):
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        send = async_to_sync(layer.group_send)
+        for user_id, unread in unread_by_user.items():
+            send(group_name(user_id), {"type": "notification.update", "new": new, "unread": unread})
+    except Exception:
+        logger.exception("Publishing notification updates failed")
@@ -0,0 +1,101 @@
+# social/retention.py
+"""Keep the Notification table small.
+
+Two passes, both run by ``manage.py prune_notifications``:
+
+* :func:`digest` collapses notifications that share a recipient, type,
+  course and read state into the newest one, with ``count`` carrying the
+  total ("30 new materials added to ML 101."). The digest keeps no
+  actor or material, so deleting one of them leaves it in place.
+* :func:`archive` moves read notifications older than a cutoff into
+  :class:`ArchivedNotification`.
+
+Both work in batches, each in its own transaction, and yield a progress
+tuple per batch, so an interrupted run can simply be started again.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from .models import ArchivedNotification, Notification, NotificationCounter, notifications_changed
+from .push import publish_unread
+
+GROUP_FIELDS = ("recipient_id", "type", "course_id", "is_read")
+
+
+def digest(before, batch_size=500):
+    """Collapse duplicate notifications created before ``before``.
+
+    Yields ``(groups, rows_removed)`` per batch of groups.
+    """
+    candidates = (
+        Notification.objects.filter(created_at__lt=before)
+        .values(*GROUP_FIELDS)
+        .annotate(rows=Count("id"), total=Sum("count"), keep=Max("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    while True:
+        groups = list(candidates[:batch_size])
+        if not groups:
+            return
+        yield len(groups), _collapse(groups, before)
+
+
+def _collapse(groups, before):
+    removed = 0
+    unread_drop = defaultdict(int)  # recipient -> unread rows removed
+    with transaction.atomic():
+        keep = Notification.objects.in_bulk([g["keep"] for g in groups])
+        for g in groups:
+            row = keep[g["keep"]]
+            row.count = g["total"]
+            # a digest stands for several actors and materials; deleting one of
+            # those materials mustn't cascade to it
+            row.actor_id = None
+            row.material_id = None
+            deleted, _ = (
+                Notification.objects.filter(created_at__lt=before, **{f: g[f] for f in GROUP_FIELDS})
+                .exclude(id=row.id)
+                .delete()
+            )
+            removed += deleted
+            if not g["is_read"]:
+                unread_drop[g["recipient_id"]] += deleted
+        Notification.objects.bulk_update(keep.values(), ["count", "actor", "material"])
+        by_amount = defaultdict(list)  # one UPDATE per distinct amount
+        for user_id, deleted in unread_drop.items():
+            by_amount[deleted].append(user_id)
+        for deleted, user_ids in by_amount.items():
+            NotificationCounter.add(user_ids, -deleted)
+        if unread_drop:
+            publish_unread(
+                NotificationCounter.objects.filter(user_id__in=unread_drop).values_list("user_id", "unread")
+            )
+        notifications_changed.send(sender=Notification, user_ids={g["recipient_id"] for g in groups})
+    return removed
+
+
+def archive(before, batch_size=2000):
+    """Move read notifications created before ``before`` to the archive.
+
+    Yields the number of rows moved per batch.
+    """
+    pending = (
+        Notification.objects.filter(is_read=True, created_at__lt=before)
+        .order_by("created_at", "id")
+        .values_list("id", flat=True)
+    )
+    while True:
+        with transaction.atomic():
+            ids = list(pending[:batch_size])
+            if not ids:
+                return
+            rows = list(Notification.objects.filter(id__in=ids).values(*ArchivedNotification.COPIED_FIELDS))
+            ArchivedNotification.objects.bulk_create(
+                [ArchivedNotification(**row) for row in rows], ignore_conflicts=True
+            )
+            Notification.objects.filter(id__in=ids).delete()
+            notifications_changed.send(sender=Notification, user_ids={row["recipient_id"] for row in rows})
+        yield len(ids)
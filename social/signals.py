@@ -1,46 +1,110 @@
 # social/signals.py
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
-from django.contrib.auth import get_user_model
-from .models import Notification
-from courses.models import Enrollment, Material
+from . import timeline
+from .fanout import after_commit, fan_out
+from .models import Notification, NotificationCounter, StatusUpdate, notifications_changed
+from .push import publish_unread
+from courses.models import Course, Enrollment, Material
+from courses.signals import enrollments_bulk_created
 
-User = get_user_model()
+# All course notifications are written through social.fanout, after commit.
 
 @receiver(post_save, sender=Enrollment)
 def notify_teacher_on_enrolment(sender, instance: Enrollment, created, **kwargs):
-    if not created:
-        return
-    course = instance.course
-    teacher = getattr(course, "teacher", None)
-    if not teacher:
+    if not created or instance.status != Enrollment.Status.ACTIVE:
         return
-    Notification.objects.create(
-        recipient=teacher,
-        type=Notification.Type.ENROLMENT,
-        payload={
-            "course_id": course.id,
-            "course_title": getattr(course, "title", ""),
-            "student_username": getattr(instance.student, "username", ""),
-        },
+    fan_out(
+        [instance.course.teacher_id],
+        Notification.Type.ENROLMENT,
+        course_id=instance.course_id,
+        actor_id=instance.student_id,
     )
 
+@receiver(enrollments_bulk_created)
+def notify_teachers_on_bulk_enrolment(sender, members, notify=True, **kwargs):
+    if notify:
+        notify_teachers_of_enrolments(members)
+
+def notify_teachers_of_enrolments(members):
+    """One summary notification per course rather than one per student.
+
+    For callers that send ``enrollments_bulk_created`` with ``notify=False``
+    per batch and notify once at the end (``manage.py import_roster``).
+    """
+    counts = {course_id: len(ids) for course_id, ids in members.items() if ids}
+    for course_id, teacher_id in Course.objects.filter(id__in=counts).values_list("id", "teacher_id"):
+        fan_out(
+            [teacher_id],
+            Notification.Type.ENROLMENT,
+            course_id=course_id,
+            count=counts[course_id],
+        )
+
 @receiver(post_save, sender=Material)
 def notify_students_on_new_material(sender, instance: Material, created, **kwargs):
     if not created:
         return
     course = instance.course
-    # all active enrollments; adjust if your Enrollment has a different status field/value
-    enrollments = course.enrollments.select_related("student").all()
-    for enr in enrollments:
-        student = enr.student
-        Notification.objects.create(
-            recipient=student,
-            type=Notification.Type.NEW_MATERIAL,
-            payload={
-                "course_id": course.pk,
-                "course_title": getattr(course, "title", ""),
-                "material_id": instance.pk,
-                "material_title": getattr(instance, "title", "") or getattr(instance.file, "name", ""),
-            },
-        )
+    students = Enrollment.objects.filter(course=course, status=Enrollment.Status.ACTIVE)
+    fan_out(
+        students.values_list("student_id", flat=True),
+        Notification.Type.NEW_MATERIAL,
+        exclude=[course.teacher_id],
+        course_id=course.id,
+        material_id=instance.id,
+    )
+
+# Deleting a course or material cascades to its notifications without
+# per-row signals; recount the unread badges of whoever had unread ones
+# and tell listeners (api/ ETags) whose notification lists changed.
+
+@receiver(pre_delete, sender=Course)
+@receiver(pre_delete, sender=Material)
+def remember_notified_users(sender, instance, **kwargs):
+    field = "course" if sender is Course else "material"
+    instance._notified_recipients = set(  # type: ignore
+        Notification.objects.filter(**{field: instance}).values_list("recipient_id", "is_read").distinct()
+    )
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Material)
+def recount_notified_users(sender, instance, **kwargs):
+    recipients = getattr(instance, "_notified_recipients", ())
+    if not recipients:
+        return
+    unread = {user_id for user_id, is_read in recipients if not is_read}
+    if unread:
+        NotificationCounter.reconcile(unread)
+        publish_unread(NotificationCounter.objects.filter(user_id__in=unread).values_list("user_id", "unread"))
+    notifications_changed.send(sender=Notification, user_ids={user_id for user_id, _ in recipients})
+
+@receiver(post_save, sender=StatusUpdate)
+def write_status_to_timelines(sender, instance: StatusUpdate, created, **kwargs):
+    if not created:
+        return
+    limit = getattr(settings, "TIMELINE_FANOUT_LIMIT", 5000)
+    if timeline.audience_size(instance.author_id) > limit:
+        # too many readers to write to; feeds pull this one at read time
+        StatusUpdate.objects.filter(pk=instance.pk).update(fanned_out=False)
+        instance.fanned_out = False
+        return
+    after_commit(timeline.write_timelines, instance.pk)
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def rebuild_timeline_on_enrolment_change(sender, instance: Enrollment, **kwargs):
+    # the student's classmate set changed: their feed, and who reads them
+    if kwargs["signal"] is post_save:
+        # set by courses.signals.count_enrollment, which runs first
+        changed = getattr(instance, "_active_changed", True)
+    else:
+        changed = instance.status == Enrollment.Status.ACTIVE
+    if changed:
+        after_commit(timeline.enrolments_changed, [instance.student_id])
+
+@receiver(enrollments_bulk_created)
+def rebuild_timelines_on_bulk_enrolment(sender, members, **kwargs):
+    student_ids = sorted({sid for ids in members.values() for sid in ids})
+    for start in range(0, len(student_ids), timeline.ENROLMENT_BATCH):
+        after_commit(timeline.enrolments_changed, student_ids[start:start + timeline.ENROLMENT_BATCH])
@@ -0,0 +1,57 @@
+# social/tests/test_fanout.py
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from courses.models import Course, Enrollment, Material
+from social import fanout
+from social.models import Notification
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_FANOUT_ASYNC=False, NOTIFICATION_FANOUT_CHUNK_SIZE=2)
+class FanOutTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.course = Course.objects.create(title="ML 101", teacher=self.teacher)
+        self.students = [User.objects.create_user(username=f"s{i}", password="x") for i in range(5)]
+        for s in self.students:
+            Enrollment.objects.create(course=self.course, student=s)
+        Enrollment.objects.filter(student=self.students[0]).update(status=Enrollment.Status.DROPPED)
+
+    def test_material_notifies_each_active_student_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Material.objects.create(course=self.course, title="Week 1", file="materials/x.txt")
+        notified = list(
+            Notification.objects.filter(type=Notification.Type.NEW_MATERIAL)
+            .values_list("recipient__username", flat=True).order_by("recipient__username")
+        )
+        self.assertEqual(notified, ["s1", "s2", "s3", "s4"])
+        n = Notification.objects.for_display().filter(type=Notification.Type.NEW_MATERIAL).first()
+        self.assertEqual(n.payload["course_slug"], self.course.slug)
+        self.assertEqual(n.payload["material_title"], "Week 1")
+        self.assertEqual(n.text, "New material Week 1 added to ML 101.")
+
+    def test_nothing_is_written_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Material.objects.create(course=self.course, title="Week 1", file="materials/x.txt")
+            self.assertFalse(Notification.objects.filter(type=Notification.Type.NEW_MATERIAL).exists())
+        for callback in callbacks:  # the fan-out, plus api/etags.py's post-commit bump
+            callback()
+        self.assertEqual(Notification.objects.filter(type=Notification.Type.NEW_MATERIAL).count(), 4)
+
+    def test_deliver_deduplicates_and_excludes(self):
+        ids = [s.id for s in self.students]
+        created = fanout.deliver(ids + ids[:2], Notification.Type.REMOVED, exclude=[ids[0]], course=self.course)
+        self.assertEqual(created, 4)
+
+    @override_settings(NOTIFICATION_FANOUT_ASYNC=True)
+    def test_async_mode_hands_off_to_executor(self):
+        executor = mock.Mock()
+        with mock.patch.object(fanout, "_get_executor", return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                fanout.fan_out([self.teacher.id], Notification.Type.ENROLMENT, {})
+        executor.submit.assert_called_once()
+        self.assertFalse(Notification.objects.filter(recipient=self.teacher).exists())
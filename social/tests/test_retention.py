@@ -0,0 +1,102 @@
+# social/tests/test_retention.py
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from courses.models import Course, Material
+from social.models import ArchivedNotification, Notification, NotificationCounter
+
+User = get_user_model()
+
+
+class PruneNotificationsTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.student = User.objects.create_user(username="stud", password="x", role="student")
+        self.course = Course.objects.create(title="ML 101", teacher=self.teacher)
+
+    def _notify(self, n, **fields):
+        fields.setdefault("type", Notification.Type.NEW_MATERIAL)
+        Notification.objects.bulk_create([
+            Notification(recipient=self.student, course=self.course, **fields) for _ in range(n)
+        ])
+
+    def _backdate(self, **delta):
+        Notification.objects.update(created_at=timezone.now() - timedelta(**delta))
+
+    def _prune(self, *args):
+        out = StringIO()
+        call_command("prune_notifications", *args, stdout=out)
+        return out.getvalue()
+
+    def test_repeated_notifications_collapse_into_one_digest(self):
+        self._notify(30)
+        self._notify(2, type=Notification.Type.ENROLMENT)
+        NotificationCounter.reconcile([self.student.id])
+        self._backdate(hours=2)
+
+        out = self._prune("--no-archive", "--batch-size", "1")
+        self.assertIn("Digest: 30 rows collapsed", out)
+
+        digest = Notification.objects.get(recipient=self.student, type=Notification.Type.NEW_MATERIAL)
+        self.assertEqual(digest.count, 30)
+        self.assertEqual(digest.text, "30 new materials added to ML 101.")
+        self.assertEqual(Notification.objects.filter(recipient=self.student).count(), 2)
+        self.assertEqual(NotificationCounter.objects.get(user=self.student).unread, 2)
+
+    def test_deleting_one_material_keeps_the_digest(self):
+        materials = [Material.objects.create(course=self.course, title=f"Week {i}", file="materials/w.pdf")
+                     for i in range(3)]
+        Notification.objects.all().delete()
+        for material in materials:
+            self._notify(1, material=material)
+        NotificationCounter.reconcile([self.student.id])
+        self._backdate(hours=2)
+        self._prune("--no-archive")
+
+        digest = Notification.objects.get(recipient=self.student)
+        self.assertIsNone(digest.material_id)
+        materials[-1].delete()
+        self.assertTrue(Notification.objects.filter(pk=digest.pk).exists())
+        self.assertEqual(NotificationCounter.objects.get(user=self.student).unread, 1)
+
+    def test_read_and_unread_are_digested_separately(self):
+        self._notify(2)
+        self._notify(2, is_read=True)
+        self._backdate(hours=2)
+        self._prune("--no-archive")
+        self.assertEqual(
+            sorted(Notification.objects.values_list("is_read", "count")), [(False, 2), (True, 2)]
+        )
+
+    def test_same_size_groups_of_one_recipient_both_count(self):
+        self._notify(2)
+        self._notify(2, type=Notification.Type.ENROLMENT)
+        NotificationCounter.reconcile([self.student.id])
+        self._backdate(hours=2)
+        self._prune("--no-archive")
+        self.assertEqual(NotificationCounter.objects.get(user=self.student).unread, 2)
+
+    def test_recent_notifications_are_not_digested(self):
+        self._notify(2)
+        self._backdate(minutes=90)
+        self._notify(2)
+        out = self._prune("--no-archive", "--digest-minutes", "60")
+        self.assertIn("Digest: 1 rows collapsed", out)
+        self.assertEqual(sorted(Notification.objects.values_list("count", flat=True)), [1, 1, 2])
+
+    def test_old_read_notifications_are_archived(self):
+        self._notify(3, is_read=True)
+        self._notify(1)
+        Notification.objects.update(created_at=timezone.now() - timedelta(days=40))
+        self._notify(1, is_read=True)  # too recent
+
+        out = self._prune("--no-digest", "--days", "30", "--batch-size", "2")
+        self.assertIn("Archive: 3 rows archived", out)
+        self.assertEqual(ArchivedNotification.objects.count(), 3)
+        self.assertEqual(Notification.objects.filter(is_read=True).count(), 1)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 1)
@@ -0,0 +1,140 @@
+# social/tests/test_timeline.py
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from courses.models import Course, Enrollment
+from courses.signals import enrollments_bulk_created
+from social import timeline
+from social.models import StatusUpdate, TimelineEntry
+from social.timeline import feed_page
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_FANOUT_ASYNC=False)
+class ClassmatesTimelineTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username="teach", password="x", role="teacher")
+        self.me = User.objects.create_user(username="me", password="x", role="student")
+        self.mate = User.objects.create_user(username="mate", password="x", role="student")
+        self.stranger = User.objects.create_user(username="stranger", password="x", role="student")
+        self.course = Course.objects.create(title="ML 101", teacher=self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(course=self.course, student=self.me)
+            Enrollment.objects.create(course=self.course, student=self.mate)
+
+    def _post(self, author, text):
+        with self.captureOnCommitCallbacks(execute=True):
+            return StatusUpdate.objects.create(author=author, text=text)
+
+    def _feed(self, username):
+        self.client.login(username=username, password="x")
+        return [s.text for s in self.client.get(reverse("social:feed")).context["feed"]]
+
+    def test_update_is_written_to_classmates_and_teacher(self):
+        status = self._post(self.mate, "hello")
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(status=status).values_list("owner__username", flat=True)),
+            {"me", "teach"},
+        )
+        self.assertEqual(self._feed("me"), ["hello"])
+        self.assertEqual(self._feed("teach"), ["hello"])
+        self.assertEqual(self._feed("stranger"), [])
+
+    def test_feed_read_is_two_queries(self):
+        for i in range(5):
+            self._post(self.mate, f"post {i}")
+        with CaptureQueriesContext(connection) as ctx:
+            feed, _ = feed_page(self.me)
+        self.assertEqual([s.text for s in feed], [f"post {i}" for i in reversed(range(5))])
+        # one range scan over the timeline, one (empty) look for pulled updates
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_high_fan_out_authors_are_pulled_at_read_time(self):
+        self._post(self.me, "my own")  # never in my own feed
+        status = self._post(self.mate, "big course")
+        status.refresh_from_db()
+        self.assertFalse(status.fanned_out)
+        self.assertFalse(TimelineEntry.objects.filter(status=status).exists())
+        self.assertEqual(self._feed("me"), ["big course"])
+        self.assertEqual(self._feed("stranger"), [])
+
+    def test_new_enrolment_backfills_own_timeline(self):
+        self._post(self.mate, "before you joined")
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(course=self.course, student=self.stranger)
+        self.assertEqual(self._feed("stranger"), ["before you joined"])
+
+        enrolment = Enrollment.objects.get(course=self.course, student=self.stranger)
+        enrolment.status = Enrollment.Status.BLOCKED
+        with self.captureOnCommitCallbacks(execute=True):
+            enrolment.save()
+        self.assertEqual(self._feed("stranger"), [])
+
+    def test_bulk_enrolment_backfills_timelines(self):
+        self._post(self.mate, "before you joined")
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.bulk_create([Enrollment(course=self.course, student=self.stranger)])
+            enrollments_bulk_created.send(sender=Enrollment, members={self.course.id: [self.stranger.id]},
+                                          notify=False)
+        self.assertEqual(self._feed("stranger"), ["before you joined"])
+
+    def test_classmates_gain_and_lose_a_students_updates(self):
+        self._post(self.stranger, "posted before joining")
+        with self.captureOnCommitCallbacks(execute=True):
+            enrolment = Enrollment.objects.create(course=self.course, student=self.stranger)
+        self.assertEqual(self._feed("me"), ["posted before joining"])
+        self.assertEqual(self._feed("teach"), ["posted before joining"])
+
+        enrolment.status = Enrollment.Status.BLOCKED
+        with self.captureOnCommitCallbacks(execute=True):
+            enrolment.save()
+        self.assertEqual(self._feed("me"), [])
+        self.assertEqual(self._feed("teach"), [])
+
+    def test_bulk_enrolment_is_handled_in_batches(self):
+        extra = [User.objects.create_user(username=f"new{i}", password="x") for i in range(3)]
+        Enrollment.objects.bulk_create([Enrollment(course=self.course, student=u) for u in extra])
+        with mock.patch.object(timeline, "ENROLMENT_BATCH", 2), \
+                mock.patch.object(timeline, "enrolments_changed") as changed, \
+                self.captureOnCommitCallbacks(execute=True):
+            enrollments_bulk_created.send(sender=Enrollment, members={self.course.id: [u.id for u in extra]},
+                                          notify=False)
+        self.assertEqual([c.args[0] for c in changed.call_args_list], [[u.id for u in extra[:2]], [extra[2].id]])
+
+    def test_feed_pages_through_keyset_cursor(self):
+        for i in range(5):
+            self._post(self.mate, f"post {i}")
+        self.client.login(username="me", password="x")
+
+        resp = self.client.get(reverse("social:feed"))
+        self.assertEqual(len(resp.context["feed"]), 5)
+        self.assertIsNone(resp.context["next_cursor"])
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            data = self.client.get(reverse("social:feed_page"), params).json()
+            seen += [row["text"] for row in data["results"]]
+            cursor = data["next"]
+            if not cursor:
+                break
+        self.assertEqual(seen, [f"post {i}" for i in reversed(range(5))])
+
+    def test_feed_api_uses_the_same_cursor(self):
+        for i in range(3):
+            self._post(self.mate, f"post {i}")
+        self.client.login(username="me", password="x")
+        url = reverse("status-updates-feed")
+        first = self.client.get(url, {"limit": 2}).json()
+        self.assertEqual([r["text"] for r in first["results"]], ["post 2", "post 1"])
+        rest = self.client.get(url, {"limit": 2, "cursor": first["next"]}).json()
+        self.assertEqual([r["text"] for r in rest["results"]], ["post 0"])
+        self.assertIsNone(rest["next"])
+        self.assertEqual(self.client.get(url, {"cursor": "garbage"}).status_code, 400)
@@ -0,0 +1,188 @@
+# social/timeline.py
+"""Classmates feed, fanned out on write.
+
+A user's feed holds status updates by their classmates (active students on
+a course they attend) and, for teachers, by the students on their courses.
+When a status update is created, :func:`write_timelines` copies it into a
+:class:`TimelineEntry` row for each of those readers, so reading the feed is
+a single index range scan.
+
+Authors whose audience exceeds ``TIMELINE_FANOUT_LIMIT`` (students on very
+large courses) are not fanned out: the update is flagged
+``fanned_out=False`` and :func:`feed_page` pulls such updates at read time
+and merges them in. Pages are keyset-paginated on ``(created_at, id)``.
+
+When a student joins or leaves a course, their own timeline is rebuilt
+and :func:`sync_author` brings their updates in line with their new
+audience: dropped from readers who no longer share a course with them,
+and their newest ones copied to readers who now do.
+"""
+import base64
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils.dateparse import parse_datetime
+
+from courses.membership import course_members
+from courses.models import Course, Enrollment
+
+from .fanout import unique_ids
+from .models import StatusUpdate, TimelineEntry
+
+FEED_PAGE_SIZE = 20
+MAX_FEED_PAGE_SIZE = 100
+# updates copied into a timeline when it is (re)built from scratch
+TIMELINE_BACKFILL = 500
+# an author's newest updates copied to readers who just gained them
+AUTHOR_BACKFILL = 50
+# students handled per background task after a bulk enrolment
+ENROLMENT_BATCH = 500
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def audience(author_id):
+    """Ids of the users whose feed shows ``author_id``'s updates."""
+    courses = list(course_members.courses_of(author_id))
+    teachers = Course.objects.filter(id__in=courses).values_list("teacher_id", flat=True)
+    return unique_ids(course_members.union(courses), teachers, exclude=[author_id])
+
+
+def audience_size(author_id):
+    """Number of students sharing a course with ``author_id`` (teachers aside)."""
+    return len(course_members.classmates(author_id))
+
+
+def write_timelines(status_id):
+    """Copy a status update into its readers' timelines, in chunks."""
+    status = StatusUpdate.objects.filter(pk=status_id).values("author_id", "created_at").first()
+    if status is None:
+        return 0
+    return _write_entries(audience(status["author_id"]), [(status_id, status["created_at"])])
+
+
+def _write_entries(owner_ids, statuses):
+    """Insert an entry per owner and ``(status_id, created_at)``; returns the rows written."""
+    chunk_size = _setting("NOTIFICATION_FANOUT_CHUNK_SIZE", 1000)
+    written = 0
+    chunk = []
+    for owner_id in owner_ids:
+        for status_id, created_at in statuses:
+            chunk.append(TimelineEntry(owner_id=owner_id, status_id=status_id, created_at=created_at))
+        if len(chunk) >= chunk_size:
+            written += len(TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True))
+            chunk = []
+    if chunk:
+        written += len(TimelineEntry.objects.bulk_create(chunk, ignore_conflicts=True))
+    return written
+
+
+def _reads(author_id):
+    """Filter on TimelineEntry.owner: readers who currently see ``author_id``."""
+    author_courses = Enrollment.objects.filter(student_id=author_id, status=Enrollment.Status.ACTIVE).values("course_id")
+    return (
+        Exists(Enrollment.objects.filter(student_id=OuterRef("owner_id"), status=Enrollment.Status.ACTIVE,
+                                         course_id__in=author_courses))
+        | Exists(Course.objects.filter(teacher_id=OuterRef("owner_id"), id__in=author_courses))
+    )
+
+
+def sync_author(author_id, limit=AUTHOR_BACKFILL):
+    """Match ``author_id``'s timeline entries to their current audience."""
+    TimelineEntry.objects.filter(status__author_id=author_id).exclude(_reads(author_id)).delete()
+    recent = list(
+        StatusUpdate.objects.filter(author_id=author_id, fanned_out=True)
+        .order_by("-created_at", "-id")
+        .values_list("id", "created_at")[:limit]
+    )
+    if recent:
+        _write_entries(audience(author_id), recent)
+
+
+def enrolments_changed(student_ids):
+    """Bring timelines up to date after these students joined or left courses."""
+    for student_id in student_ids:
+        rebuild_timeline(student_id)
+        sync_author(student_id)
+
+
+def _visible_to(user_id):
+    """Filter for updates whose author is in ``user_id``'s classmate set."""
+    my_courses = Enrollment.objects.filter(student_id=user_id, status=Enrollment.Status.ACTIVE).values("course_id")
+    author_enrolments = Enrollment.objects.filter(student_id=OuterRef("author_id"), status=Enrollment.Status.ACTIVE)
+    return (
+        Exists(author_enrolments.filter(course_id__in=my_courses))
+        | Exists(author_enrolments.filter(course__teacher_id=user_id))
+    )
+
+
+def encode_cursor(status):
+    raw = f"{status.created_at.isoformat()}|{status.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """``(created_at, id)`` from a feed cursor; raises ValueError if malformed."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        created, _, pk = base64.urlsafe_b64decode(padded.encode()).decode().partition("|")
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    created_at = parse_datetime(created)
+    if created_at is None or not pk.isdigit():
+        raise ValueError("Invalid cursor")
+    return created_at, int(pk)
+
+
+def page_args(params):
+    """``(size, before)`` from ``?limit=`` and ``?cursor=``; ValueError on a bad cursor."""
+    try:
+        size = int(params.get("limit", FEED_PAGE_SIZE))
+    except (TypeError, ValueError):
+        size = FEED_PAGE_SIZE
+    cursor = params.get("cursor")
+    return max(1, min(size, MAX_FEED_PAGE_SIZE)), decode_cursor(cursor) if cursor else None
+
+
+def feed_page(user, size=FEED_PAGE_SIZE, before=None):
+    """One page of ``user``'s classmates feed, newest first.
+
+    ``before`` is the ``(created_at, id)`` of the last update already shown.
+    Returns ``(updates, next_cursor)``; ``next_cursor`` is None on the last page.
+    """
+    entries = TimelineEntry.objects.filter(owner=user)
+    pulled = StatusUpdate.objects.filter(_visible_to(user.id), fanned_out=False).exclude(author=user)
+    if before:
+        created_at, pk = before
+        entries = entries.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, status_id__lt=pk))
+        pulled = pulled.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    updates = [
+        entry.status for entry in
+        entries.select_related("status__author").order_by("-created_at", "-status_id")[:size + 1]
+    ]
+    pulled = list(pulled.select_related("author").order_by("-created_at", "-id")[:size + 1])
+    if pulled:
+        updates = sorted(updates + pulled, key=lambda s: (s.created_at, s.id), reverse=True)
+    has_more = len(updates) > size
+    updates = updates[:size]
+    return updates, encode_cursor(updates[-1]) if has_more else None
+
+
+def rebuild_timeline(user_id, limit=TIMELINE_BACKFILL):
+    """Replace ``user_id``'s timeline with their newest ``limit`` fanned-out updates."""
+    recent = (
+        StatusUpdate.objects.filter(_visible_to(user_id), fanned_out=True)
+        .exclude(author_id=user_id)
+        .order_by("-created_at", "-id")
+        .values_list("id", "created_at")[:limit]
+    )
+    with transaction.atomic():
+        TimelineEntry.objects.filter(owner_id=user_id).delete()
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(owner_id=user_id, status_id=sid, created_at=created) for sid, created in recent],
+            ignore_conflicts=True,
+        )
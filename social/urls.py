@@ -5,6 +5,7 @@ app_name = "social"
 
 urlpatterns = [
     path("feed/", views.classmates_feed, name="feed"),
+    path("feed/page/", views.feed_page, name="feed_page"),
     path("status/new/", views.post_status, name="post_status"),
     path("status/<int:pk>/delete/", views.delete_status, name="delete_status"),
 ]
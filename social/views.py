@@ -1,9 +1,9 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import redirect, get_object_or_404, render
 from django.contrib.auth import get_user_model
-from django.db.models import Q
-from courses.models import Enrollment
+from . import timeline
 from .models import StatusUpdate
 
 User = get_user_model()
@@ -35,22 +35,28 @@ def delete_status(request, pk):
 
 @login_required
 def classmates_feed(request):
-    me = request.user
-    # Users who share a course with me (either I’m a student OR I’m the teacher)
-    # 1) courses I’m enrolled on
-    my_course_ids = Enrollment.objects.filter(student=me, status="active").values_list("course_id", flat=True)
-    # classmates on those courses
-    classmates_ids = Enrollment.objects.filter(course_id__in=my_course_ids, status="active")\
-                                       .exclude(student_id=me.id).values_list("student_id", flat=True)
+    # Updates from users who share a course with me (as classmates, or my
+    # students if I teach); precomputed per reader, see social/timeline.py.
+    # Further pages are loaded from feed_page as the reader scrolls.
+    feed, next_cursor = timeline.feed_page(request.user)
+    return render(request, "social/feed.html", {"feed": feed, "next_cursor": next_cursor})
 
-    # 2) if I’m a teacher, include my students on my courses
-    if getattr(me, "role", None) == "teacher":
-        teacher_student_ids = Enrollment.objects.filter(course__teacher=me, status="active")\
-                                               .values_list("student_id", flat=True)
-    else:
-        teacher_student_ids = User.objects.none().values_list("id", flat=True)
-
-    people_ids = set(list(classmates_ids) + list(teacher_student_ids))
-    feed = StatusUpdate.objects.select_related("author").filter(author_id__in=people_ids).order_by("-created_at")[:100]
-
-    return render(request, "social/feed.html", {"feed": feed})
\ No newline at end of file
+@login_required
+def feed_page(request):
+    try:
+        size, before = timeline.page_args(request.GET)
+    except ValueError:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+    updates, next_cursor = timeline.feed_page(request.user, size, before)
+    return JsonResponse({
+        "results": [
+            {
+                "id": s.id,
+                "author": s.author.username,
+                "text": s.text,
+                "created_at": s.created_at.isoformat(),
+            }
+            for s in updates
+        ],
+        "next": next_cursor,
+    })